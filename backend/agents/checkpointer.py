@@ -0,0 +1,149 @@
+import os
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+from dotenv import load_dotenv
+from langgraph.checkpoint.memory import MemorySaver
+
+try:
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:
+    AsyncPostgresSaver = None
+
+load_dotenv()
+
+# MemorySaver fallback mein zyada se zyada itne sessions (least recently written pehle nikalte hain)
+MEMORY_MAX_THREADS = int(os.getenv("CHECKPOINT_MEMORY_MAX_SESSIONS", "1000"))
+
+
+class LatestOnlyMemorySaver(MemorySaver):
+    """
+    MemorySaver that keeps only the latest checkpoint per thread (older checkpoints,
+    their writes and unreferenced blobs are dropped on every put) and at most
+    `max_threads` threads.
+    """
+
+    def __init__(self, max_threads: int = MEMORY_MAX_THREADS):
+        super().__init__()
+        self.max_threads = max_threads
+        self._recent = OrderedDict()
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        self._prune(thread_id, config["configurable"]["checkpoint_ns"], checkpoint)
+        self._recent[thread_id] = None
+        self._recent.move_to_end(thread_id)
+        while self.max_threads > 0 and len(self._recent) > self.max_threads:
+            oldest, _ = self._recent.popitem(last=False)
+            self.delete_thread(oldest)
+        return saved
+
+    def _prune(self, thread_id: str, checkpoint_ns: str, latest) -> None:
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        keep = set(latest["channel_versions"].items())
+        # Checkpoint ids time-ordered hain (latest = max), naye wale kabhi nahi hatte
+        for checkpoint_id in [c for c in checkpoints if c < latest["id"]]:
+            old = self.serde.loads_typed(checkpoints.pop(checkpoint_id)[0])
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            for channel, version in old["channel_versions"].items():
+                if (channel, version) not in keep:
+                    self.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+
+
+if AsyncPostgresSaver is not None:
+    class LatestOnlyPostgresSaver(AsyncPostgresSaver):
+        """AsyncPostgresSaver that deletes a thread's older checkpoints, writes and blobs after every put."""
+
+        PRUNE_WRITES_SQL = """
+            DELETE FROM checkpoint_writes
+            WHERE thread_id = %(thread_id)s AND checkpoint_ns = %(checkpoint_ns)s AND checkpoint_id < %(keep)s
+        """
+        # Sirf hataye gaye checkpoints ke versions; jo blob bache hue (>= keep) checkpoint use karte hain woh rehte hain
+        PRUNE_CHECKPOINTS_SQL = """
+            WITH pruned AS (
+                DELETE FROM checkpoints
+                WHERE thread_id = %(thread_id)s AND checkpoint_ns = %(checkpoint_ns)s AND checkpoint_id < %(keep)s
+                RETURNING checkpoint -> 'channel_versions' AS versions
+            ), stale AS (
+                SELECT DISTINCT v.key AS channel, v.value AS version
+                FROM pruned, jsonb_each_text(pruned.versions) AS v
+            )
+            DELETE FROM checkpoint_blobs b USING stale
+            WHERE b.thread_id = %(thread_id)s AND b.checkpoint_ns = %(checkpoint_ns)s
+              AND b.channel = stale.channel AND b.version = stale.version
+              AND NOT EXISTS (
+                  SELECT 1 FROM checkpoints c
+                  WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+                    AND c.checkpoint_id >= %(keep)s
+                    AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version
+              )
+        """
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            saved = await super().aput(config, checkpoint, metadata, new_versions)
+            params = {"thread_id": config["configurable"]["thread_id"],
+                      "checkpoint_ns": config["configurable"]["checkpoint_ns"], "keep": checkpoint["id"]}
+            async with self._cursor(pipeline=True) as cur:
+                await cur.execute(self.PRUNE_WRITES_SQL, params)
+                await cur.execute(self.PRUNE_CHECKPOINTS_SQL, params)
+            return saved
+
+def _memory_fallback(reason: str) -> LatestOnlyMemorySaver:
+    print(f"⚠️ {reason}, using in-memory conversation state "
+          f"(single worker only, lost on restart, capped at {MEMORY_MAX_THREADS} sessions).")
+    return LatestOnlyMemorySaver(MEMORY_MAX_THREADS)
+
+def _psycopg_url(url: str) -> str:
+    """SQLAlchemy/asyncpg style URL ko psycopg (libpq) format mein badalta hai."""
+    url = url.strip("'").strip('"').replace("postgresql+asyncpg://", "postgresql://", 1)
+    parsed = urlparse(url)
+    query = parse_qs(parsed.query)
+    # asyncpg 'ssl=require' use karta hai, libpq 'sslmode=require'
+    if "ssl" in query and "sslmode" not in query:
+        query["sslmode"] = query.pop("ssl")
+    return urlunparse(parsed._replace(query=urlencode(query, doseq=True)))
+
+@asynccontextmanager
+async def open_checkpointer():
+    """
+    Yields a LangGraph checkpointer for multi-turn memory keyed by thread_id (= session_id).
+    Postgres (shared by all uvicorn workers) jab available ho, warna in-process
+    MemorySaver fallback (sirf single worker ke liye sahi). Dono sirf har thread ka
+    latest checkpoint rakhte hain - purane turns state ke window/summary mein hain.
+    """
+    url = os.getenv("CHECKPOINT_DATABASE_URL") or os.getenv("DATABASE_URL")
+    if not url or not url.strip("'\"").startswith("postgres"):
+        # e.g. SQLite DATABASE_URL (offline load tests)
+        yield _memory_fallback("No Postgres DATABASE_URL for checkpoints")
+        return
+
+    if AsyncPostgresSaver is None:
+        yield _memory_fallback("langgraph-checkpoint-postgres not installed")
+        return
+
+    pool = AsyncConnectionPool(
+        _psycopg_url(url),
+        min_size=1,
+        max_size=int(os.getenv("CHECKPOINT_POOL_SIZE", "10")),
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        open=False,
+    )
+    try:
+        await pool.open(wait=True, timeout=10)
+        saver = LatestOnlyPostgresSaver(pool)
+        # Idempotent migrations; dusra worker pehle chala chuka ho toh bhi safe
+        await saver.setup()
+    except Exception as e:
+        await pool.close()
+        yield _memory_fallback(f"Postgres checkpointer unavailable ({e})")
+        return
+
+    print("✅ Conversation checkpoints stored in Postgres.")
+    try:
+        yield saver
+    finally:
+        await pool.close()
@@ -1,70 +1,180 @@
+import asyncio
 import json
+import os
 import re
 from typing import Annotated, Sequence, TypedDict, List, Dict, Any
-from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
+from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, RemoveMessage
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
+from langgraph.config import get_stream_writer
+from langchain_core.runnables import RunnableConfig
 
 # Internal Imports
 from agents.state import AgentState
-from agents.router import route_request
+from agents.router import route_request, ROUTER_CONFIDENCE_THRESHOLD
+from agents.intent_classifier import intent_classifier
 from services.scheme_service import scheme_service
 from services.mimo_service import mimo_service
+from services.response_cache import response_cache
 from services.tavily_service import tavily_service
+from services.metrics import instrument_node, SCHEME_PREFETCH_OUTCOMES, SCHEME_RERANK_OUTCOMES
+from services.relevance import score_schemes, local_summary
+from services.analysis_store import scheme_analysis_store
+from services.card_payloads import scheme_card_cache
 from database import AsyncSessionLocal
 
-# --- Node Implementations ---
+# --- Conversation Window ---
 
-async def router_node(state: AgentState):
-    """Determines which agent should handle the query."""
-    return await route_request(state)
+# Checkpoint mein max kitne messages rakhne hain; purane summary mein fold ho jaate hain
+MESSAGE_WINDOW = int(os.getenv("CHAT_WINDOW_MESSAGES", "8"))
+SUMMARY_MAX_CHARS = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "1500"))
+# Prompt mein kitne pichhle messages context ke taur par jaate hain
+CONTEXT_MESSAGES = int(os.getenv("CHAT_CONTEXT_MESSAGES", "4"))
 
-async def scheme_agent_node(state: AgentState):
+def _snippet(message: BaseMessage, limit: int = 160) -> str:
+    role = "User" if isinstance(message, HumanMessage) else "MAYA"
+    text = " ".join(str(message.content).split())
+    return f"{role}: {text[:limit]}{'…' if len(text) > limit else ''}"
+
+def conversation_context(state: AgentState) -> str:
+    """Summary + last few turns (excluding the current message) for agent prompts."""
+    parts = []
+    if state.get("summary"):
+        parts.append(f"Earlier: {state['summary']}")
+    previous = list(state["messages"])[:-1][-CONTEXT_MESSAGES:]
+    parts.extend(_snippet(m, 400) for m in previous)
+    return "\n".join(parts)
+
+def with_context(prompt: str, state: AgentState) -> str:
+    context = conversation_context(state)
+    if not context:
+        return prompt
+    return f"Conversation so far (for context only):\n{context}\n{prompt}"
+
+async def memory_node(state: AgentState):
     """
-    MAYA Final Node: Syncs with corrected SchemeService dictionaries.
-    Logic: Processes clean data for AI ranking and Frontend display.
+    Bounded conversation window: MESSAGE_WINDOW se purane messages checkpoint se
+    hata kar ek compact extractive summary mein fold karta hai (no LLM call),
+    taaki prompt size aur checkpoint I/O lambe sessions mein bhi flat rahe.
     """
-    messages = state["messages"]
-    last_message = messages[-1].content
-    
-    # 1. Number extraction (e.g., "top 3")
-    match = re.search(r'\b\d+\b', last_message)
-    requested_count = int(match.group()) if match else None
-    
+    messages = list(state["messages"])
+    if len(messages) <= MESSAGE_WINDOW:
+        return {}
+
+    evicted = messages[:-MESSAGE_WINDOW]
+    folded = " | ".join(_snippet(m) for m in evicted)
+    summary = f"{state.get('summary') or ''} | {folded}".strip(" |")
+    if len(summary) > SUMMARY_MAX_CHARS:
+        summary = "…" + summary[-SUMMARY_MAX_CHARS:]
+
+    return {
+        "messages": [RemoveMessage(id=m.id) for m in evicted],
+        "summary": summary
+    }
+
+# --- Streaming Helper ---
+
+async def generate_reply(prompt: str, config: RunnableConfig = None, agent: str = None, query: str = None) -> str:
+    """
+    Free-form agents ka LLM call. Agar request streaming endpoint se aayi hai
+    (configurable.stream_tokens), toh tokens aate hi custom stream par push
+    karta hai; warna normal single-shot completion.
+    """
+    configurable = (config or {}).get("configurable", {})
+    if not configurable.get("stream_tokens"):
+        return await mimo_service.generate_text(prompt, agent=agent, query=query)
+
+    writer = get_stream_writer()
+    parts = []
+    async for delta in mimo_service.stream_text(prompt, agent=agent, query=query):
+        parts.append(delta)
+        writer({"type": "token", "content": delta})
+    return "".join(parts)
+
+# --- Speculative Scheme Prefetch ---
+
+# Router (LLM fallback) ke saath hi scheme retrieval shuru kar do; scheme query ki
+# latency sum ki jagah max(router, retrieval) ho jaati hai
+SCHEME_PREFETCH = os.getenv("SCHEME_PREFETCH", "true").lower() == "true"
+SCHEME_CANDIDATES = 3
+
+async def retrieve_schemes(query: str, user_profile: dict = None) -> List[Dict[str, Any]]:
     async with AsyncSessionLocal() as db:
         # IMPORTANT: Service ab List[dict] return kar raha hai
-        schemes = await scheme_service.search_schemes(db, last_message, limit=3)
-    
-    if schemes:
-        schemes_data = []
-        for s in schemes:
-            # Helper for JSON parsing (just in case they come as strings)
-            def safe_parse(val):
-                if val is None: return None
-                if isinstance(val, (dict, list)): return val
-                try: return json.loads(val)
-                except: return val
-
-            # --- STEP 2: DATA MAPPING (Synced with Service Keys) ---
-            sd = {
-                "id": str(s.get('id')).strip(),
-                "name": s.get('name'),
-                "category": s.get('category') or "Business",
-                "description": s.get('description'),
-                "benefits": safe_parse(s.get('benefits')) or [],
-                # Keys are now identical to models.py
-                "eligibility_criteria": safe_parse(s.get('eligibility_criteria')), 
-                "required_documents": safe_parse(s.get('required_documents')) or [],
-                "application_mode": str(s.get('application_mode') or "Online/Offline"),
-                "link": s.get('link'),
-                "tags": safe_parse(s.get('tags')) or []
-            }
-            schemes_data.append(sd)
-
-        # --- STEP 3: AI ANALYSIS (REASONING) ---
-        analysis_input = [{"id": x["id"], "name": x["name"], "desc": x["description"]} for x in schemes_data]
-        prompt = f"""
-        Analyze these government schemes for the query: "{last_message}"
+        return await scheme_service.search_schemes(
+            db, query, limit=SCHEME_CANDIDATES, user_profile=user_profile
+        )
+
+def should_prefetch(query: str) -> bool:
+    """Skips speculation when keyword rules already say confidently that this isn't a scheme query."""
+    category, confidence = intent_classifier.classify_keywords(query)
+    return category in (None, "scheme") or confidence < ROUTER_CONFIDENCE_THRESHOLD
+
+# --- Node Implementations ---
+
+async def router_node(state: AgentState):
+    """Determines which agent should handle the query (retrieval runs speculatively alongside)."""
+    query = state["messages"][-1].content
+    context = conversation_context(state)
+    if not SCHEME_PREFETCH or not should_prefetch(query):
+        return {**await route_request(state, context), "prefetched_schemes": None}
+
+    prefetch = asyncio.create_task(retrieve_schemes(query, state.get("user_profile")))
+    try:
+        decision = await route_request(state, context)
+    except BaseException:
+        prefetch.cancel()
+        raise
+
+    if decision.get("current_agent") != "scheme":
+        # Galat guess: embedding/search call cancel, result discard
+        prefetch.cancel()
+        SCHEME_PREFETCH_OUTCOMES.labels("discarded").inc()
+        return {**decision, "prefetched_schemes": None}
+
+    SCHEME_PREFETCH_OUTCOMES.labels("used").inc()
+    return {**decision, "prefetched_schemes": {"query": query, "schemes": await prefetch}}
+
+# --- Scheme Scoring / LLM Rerank ---
+
+# Cards hamesha local scorer se score hote hain (services/relevance.py). LLM rerank optional:
+# "off" = kabhi nahi, "deadline" = SCHEME_RERANK_DEADLINE seconds tak wait (late aaye toh
+# local scores), "background" = response ka wait nahi; cache mein pichli analysis ho toh wahi
+# apply hoti hai, warna LLM call cache warm karti hai (agli baar same query par hit),
+# "followup" = cards turant, LLM analysis baad mein patch ke roop mein (SSE event / poll)
+SCHEME_RERANK_MODE = os.getenv("SCHEME_RERANK_MODE", "deadline").lower()
+SCHEME_RERANK_DEADLINE = float(os.getenv("SCHEME_RERANK_DEADLINE", "3.0"))
+
+# Background rerank tasks ka strong reference (warna GC beech mein hi kill kar sakta hai)
+_rerank_tasks = set()
+
+def safe_parse(val):
+    """JSON string columns -> Python values (dict/list pass through)."""
+    if val is None: return None
+    if isinstance(val, (dict, list)): return val
+    try: return json.loads(val)
+    except: return val
+
+def card_from_row(s: Dict[str, Any]) -> Dict[str, Any]:
+    """Slow path card mapping for rows missing from the validated card cache."""
+    return {
+        "id": str(s.get('id')).strip(),
+        "name": s.get('name'),
+        "category": s.get('category') or "Business",
+        "description": s.get('description'),
+        "benefits": safe_parse(s.get('benefits')) or [],
+        # Keys are now identical to models.py
+        "eligibility_criteria": safe_parse(s.get('eligibility_criteria')), 
+        "required_documents": safe_parse(s.get('required_documents')) or [],
+        "application_mode": str(s.get('application_mode') or "Online/Offline"),
+        "link": s.get('link'),
+        "tags": safe_parse(s.get('tags')) or []
+    }
+
+def build_analysis_prompt(query: str, schemes_data: List[Dict[str, Any]]) -> str:
+    analysis_input = [{"id": x["id"], "name": x["name"], "desc": x["description"]} for x in schemes_data]
+    return f"""
+        Analyze these government schemes for the query: "{query}"
         Data: {json.dumps(analysis_input)}
         
         Return ONLY a JSON object:
@@ -75,64 +185,138 @@ async def scheme_agent_node(state: AgentState):
             ]
         }}
         """
-        
-        ai_response = await mimo_service.generate_text(prompt)
-        
-        try:
-            # AI JSON Parse karna
-            cleaned_json = ai_response.replace('```json', '').replace('```', '').strip()
-            parsed = json.loads(cleaned_json)
-            chat_text = parsed.get("chat_summary", "I found these relevant schemes for you:")
-            
-            # Metadata mapping
-            metadata_map = {str(item.get('id')).strip(): item for item in parsed.get("schemes_metadata", [])}
-            
-            # --- STEP 4: FINAL MERGE & SORT ---
-            final_schemes = []
-            for sd in schemes_data:
-                sid = sd['id']
-                if sid in metadata_map:
-                    sd.update({
-                        "relevance_score": metadata_map[sid].get("relevance_score", 75),
-                        "explanation": metadata_map[sid].get("explanation", "")
-                    })
-                else:
-                    sd.update({"relevance_score": 50, "explanation": "Matching record found in database."})
-                final_schemes.append(sd)
-
-            # Highest score first
-            final_schemes.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
-            display_schemes = final_schemes[:requested_count] if requested_count else final_schemes
-
-            return {
-                "messages": [AIMessage(content=chat_text)],
-                "schemes": display_schemes,
-                "current_agent": "scheme"
-            }
-
-        except Exception as e:
-            print(f"❌ Analysis Error: {e}")
-            fallback = schemes_data[:requested_count] if requested_count else schemes_data
-            return {
-                "messages": [AIMessage(content="I found these schemes in our database:")], 
-                "schemes": fallback,
-                "current_agent": "scheme"
-            }
 
+def parse_analysis(ai_response: str):
+    """LLM analysis reply -> (chat_summary or None, {id: metadata}). Raises on malformed JSON."""
+    cleaned_json = ai_response.replace('```json', '').replace('```', '').strip()
+    parsed = json.loads(cleaned_json)
+    metadata_map = {str(item.get('id')).strip(): item for item in parsed.get("schemes_metadata", [])}
+    return parsed.get("chat_summary"), metadata_map
+
+def start_rerank(prompt: str) -> asyncio.Task:
+    task = asyncio.create_task(mimo_service.generate_text(prompt, agent="scheme"))
+    _rerank_tasks.add(task)
+    task.add_done_callback(_rerank_tasks.discard)
+    # Background mein fail ho toh "exception never retrieved" warning na aaye
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return task
+
+async def rerank_within_deadline(prompt: str):
+    """LLM reply if it arrives within SCHEME_RERANK_DEADLINE, else None (call keeps running to warm the cache)."""
+    task = start_rerank(prompt)
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), timeout=SCHEME_RERANK_DEADLINE)
+    except asyncio.TimeoutError:
+        SCHEME_RERANK_OUTCOMES.labels("deadline_missed").inc()
+        return None
+    except Exception as e:
+        print(f"⚠️ Scheme rerank failed (local scores kept): {e}")
+        SCHEME_RERANK_OUTCOMES.labels("failed").inc()
+        return None
+
+def apply_analysis(schemes_data: List[Dict[str, Any]], metadata_map: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """LLM scores/explanations override the local ones for the ids it returned."""
+    for sd in schemes_data:
+        meta = metadata_map.get(sd["id"])
+        if meta:
+            sd["relevance_score"] = meta.get("relevance_score", sd["relevance_score"])
+            sd["explanation"] = meta.get("explanation") or sd["explanation"]
+    return sorted(schemes_data, key=lambda x: x.get('relevance_score', 0), reverse=True)
+
+def apply_rerank(ai_response: str, final_schemes: List[Dict[str, Any]], chat_text: str):
+    """(schemes, chat_text) with the LLM analysis applied, or the local ones if the reply is malformed."""
+    try:
+        summary, metadata_map = parse_analysis(ai_response)
+    except Exception as e:
+        print(f"❌ Analysis Error (local scores kept): {e}")
+        SCHEME_RERANK_OUTCOMES.labels("invalid").inc()
+        return final_schemes, chat_text
+    SCHEME_RERANK_OUTCOMES.labels("applied").inc()
+    return apply_analysis(final_schemes, metadata_map), summary or chat_text
+
+async def run_followup_analysis(prompt: str, schemes_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Phase two of a followup-mode answer: the analysis patch (summary + scores/explanations, best-first)."""
+    ai_response = await mimo_service.generate_text(prompt, agent="scheme")
+    summary, metadata_map = parse_analysis(ai_response)
+    if not metadata_map:
+        raise ValueError("analysis returned no schemes_metadata")
+    ranked = apply_analysis([dict(sd) for sd in schemes_data], metadata_map)
     return {
-        "messages": [AIMessage(content="I'm sorry, I couldn't find any specific schemes matching your query.")], 
-        "schemes": [],
-        "current_agent": "scheme"
+        "response": summary,
+        "schemes": [{k: sd[k] for k in ("id", "relevance_score", "explanation")} for sd in ranked]
     }
 
-    # If no results in DB
+async def scheme_agent_node(state: AgentState):
+    """
+    MAYA Final Node: Syncs with corrected SchemeService dictionaries.
+    Logic: Local relevance scoring (+ optional LLM rerank) and Frontend display.
+    """
+    messages = state["messages"]
+    last_message = messages[-1].content
+    
+    # 1. Number extraction (e.g., "top 3")
+    match = re.search(r'\b\d+\b', last_message)
+    requested_count = int(match.group()) if match else None
+    
+    # Router ne speculatively retrieve kar liya ho toh dobara search nahi
+    prefetched = state.get("prefetched_schemes")
+    if prefetched and prefetched.get("query") == last_message:
+        schemes = prefetched["schemes"]
+    else:
+        schemes = await retrieve_schemes(last_message, state.get("user_profile"))
+    
+    if not schemes:
+        # If no results in DB
+        return {
+            "messages": [AIMessage(content="I'm sorry, I couldn't find any specific schemes matching your query.")], 
+            "schemes": [],
+            "current_agent": "scheme",
+            "pending_analysis": None
+        }
+
+    # --- STEP 2: DATA MAPPING (Synced with Service Keys) ---
+    schemes_data = []
+    for s in schemes:
+        # Hot path: index load par validated card payload (per-request parse/validation nahi)
+        sd = scheme_card_cache.card(s.get('id')) or card_from_row(s)
+        sd["explanation_snippet"] = s.get('explanation_snippet')
+        sd["similarity"] = s.get('similarity')
+        schemes_data.append(sd)
+
+    # --- STEP 3: LOCAL SCORING (no LLM) ---
+    final_schemes = score_schemes(last_message, schemes_data, state.get("user_profile"))
+    chat_text = local_summary(final_schemes)
+
+    # --- STEP 4: OPTIONAL LLM RERANK ---
+    pending_analysis = None
+    if SCHEME_RERANK_MODE == "followup":
+        # Two-phase: local cards abhi, LLM analysis analysis_id ke against baad mein
+        display_schemes = final_schemes[:requested_count] if requested_count else final_schemes
+        prompt = build_analysis_prompt(last_message, display_schemes)
+        pending_analysis = scheme_analysis_store.submit(run_followup_analysis(prompt, display_schemes))
+        SCHEME_RERANK_OUTCOMES.labels("followup").inc()
+    elif SCHEME_RERANK_MODE in ("deadline", "background"):
+        prompt = build_analysis_prompt(last_message, final_schemes)
+        if SCHEME_RERANK_MODE == "background":
+            # Local scoring deterministic hai, toh same query + candidates = same prompt = cache key
+            ai_response = response_cache.get("scheme", prompt)
+            if ai_response is None:
+                start_rerank(prompt)
+                SCHEME_RERANK_OUTCOMES.labels("background").inc()
+        else:
+            ai_response = await rerank_within_deadline(prompt)
+        if ai_response is not None:
+            final_schemes, chat_text = apply_rerank(ai_response, final_schemes, chat_text)
+
+    display_schemes = final_schemes[:requested_count] if requested_count else final_schemes
     return {
-        "messages": [AIMessage(content="I'm sorry, I couldn't find any specific schemes for that in my database.")], 
-        "schemes": [],
-        "current_agent": "scheme"
+        "messages": [AIMessage(content=chat_text)],
+        "schemes": display_schemes,
+        "current_agent": "scheme",
+        "pending_analysis": pending_analysis
     }
 
-async def general_agent_node(state: AgentState):
+async def general_agent_node(state: AgentState, config: RunnableConfig):
     messages = state["messages"]
     last_message = messages[-1].content
     
@@ -152,18 +336,18 @@ async def general_agent_node(state: AgentState):
         CRITICAL: Do NOT include any greetings like "Hello", "Hi", or "I am MAYA". 
         Just answer the question directly.
         """
-        response = await mimo_service.generate_text(prompt)
+        response = await generate_reply(with_context(prompt, state), config, agent="general", query=last_message)
         
     return {"messages": [AIMessage(content=response)]}
 
 
 # Placeholder nodes for other agents (to be implemented)
-async def market_agent_node(state: AgentState):
+async def market_agent_node(state: AgentState, config: RunnableConfig):
     messages = state["messages"]
     last_message = messages[-1].content
     
     # Perform web search
-    search_results = tavily_service.search(last_message)
+    search_results = await tavily_service.search(last_message)
     
     prompt = f"""
     You are an expert Market Research Analyst for MSMEs in India.
@@ -179,10 +363,10 @@ async def market_agent_node(state: AgentState):
     
     CRITICAL: Do NOT start with a greeting or self-introduction. Jump straight into the market insights.
     """
-    response = await mimo_service.generate_text(prompt)
+    response = await generate_reply(with_context(prompt, state), config, agent="market", query=last_message)
     return {"messages": [AIMessage(content=response)]}
 
-async def brand_agent_node(state: AgentState):
+async def brand_agent_node(state: AgentState, config: RunnableConfig):
     messages = state["messages"]
     last_message = messages[-1].content
     
@@ -197,10 +381,10 @@ async def brand_agent_node(state: AgentState):
     
     CRITICAL: Do NOT start with a greeting or self-introduction. Jump straight into the branding suggestions.
     """
-    response = await mimo_service.generate_text(prompt)
+    response = await generate_reply(with_context(prompt, state), config, agent="brand", query=last_message)
     return {"messages": [AIMessage(content=response)]}
 
-async def finance_agent_node(state: AgentState):
+async def finance_agent_node(state: AgentState, config: RunnableConfig):
     messages = state["messages"]
     last_message = messages[-1].content
     
@@ -215,10 +399,10 @@ async def finance_agent_node(state: AgentState):
     
     CRITICAL: Do NOT start with a greeting or self-introduction. Jump straight into the financial advice.
     """
-    response = await mimo_service.generate_text(prompt)
+    response = await generate_reply(with_context(prompt, state), config, agent="finance", query=last_message)
     return {"messages": [AIMessage(content=response)]}
 
-async def marketing_agent_node(state: AgentState):
+async def marketing_agent_node(state: AgentState, config: RunnableConfig):
     messages = state["messages"]
     last_message = messages[-1].content
     
@@ -233,31 +417,35 @@ async def marketing_agent_node(state: AgentState):
     
     CRITICAL: Do NOT start with a greeting or self-introduction. Jump straight into the marketing strategies.
     """
-    response = await mimo_service.generate_text(prompt)
+    response = await generate_reply(with_context(prompt, state), config, agent="marketing", query=last_message)
     return {"messages": [AIMessage(content=response)]}
 
 # --- Graph Construction ---
 
-def create_graph():
+def create_graph(checkpointer=None):
     workflow = StateGraph(AgentState)
 
-    # Nodes registration
-    workflow.add_node("router", router_node)
-    workflow.add_node("scheme", scheme_agent_node)
-    workflow.add_node("market", market_agent_node)
-    workflow.add_node("brand", brand_agent_node)
-    workflow.add_node("finance", finance_agent_node)
-    workflow.add_node("marketing", marketing_agent_node)
-    workflow.add_node("general", general_agent_node)
+    # Nodes registration (har node ka latency histogram /metrics par)
+    workflow.add_node("memory", instrument_node("memory", memory_node))
+    workflow.add_node("router", instrument_node("router", router_node))
+    workflow.add_node("scheme", instrument_node("scheme", scheme_agent_node))
+    workflow.add_node("market", instrument_node("market", market_agent_node))
+    workflow.add_node("brand", instrument_node("brand", brand_agent_node))
+    workflow.add_node("finance", instrument_node("finance", finance_agent_node))
+    workflow.add_node("marketing", instrument_node("marketing", marketing_agent_node))
+    workflow.add_node("general", instrument_node("general", general_agent_node))
 
-     # Set entry point
-    workflow.set_entry_point("router")
+     # Set entry point: pehle conversation window trim, phir routing
+    workflow.set_entry_point("memory")
+    workflow.add_edge("memory", "router")
 
     # Add conditional edges based on router output
+    # (ROUTER_MODE=generate mein router khud answer de chuka ho toh seedha END)
     workflow.add_conditional_edges(
         "router",
-        lambda x: x["current_agent"],
+        lambda x: "done" if x.get("next_step") == "done" else x["current_agent"],
         {
+            "done": END,
             "scheme": "scheme",
             "market": "market",
             "brand": "brand",
@@ -275,6 +463,13 @@ def create_graph():
     workflow.add_edge("marketing", END)
     workflow.add_edge("general", END)
 
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
+
+app_graph = create_graph()
 
-app_graph = create_graph()
\ No newline at end of file
+def attach_checkpointer(checkpointer) -> None:
+    """
+    Startup par durable checkpointer lagata hai. Graph import time par compile
+    hota hai, isliye lifespan hook yahan saver set karta hai.
+    """
+    app_graph.checkpointer = checkpointer
\ No newline at end of file
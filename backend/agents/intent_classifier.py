@@ -0,0 +1,208 @@
+import asyncio
+import math
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from services.gemini_service import gemini_service
+from services.cache import cosine_similarity
+
+CATEGORIES = ['scheme', 'market', 'brand', 'finance', 'marketing', 'general']
+
+# --- Keyword Rules ---
+# (pattern, weight). Weight 2 = strong signal, 1 = weak/ambiguous signal.
+KEYWORD_RULES: Dict[str, List[Tuple[str, float]]] = {
+    'scheme': [
+        (r"\bschemes?\b", 2), (r"\byojana\b", 2), (r"\bsubsid(y|ies)\b", 2),
+        (r"\bmudra\b", 2), (r"\bpmegp\b", 2), (r"\bcgtmse\b", 2), (r"\bstand[- ]?up india\b", 2),
+        (r"\bstartup india\b", 2), (r"\bodop\b", 2), (r"\bgovernment\b", 1), (r"\bgovt\b", 1),
+        (r"\bsarkari\b", 2), (r"\bgrants?\b", 1), (r"\beligib(le|ility)\b", 1), (r"\bloans?\b", 1),
+    ],
+    'market': [
+        (r"\bmarket (research|size|trends?|analysis|outlook)\b", 2), (r"\bcompetitors?\b", 2),
+        (r"\bcompetition\b", 2), (r"\bindustry (trends?|outlook|analysis)\b", 2),
+        (r"\btrends?\b", 1), (r"\bdemand\b", 1), (r"\bmarket\b", 1),
+    ],
+    'brand': [
+        (r"\bbrand(ing)?\b", 2), (r"\btaglines?\b", 2), (r"\bslogans?\b", 2), (r"\blogo\b", 2),
+        (r"\b(business|shop|company|startup|cafe|store) names?\b", 2), (r"\bname for\b", 1),
+        (r"\bidentity\b", 1),
+    ],
+    'finance': [
+        (r"\bpric(e|ing)\b", 2), (r"\bcash ?flow\b", 2), (r"\bprofit\b", 2), (r"\bmargins?\b", 1),
+        (r"\bbudget\b", 1), (r"\bemi\b", 2), (r"\binterest rate\b", 1), (r"\bworking capital\b", 2),
+        (r"\bcalculat(e|ion)\b", 1), (r"\bcost(s|ing)?\b", 1), (r"\bbreak[- ]?even\b", 2),
+    ],
+    'marketing': [
+        (r"\bmarketing\b", 2), (r"\bpromot(e|ion)\b", 2), (r"\bsocial media\b", 2),
+        (r"\binstagram\b", 2), (r"\bfacebook\b", 1), (r"\bseo\b", 2), (r"\bads?\b", 1),
+        (r"\badvertis(e|ing|ement)\b", 2), (r"\bcampaign\b", 1), (r"\bmore customers\b", 1),
+    ],
+    'general': [
+        (r"^(hi|hey|hello|hii+|namaste)( there)?$", 3), (r"\bwho are you\b", 3),
+        (r"\bwhat can you do\b", 2), (r"^(thanks|thank you|ok|okay)$", 3),
+        (r"^good (morning|afternoon|evening)$", 3),
+    ],
+}
+
+_COMPILED_RULES = {
+    category: [(re.compile(pattern), weight) for pattern, weight in rules]
+    for category, rules in KEYWORD_RULES.items()
+}
+
+# --- Labelled Examples for Nearest-Centroid ---
+LABELLED_EXAMPLES: Dict[str, List[str]] = {
+    'scheme': [
+        "Which government schemes can I apply for as a woman entrepreneur?",
+        "Tell me about MUDRA loan eligibility",
+        "Is there any subsidy for setting up a food processing unit?",
+        "Loan schemes for SC/ST business owners in Uttar Pradesh",
+        "How do I apply for PMEGP?",
+        "Collateral free loan for small manufacturing unit",
+    ],
+    'market': [
+        "What are the current trends in the organic food industry?",
+        "Who are my competitors for a cloud kitchen in Pune?",
+        "Is there demand for handmade jewellery in metro cities?",
+        "Give me a market analysis for electric scooters in India",
+        "How big is the packaged snacks market?",
+    ],
+    'brand': [
+        "Suggest a name for my bakery",
+        "Give me a catchy tagline for an organic tea brand",
+        "Help me build a brand identity for my clothing store",
+        "What should I name my tech startup?",
+        "Logo ideas for a handicraft business",
+    ],
+    'finance': [
+        "How should I price my handmade soaps?",
+        "How do I manage cash flow in my small shop?",
+        "Calculate the break-even point for my cafe",
+        "How much working capital does a small garment unit need?",
+        "Tips to reduce operating costs for a restaurant",
+    ],
+    'marketing': [
+        "How can I promote my bakery on Instagram?",
+        "Low budget marketing ideas for a local gym",
+        "How do I get more customers for my salon?",
+        "Should I run Facebook ads for my boutique?",
+        "Local SEO tips for my hardware store",
+    ],
+    'general': [
+        "Hello",
+        "Who are you?",
+        "What can you help me with?",
+        "Thank you so much",
+        "Good morning MAYA",
+    ],
+}
+
+
+class IntentClassifier:
+    """
+    Local fast-path classifier for the router.
+    1. Keyword rules (zero network).
+    2. Nearest-centroid over embeddings of LABELLED_EXAMPLES (one embedding call,
+       centroids compute hone ke baad process mein cached rehte hain).
+    Returns (category, confidence, source); router decides whether confidence is enough.
+    """
+
+    def __init__(self):
+        self.use_embeddings = os.getenv("ROUTER_EMBEDDING_CLASSIFIER", "true").lower() in ("1", "true", "yes")
+        # softmax temperature for centroid similarities (lower = sharper)
+        self.temperature = float(os.getenv("ROUTER_CENTROID_TEMPERATURE", "0.05"))
+        self._centroids: Optional[Dict[str, List[float]]] = None
+        self._centroid_lock = asyncio.Lock()
+        # Batch embed fail ho toh itne seconds tak dobara try nahi (tab tak LLM router)
+        self.centroid_retry_after = float(os.getenv("ROUTER_CENTROID_RETRY_SECONDS", "60"))
+        self._centroid_failed_at: Optional[float] = None
+
+    def classify_keywords(self, query: str) -> Tuple[Optional[str], float]:
+        text = query.strip().lower().rstrip('?!.')
+        scores = {}
+        for category, rules in _COMPILED_RULES.items():
+            score = sum(weight for pattern, weight in rules if pattern.search(text))
+            if score:
+                scores[category] = score
+
+        if not scores:
+            return None, 0.0
+
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        total = sum(scores.values())
+        # Share of total signal, discounted when only weak keywords matched
+        confidence = (top / total) * min(1.0, top / 2.0)
+        return best, confidence
+
+    def _in_backoff(self) -> bool:
+        return self._centroid_failed_at is not None and \
+            time.monotonic() - self._centroid_failed_at < self.centroid_retry_after
+
+    async def _load_centroids(self) -> Optional[Dict[str, List[float]]]:
+        if self._centroids is not None:
+            return self._centroids
+        # Haal hi mein fail hua: lock par wait ya naya batch embed nahi, seedha LLM router
+        if self._in_backoff():
+            return None
+
+        async with self._centroid_lock:
+            if self._centroids is not None:
+                return self._centroids
+            if self._in_backoff():
+                return None
+
+            labels = [c for c, examples in LABELLED_EXAMPLES.items() for _ in examples]
+            texts = [e for examples in LABELLED_EXAMPLES.values() for e in examples]
+            vectors = await gemini_service.get_embeddings_batch(texts)
+            if not vectors:
+                # Embedding provider down hai, centroid_retry_after ke baad dobara try karenge
+                print(f"⚠️ Router centroids unavailable, LLM router for the next {self.centroid_retry_after:.0f}s")
+                self._centroid_failed_at = time.monotonic()
+                return None
+            self._centroid_failed_at = None
+
+            centroids = {}
+            for category in LABELLED_EXAMPLES:
+                members = [v for label, v in zip(labels, vectors) if label == category]
+                dim = len(members[0])
+                centroids[category] = [sum(v[i] for v in members) / len(members) for i in range(dim)]
+
+            self._centroids = centroids
+            return centroids
+
+    async def classify_centroid(self, query: str) -> Tuple[Optional[str], float]:
+        centroids = await self._load_centroids()
+        if not centroids:
+            return None, 0.0
+
+        query_emb = await gemini_service.get_embeddings(query)
+        if not query_emb:
+            return None, 0.0
+
+        sims = {category: cosine_similarity(query_emb, centroid) for category, centroid in centroids.items()}
+        best = max(sims, key=sims.get)
+        # Softmax over similarities -> probability of the winning centroid
+        exps = {c: math.exp((s - sims[best]) / self.temperature) for c, s in sims.items()}
+        confidence = exps[best] / sum(exps.values())
+        return best, confidence
+
+    async def classify(self, query: str) -> Tuple[Optional[str], float, str]:
+        category, confidence = self.classify_keywords(query)
+        source = "keywords"
+
+        if self.use_embeddings and confidence < 1.0:
+            c_category, c_confidence = await self.classify_centroid(query)
+            if c_category is not None:
+                # Dono agree karein toh confidence badhao, warna jo zyada sure hai woh jeetega
+                if c_category == category:
+                    confidence = max(confidence, c_confidence, min(1.0, (confidence + c_confidence) / 1.5))
+                    source = "keywords+centroid"
+                elif c_confidence > confidence:
+                    category, confidence, source = c_category, c_confidence, "centroid"
+
+        return category, confidence, source
+
+
+intent_classifier = IntentClassifier()
@@ -1,7 +1,12 @@
+import os
+import json
 from langchain_core.prompts import ChatPromptTemplate
 from services.mimo_service import mimo_service
+from services.cache import LRUCache, normalize_text
+from services.metrics import ROUTE_DECISIONS, register_cache
 from agents.state import AgentState
-from langchain_core.messages import HumanMessage, SystemMessage
+from agents.intent_classifier import intent_classifier, CATEGORIES
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 
 ROUTER_PROMPT = """
 You are an intelligent intent classifier for the MAYA AI Assistant.
@@ -17,20 +22,103 @@ Classify the user's query into one of the following categories:
 Return ONLY the category name (e.g., 'scheme', 'market', 'general'). Do not add any explanation.
 """
 
-async def route_request(state: AgentState) -> dict:
+ROUTED_GENERATION_PROMPT = """
+You are MAYA, India's Business AI assistant for MSMEs.
+Classify the user's query into one category and, where allowed, answer it in the same reply.
+
+1. 'scheme': government schemes, loans, subsidies, eligibility, or details of specific schemes.
+2. 'market': market research, competitors, or industry trends.
+3. 'brand': branding, business names, or taglines. Give 3-5 creative options relevant to the Indian market.
+4. 'finance': financial planning, pricing, or cost management (not specific schemes). General guidance only, no legal or tax advice.
+5. 'marketing': low-cost, high-impact marketing (digital, social media, local SEO) tailored to the user's business, with practical steps.
+6. 'general': greetings, who you are, or general conversation.
+
+Return ONLY a JSON object: {"intent": "<category>", "answer": "<reply>"}
+- For 'scheme' and 'market' leave "answer" empty; a specialist agent with live data will reply.
+- For the others, "answer" is the complete reply to the user. Do NOT start with a greeting or self-introduction.
+"""
+
+# "classify" = LLM sirf intent batata hai, phir agent node answer ke liye doosri call karta hai;
+# "generate" = ek hi JSON call mein intent + answer (free-form agents ke liye)
+ROUTER_MODE = os.getenv("ROUTER_MODE", "classify").lower()
+# Inke answers router call se hi aa sakte hain; scheme/market ko DB/web data chahiye
+DIRECT_ANSWER_AGENTS = ("brand", "finance", "marketing", "general")
+
+# Local classifier ka confidence isse kam ho toh LLM router par fallback
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.75"))
+
+# normalized query -> category
+route_cache = LRUCache(maxsize=int(os.getenv("ROUTER_CACHE_SIZE", "4096")))
+register_cache("router", route_cache.stats)
+
+async def classify_with_llm(query: str):
+    """Full OpenRouter round trip. Returns None if the model reply is unusable."""
+    prompt = f"{ROUTER_PROMPT}\n\nUser Query: {query}"
+    category = await mimo_service.generate_text(prompt, agent="router", query=query)
+    category = category.strip().strip("'\"`.").lower()
+    return category if category in CATEGORIES else None
+
+def parse_routed_reply(reply: str):
+    """(category, answer) from a ROUTED_GENERATION_PROMPT reply; (None, None) if unusable."""
+    try:
+        cleaned = reply.replace('```json', '').replace('```', '').strip()
+        parsed = json.loads(cleaned[cleaned.index("{"):cleaned.rindex("}") + 1])
+    except (ValueError, AttributeError):
+        return None, None
+    category = str(parsed.get("intent", "")).strip().strip("'\"`.").lower()
+    if category not in CATEGORIES:
+        return None, None
+    answer = str(parsed.get("answer") or "").strip()
+    return category, (answer if category in DIRECT_ANSWER_AGENTS and answer else None)
+
+async def classify_and_answer(query: str, context: str = ""):
+    """One OpenRouter round trip for intent + answer. Returns (category, answer or None)."""
+    prompt = ROUTED_GENERATION_PROMPT
+    if context:
+        prompt += f"\nConversation so far (for context only):\n{context}\n"
+    # Poora answer router ke 24h TTL par cache nahi hota (brand/finance ke apne TTL hain, 0 = off);
+    # sirf intent route_cache mein jaata hai, repeat query agent node se apne namespace mein answer hoti hai
+    reply = await mimo_service.generate_text(f"{prompt}\nUser Query: {query}", agent="router", query=query, cache=False)
+    return parse_routed_reply(reply)
+
+def _decision(category: str, answer: str = None) -> dict:
+    # next_step har turn reset hota hai (checkpoint se pichhla "done" na bache)
+    if answer:
+        return {"current_agent": category, "messages": [AIMessage(content=answer)], "next_step": "done"}
+    return {"current_agent": category, "next_step": None}
+
+async def route_request(state: AgentState, context: str = "") -> dict:
     messages = state["messages"]
     last_message = messages[-1]
-    
-    # Simple logic for now, using LLM for classification
-    prompt = f"{ROUTER_PROMPT}\n\nUser Query: {last_message.content}"
-    
-    category = await mimo_service.generate_text(prompt)
-    category = category.strip().lower()
-    
-    # Normalize response
-    valid_categories = ['scheme', 'market', 'brand', 'finance', 'marketing', 'general']
-    if category not in valid_categories:
-        category = 'general'
-        
-    print(f"Routing to: {category}")
-    return {"current_agent": category}
+    query = last_message.content
+
+    cache_key = normalize_text(query)
+    category = route_cache.get(cache_key)
+    if category:
+        print(f"Routing to: {category} (cached)")
+        ROUTE_DECISIONS.labels(category, "cache").inc()
+        return _decision(category)
+
+    # 1. Local fast path: keyword rules + nearest-centroid
+    category, confidence, source = await intent_classifier.classify(query)
+
+    # 2. LLM fallback only when the local classifier isn't sure
+    answer = None
+    if category is None or confidence < ROUTER_CONFIDENCE_THRESHOLD:
+        if ROUTER_MODE == "generate":
+            llm_category, answer = await classify_and_answer(query, context)
+        else:
+            llm_category = await classify_with_llm(query)
+        if llm_category:
+            category, source = llm_category, ("llm+answer" if answer else "llm")
+        else:
+            # LLM error/garbage: cache mat karo, next time dobara try hoga
+            category = category if category and confidence >= 0.5 else 'general'
+            print(f"Routing to: {category} (fallback)")
+            ROUTE_DECISIONS.labels(category, "fallback").inc()
+            return _decision(category)
+
+    route_cache.set(cache_key, category)
+    print(f"Routing to: {category} ({source}, local_confidence={confidence:.2f})")
+    ROUTE_DECISIONS.labels(category, source).inc()
+    return _decision(category, answer)
@@ -22,5 +22,14 @@ class AgentState(TypedDict):
     # Iske bina data graph se bahar main.py tak nahi pahunch payega.
     schemes: List[Dict[str, Any]] 
     
+    # Router ke saath speculatively fetch kiye gaye candidates: {"query": ..., "schemes": [...]}
+    prefetched_schemes: Optional[Dict[str, Any]]
+
+    # Followup rerank mode: background LLM analysis ka id (services/analysis_store.py)
+    pending_analysis: Optional[str]
+
+    # Window se bahar gaye purane turns ka compact summary (checkpointer ke saath persist hota hai)
+    summary: Optional[str]
+
     # Graph flow control ke liye
     next_step: Optional[str]
\ No newline at end of file
@@ -1,19 +1,30 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from contextlib import asynccontextmanager
-from database import engine, Base, get_db
+from database import engine, Base, get_db, AsyncSessionLocal
 import models
 from services.scheme_service import scheme_service
 from services.chat_history_service import chat_history_service
-from agents.graph import app_graph
+from services.tavily_service import tavily_service
+from services.mimo_service import mimo_service
+from services.admission import admission_controller, AdmissionRejected
+from services.analysis_store import scheme_analysis_store, apply_patch
+from services.card_payloads import scheme_card_cache, FastJSONResponse
+from services.auth import bearer_claims, require_admin
+from agents.graph import app_graph, attach_checkpointer
+from agents.checkpointer import open_checkpointer
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from langchain_core.messages import HumanMessage
 import uuid
-import json
-from fastapi.responses import StreamingResponse
+import orjson
+from fastapi.responses import StreamingResponse, Response
+from starlette.background import BackgroundTask
+from services.metrics import HTTP_LATENCY, HTTP_IN_FLIGHT, render_metrics
+import time
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -21,11 +32,39 @@ async def lifespan(app: FastAPI):
     try:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            # create_all purani table par naya index nahi banata
+            await conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_chat_history_session_timestamp "
+                "ON chat_history (session_id, timestamp)"
+            ))
+            if conn.dialect.name == "postgresql":
+                # Seed se pehle wali schemes table mein naya column (warna index load ka SELECT fail)
+                await conn.execute(text("ALTER TABLE schemes ADD COLUMN IF NOT EXISTS explanation_snippet TEXT"))
+                await conn.execute(text(
+                    "ALTER TABLE schemes ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now()"
+                ))
+        async with AsyncSessionLocal() as db:
+            await chat_history_service.backfill_sessions(db)
         print("✅ Database initialized successfully.")
     except Exception as e:
         print(f"❌ Initialization Error: {e}")
-    yield
-    print("🛑 MAYA AI Backend Shutting Down...")
+    try:
+        async with AsyncSessionLocal() as db:
+            await scheme_service.reload_index(db)
+    except Exception as e:
+        print(f"⚠️ Scheme index not loaded (pgvector search will be used): {e}")
+    # Reseed ke baad har worker apna index khud reload karta hai
+    await scheme_service.start_watcher(AsyncSessionLocal)
+    # Chat history write-behind flusher
+    await chat_history_service.start()
+    # Multi-turn memory: thread_id (= session_id) ke hisaab se checkpoints
+    async with open_checkpointer() as checkpointer:
+        attach_checkpointer(checkpointer)
+        yield
+        print("🛑 MAYA AI Backend Shutting Down...")
+        await scheme_service.stop_watcher()
+        await chat_history_service.stop()
+        await tavily_service.aclose()
 
 app = FastAPI(title="MAYA AI - Multi-Agent System", lifespan=lifespan)
 
@@ -38,36 +77,101 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    # Streaming responses: sirf headers tak ka time (tokens ka time node/provider histograms mein)
+    HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        # Route template (/api/history/{session_id}) taaki label cardinality bounded rahe
+        path = route.path if route else "unmatched"
+        HTTP_LATENCY.labels(request.method, path, str(status)).observe(time.perf_counter() - start)
+
 # --- Request/Response Models ---
 
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
     user_profile: Optional[Dict[str, Any]] = None
+    # Per-user quota ke liye (na ho toh session, phir client IP)
+    user_id: Optional[int] = None
 
 class ChatResponse(BaseModel):
     response: str
     agent: str
     session_id: str
     schemes: List[Dict[str, Any]] = [] # For your SchemeCard UI
+    # SCHEME_RERANK_MODE=followup: AI analysis baad mein GET /api/chat/analysis/{analysis_id} se
+    analysis_id: Optional[str] = None
 
 # --- Endpoints ---
 
 @app.get("/")
 async def root():
-    return {"status": "online", "system": "MAYA Multi-Agent AI"}
+    return {
+        "status": "online",
+        "system": "MAYA Multi-Agent AI",
+        "chat_history": chat_history_service.stats(),
+        "admission": admission_controller.stats(),
+        "scheme_analysis": scheme_analysis_store.stats(),
+        # Per-provider circuit state + p50/p95 (LLM pool)
+        "llm_providers": mimo_service.pool.stats()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint (latency histograms, errors, in-flight, cache hit ratios)."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+def _client_ip(http_request: Request) -> str:
+    # Proxy ke peeche: uvicorn --proxy-headers + --forwarded-allow-ips trusted proxy ka X-Forwarded-For yahan laata hai
+    return http_request.client.host if http_request.client else "unknown"
+
+def _admission_key(request: ChatRequest, http_request: Request) -> str:
+    """Fair-queue key: user/session sirf queue mein baari ke liye (client-supplied hai, quota ke liye nahi)."""
+    if request.user_id is not None:
+        return f"user:{request.user_id}"
+    if request.session_id:
+        return f"session:{request.session_id}"
+    return f"ip:{_client_ip(http_request)}"
+
+def _quota_key(http_request: Request) -> str:
+    """Quota key: verified JWT user, warna client IP (body ka user_id/session_id client badal sakta hai)."""
+    claims = bearer_claims(http_request) or {}
+    user = claims.get("sub") or claims.get("user_id")
+    if user is not None:
+        return f"user:{user}"
+    return f"ip:{_client_ip(http_request)}"
+
+async def _admit(request: ChatRequest, http_request: Request):
+    """Admission slot for one graph run; quota/overload -> fast 429 with Retry-After."""
+    try:
+        return await admission_controller.acquire(_admission_key(request, http_request), _quota_key(http_request))
+    except AdmissionRejected as e:
+        detail = ("Too many messages, please slow down." if e.reason == "rate_limited"
+                  else "MAYA is busy right now. Please retry shortly.")
+        raise HTTPException(status_code=429, detail=detail, headers={"Retry-After": e.retry_after_header})
 
-@app.post("/api/chat/agent", response_model=ChatResponse)
-async def chat_agent(request: ChatRequest, db: AsyncSession = Depends(get_db)):
+@app.post("/api/chat/agent", response_model=ChatResponse, response_class=FastJSONResponse)
+async def chat_agent(request: ChatRequest, http_request: Request):
     """
     Main Entry Point: Routes query via LangGraph and returns 
     structured response for UI Cards.
     """
+    release = await _admit(request, http_request)
     try:
         session_id = request.session_id or str(uuid.uuid4())
         
-        # 1. Save User Message to DB
-        await chat_history_service.save_message(db, session_id, "user", request.message)
+        # 1. Save User Message (write-behind queue; graph DB commit ka wait nahi karta)
+        await chat_history_service.add_message(session_id, "user", request.message, user_id=request.user_id)
 
         # 2. Prepare LangGraph Input
         # 'schemes' key is essential for holding the AI-analyzed cards
@@ -78,7 +182,7 @@ async def chat_agent(request: ChatRequest, db: AsyncSession = Depends(get_db)):
         }
 
         # 3. Invoke LangGraph (Brain of MAYA)
-        # Thread_id allows LangGraph to maintain context across turns
+        # Thread_id + checkpointer: pichhle turns (bounded window + summary) state mein load hote hain
         config = {"configurable": {"thread_id": session_id}}
         result = await app_graph.ainvoke(initial_state, config)
         
@@ -88,34 +192,181 @@ async def chat_agent(request: ChatRequest, db: AsyncSession = Depends(get_db)):
         agent_name = result.get("current_agent", "MAYA")
         found_schemes = result.get("schemes", [])
         
-        # 5. Save Assistant Message to DB
-        await chat_history_service.save_message(db, session_id, "assistant", last_message)
+        # 5. Save Assistant Message
+        await chat_history_service.add_message(session_id, "assistant", last_message, user_id=request.user_id)
         
-        return ChatResponse(
-            response=result["messages"][-1].content,
-            agent=result.get("current_agent", "MAYA"),
-            session_id=session_id,
-            schemes=result.get("schemes", []) # <--- Ye data pass hona chahiye
-        )
+        # ChatResponse shape, par cards cached bytes se splice (per-request validate/encode nahi)
+        return FastJSONResponse(scheme_card_cache.encode_with_schemes({
+            "response": last_message,
+            "agent": agent_name,
+            "session_id": session_id,
+            # Checkpoint mein pichhle scheme turn ka id reh sakta hai - sirf isi turn ka
+            "analysis_id": result.get("pending_analysis") if agent_name == "scheme" else None
+        }, found_schemes))
     except Exception as e:
         print(f"🔥 Critical Graph Error: {e}")
         raise HTTPException(status_code=500, detail="MAYA agents are out of sync. Please try again.")
+    finally:
+        release()
+
+def _sse(event: str, data: Dict[str, Any]) -> bytes:
+    """Formats one Server-Sent Event frame."""
+    return _sse_raw(event, orjson.dumps(data))
+
+def _sse_raw(event: str, payload: bytes) -> bytes:
+    """SSE frame for an already-encoded JSON payload."""
+    return b"event: " + event.encode() + b"\ndata: " + payload + b"\n\n"
+
+@app.post("/api/chat/agent/stream")
+async def chat_agent_stream(request: ChatRequest, http_request: Request):
+    """
+    Streaming variant of /api/chat/agent (SSE).
+    Event order: session -> agent -> token* -> schemes -> [analysis] -> done
+    (ya error agar graph beech mein fail ho jaye). analysis sirf SCHEME_RERANK_MODE=followup
+    mein: cards pehle, LLM ka patch (scores/explanations/order/summary) baad mein.
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+    # Admission stream shuru hone se pehle, taaki 429 normal HTTP response ho
+    release = await _admit(request, http_request)
+
+    async def event_stream():
+        try:
+            async for frame in graph_events():
+                yield frame
+        finally:
+            release()
+
+    async def graph_events():
+        await chat_history_service.add_message(session_id, "user", request.message, user_id=request.user_id)
+
+        yield _sse("session", {"session_id": session_id})
+
+        initial_state = {
+            "messages": [HumanMessage(content=request.message)],
+            "user_profile": request.user_profile or {"location": "Uttar Pradesh"},
+            "schemes": []
+        }
+        config = {"configurable": {"thread_id": session_id, "stream_tokens": True}}
+
+        agent_name = "MAYA"
+        final_text = ""
+        streamed_text = []
+        found_schemes = []
+        analysis_id = None
+
+        try:
+            async for mode, chunk in app_graph.astream(initial_state, config, stream_mode=["updates", "custom"]):
+                if mode == "custom":
+                    if chunk.get("type") == "token":
+                        streamed_text.append(chunk["content"])
+                        yield _sse("token", {"content": chunk["content"]})
+                    continue
+
+                for node_name, update in chunk.items():
+                    if not update or node_name == "memory":
+                        continue
+                    if node_name == "router":
+                        agent_name = update.get("current_agent", agent_name)
+                        yield _sse("agent", {"agent": agent_name})
+                        if not update.get("messages"):
+                            continue
+
+                    if update.get("messages"):
+                        final_text = update["messages"][-1].content
+                        # Non-streamed replies (greeting, scheme summary, router ka direct answer) ek hi token mein bhej do
+                        if not streamed_text:
+                            yield _sse("token", {"content": final_text})
+                    if update.get("schemes"):
+                        found_schemes = update["schemes"]
+                        yield _sse_raw("schemes", scheme_card_cache.encode_with_schemes(
+                            {"analysis_id": update.get("pending_analysis")}, found_schemes))
+                    if node_name == "scheme":
+                        analysis_id = update.get("pending_analysis")
+        except Exception as e:
+            print(f"🔥 Critical Graph Error (stream): {e}")
+            yield _sse("error", {"detail": "MAYA agents are out of sync. Please try again."})
+            return
+
+        final_text = final_text or "".join(streamed_text)
+
+        await chat_history_service.add_message(session_id, "assistant", final_text, user_id=request.user_id)
+
+        if analysis_id:
+            # Graph khatam - analysis ke wait mein admission slot mat pakdo
+            release()
+            patch = await scheme_analysis_store.wait(analysis_id, scheme_analysis_store.stream_wait)
+            if patch is not None:
+                yield _sse("analysis", patch)
+                if patch["status"] == "ready":
+                    found_schemes = apply_patch(found_schemes, patch)
+                    final_text = patch.get("response") or final_text
+
+        yield _sse_raw("done", scheme_card_cache.encode_with_schemes({
+            "response": final_text,
+            "agent": agent_name,
+            "session_id": session_id,
+            "analysis_id": analysis_id
+        }, found_schemes))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Generator kabhi start hi na ho (client turant disconnect) tab bhi slot wapas; release idempotent hai
+        background=BackgroundTask(release)
+    )
+
+@app.get("/api/chat/analysis/{analysis_id}")
+async def get_scheme_analysis(analysis_id: str):
+    """Follow-up analysis for a two-phase scheme answer: status pending|ready|failed (+ patch when ready)."""
+    patch = scheme_analysis_store.poll(analysis_id)
+    if patch is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired analysis_id")
+    return patch
 
 # --- History & Management Endpoints ---
 
+@app.post("/api/schemes/reload", dependencies=[Depends(require_admin)])
+async def reload_scheme_index(db: AsyncSession = Depends(get_db)):
+    """
+    Rebuilds this worker's in-memory scheme index right away (admin only).
+    Baaki workers SCHEME_INDEX_POLL_SECONDS ke andar khud reload kar lete hain.
+    """
+    try:
+        count = await scheme_service.reload_index(db)
+        return {"status": "reloaded", "schemes": count}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/history/sessions")
-async def get_sessions(db: AsyncSession = Depends(get_db)):
+async def get_sessions(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    user_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Sessions by latest activity; pass next_cursor back as ?cursor= for the next page."""
     try:
-        sessions = await chat_history_service.get_user_sessions(db)
-        return {"sessions": sessions}
+        sessions, next_cursor = await chat_history_service.get_user_sessions(db, user_id, limit, cursor)
+        return {"sessions": sessions, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/history/{session_id}")
-async def get_session_history(session_id: str, db: AsyncSession = Depends(get_db)):
+async def get_session_history(
+    session_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db)
+):
+    """Latest `limit` messages (oldest->newest); next_cursor fetches the page before them."""
     try:
-        messages = await chat_history_service.get_session_history(db, session_id)
-        return {"session_id": session_id, "history": messages}
+        messages, next_cursor = await chat_history_service.get_session_history(db, session_id, limit, cursor)
+        return {"session_id": session_id, "history": messages, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey, Boolean, Float
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey, Boolean, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from pgvector.sqlalchemy import Vector
@@ -26,6 +26,15 @@ class Scheme(Base):
     # Vector embedding (dimension 768 for Gemini)
     embedding = Column(Vector(768))
 
+    # sha256(embedding model + embedded text) - reseed par sirf badli hui schemes re-embed hoti hain
+    content_hash = Column(String(64), index=True)
+
+    # Seed time par precomputed "why this scheme" line (local relevance explanations ke liye)
+    explanation_snippet = Column(Text)
+
+    # Har insert/update par badalta hai - workers (count, max id, max updated_at) se stale index pakadte hain
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -46,4 +55,23 @@ class ChatHistory(Base):
     content = Column(Text)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
-    user = relationship("User", back_populates="chats")
\ No newline at end of file
+    user = relationship("User", back_populates="chats")
+
+    # Session ki history (aur keyset pagination) isi index se, poori table scan nahi
+    __table_args__ = (
+        Index("ix_chat_history_session_timestamp", "session_id", "timestamp"),
+    )
+
+class ChatSession(Base):
+    """One row per chat session, updated incrementally with every history write (sidebar list)."""
+    __tablename__ = "chat_sessions"
+    session_id = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    title = Column(String)                 # first user message (truncated)
+    message_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_activity = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_chat_sessions_last_activity", "last_activity", "session_id"),
+    )
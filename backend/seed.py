@@ -1,85 +1,223 @@
+import argparse
 import asyncio
+import hashlib
 import json
 import os
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
 from database import engine, Base, AsyncSessionLocal
 from models import Scheme
 from services.gemini_service import gemini_service
-from sqlalchemy import text, delete
+from services.rate_limiter import AdaptiveTokenBucket
+from services.relevance import build_explanation_snippet
+from sqlalchemy import text, delete, insert, select, update
 from dotenv import load_dotenv
 
 load_dotenv()
 
-async def get_embedding_with_retry(text_to_embed, max_attempts=3):
-    """Wait and retry logic for Gemini Free Tier with exit condition (UNTOUCHED)"""
-    attempt = 0
-    while attempt < max_attempts:
+# Gemini batchEmbedContents ek call mein 100 texts tak leta hai
+BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "32"))
+CONCURRENCY = int(os.getenv("SEED_CONCURRENCY", "2"))
+# Starting rate (batch calls/second); 429s par apne aap kam hota hai
+START_RATE = float(os.getenv("SEED_RATE", "0.5"))
+MAX_ATTEMPTS = int(os.getenv("SEED_MAX_ATTEMPTS", "6"))
+SCHEMES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "schemes.json")
+
+def build_embedding_text(data: dict) -> str:
+    """Rich text updated to include benefits list and tags for better semantic search"""
+    benefits_str = ". ".join(data.get('benefits', []))
+    tags_str = ", ".join(data.get('tags', []))
+    return f"{data['name']}. {data['description']}. Benefits: {benefits_str}. Tags: {tags_str}"
+
+def content_hash(embedding_text: str) -> str:
+    """Hash of the embedded text + embedding model; changes only when a re-embed is needed."""
+    payload = f"{gemini_service.embedding_cache_model}\x00{embedding_text}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# Card fields jo embedding mein nahi jaate - badle toh sirf UPDATE, re-embed nahi
+CARD_FIELDS = ["description", "benefits", "eligibility_criteria", "required_documents",
+               "application_mode", "tags", "category", "link", "explanation_snippet"]
+
+def is_rate_limit_error(e: Exception) -> bool:
+    message = str(e).lower()
+    return "429" in message or "resource_exhausted" in message or "quota" in message or "rate limit" in message
+
+def scheme_row(data: dict) -> dict:
+    """Column values for one scheme (embedding/content_hash alag se set hote hain)."""
+    return {
+        "name": data['name'],
+        "description": data['description'],
+        "benefits": data['benefits'],             # JSON List
+        "eligibility_criteria": data['eligibility_criteria'],
+        "required_documents": data.get('required_documents', []), # JSON List
+        "application_mode": data.get('application_mode', "Online/Offline"), # String
+        "tags": data.get('tags', []),             # JSON List
+        "category": data['category'],
+        "link": data['link'],
+        "explanation_snippet": build_explanation_snippet(data)
+    }
+
+class SeedStats:
+    def __init__(self, total: int):
+        self.total = total
+        self.embedded = 0
+        self.failed = 0
+        self.api_calls = 0
+        self.started = time.perf_counter()
+
+    def report(self, prefix: str = "") -> str:
+        elapsed = time.perf_counter() - self.started
+        rate = self.embedded / elapsed if elapsed else 0.0
+        return (f"{prefix}{self.embedded}/{self.total} embedded, {self.failed} failed, "
+                f"{self.api_calls} API calls in {elapsed:.1f}s ({rate:.2f} schemes/s)")
+
+async def embed_batch(texts, bucket: AdaptiveTokenBucket, stats: SeedStats):
+    """One batch embedding call, rate-limited, with 429-driven backoff."""
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        await bucket.acquire()
+        stats.api_calls += 1
         try:
-            emb = await gemini_service.get_embeddings(text_to_embed)
-            if emb:
-                return emb
-            
-            attempt += 1
-            print(f"⚠️ Attempt {attempt} failed (Empty Embedding). Sleeping 70s to reset quota...")
-            await asyncio.sleep(70) 
-            
+            vectors = await gemini_service.embed_documents(texts)
+            bucket.on_success()
+            return vectors
         except Exception as e:
-            print(f"❌ Error on attempt {attempt+1}: {e}")
-            await asyncio.sleep(70)
-            attempt += 1
-            
-    print(f"🛑 Critical: Could not get embedding after {max_attempts} tries. Skipping this item.")
+            if is_rate_limit_error(e):
+                bucket.on_throttle()
+                print(f"   ⚠️ 429 from provider (attempt {attempt}), rate -> {bucket.rate:.3f} calls/s")
+            else:
+                print(f"   ❌ Embedding error (attempt {attempt}): {e}")
+                await asyncio.sleep(min(30, 2 ** attempt))
     return None
 
-async def seed_schemes():
-    print("🚀 Starting Gemini-Only Seeding with Pro Fields...")
-    
+async def embed_all(texts: list) -> list:
+    """
+    Batched + concurrent embedding of `texts`; returns vectors in order (None for failures).
+    Har batch persistent embedding cache mein bhi likha jata hai, isliye interrupted
+    run dobara chalane par pehle se bane vectors API call nahi karte.
+    """
+    stats = SeedStats(len(texts))
+    bucket = AdaptiveTokenBucket(rate=START_RATE, capacity=max(1, CONCURRENCY))
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    vectors = [None] * len(texts)
+
+    async def run(batch_no: int, start: int):
+        async with semaphore:
+            chunk = texts[start:start + BATCH_SIZE]
+            result = await embed_batch(chunk, bucket, stats)
+            if not result:
+                stats.failed += len(chunk)
+                print(f"   ⏭️ Batch {batch_no}: {len(chunk)} schemes skipped after repeated API failures.")
+                return
+            vectors[start:start + len(chunk)] = result
+            stats.embedded += len(chunk)
+            print(stats.report(f"   ✅ Batch {batch_no}: "))
+
+    await asyncio.gather(*[
+        run(n, start) for n, start in enumerate(range(0, len(texts), BATCH_SIZE), start=1)
+    ])
+
+    if texts:
+        print(stats.report("   📈 Embedding: "))
+    if bucket.throttled:
+        print(f"   Provider throttled {bucket.throttled} times; final rate {bucket.rate:.3f} calls/s")
+    return vectors
+
+async def seed_schemes(force: bool = False, path: str = SCHEMES_PATH) -> dict:
+    """Syncs `path` into the schemes table; returns the per-action counts."""
+    print("🚀 Starting Incremental Gemini Seeding...")
+
     async with engine.begin() as conn:
-        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        # Postgres-only DDL (offline tests SQLite par chalte hain)
+        postgres = conn.dialect.name == "postgresql"
+        if postgres:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
         await conn.run_sync(Base.metadata.create_all)
+        if postgres:
+            # create_all purani table mein naya column add nahi karta
+            await conn.execute(text("ALTER TABLE schemes ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"))
+            await conn.execute(text("ALTER TABLE schemes ADD COLUMN IF NOT EXISTS explanation_snippet TEXT"))
+            await conn.execute(text("ALTER TABLE schemes ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now()"))
+
+    # Ensure your data/schemes.json has the new fields
+    with open(path, "r") as f:
+        schemes_data = json.load(f)
 
     async with AsyncSessionLocal() as session:
-        print("🧹 Cleaning database...")
-        await session.execute(delete(Scheme))
-        await session.commit()
-
-        # Ensure your data/schemes.json has the new fields
-        with open("data/schemes.json", "r") as f:
-            schemes_data = json.load(f)
-
-        for i, data in enumerate(schemes_data):
-            name = data['name']
-            print(f"\n[{i+1}/{len(schemes_data)}] Processing: {name}")
-            
-            # Rich text updated to include benefits list and tags for better semantic search
-            benefits_str = ". ".join(data.get('benefits', []))
-            tags_str = ", ".join(data.get('tags', []))
-            rich_text = f"{name}. {data['description']}. Benefits: {benefits_str}. Tags: {tags_str}"
-            
-            # Safe embedding retrieval (Logic preserved)
-            embedding = await get_embedding_with_retry(rich_text)
-            
-            if embedding:
-                new_scheme = Scheme(
-                    name=name,
-                    description=data['description'],
-                    benefits=data['benefits'],             # NEW: JSON List
-                    eligibility_criteria=data['eligibility_criteria'],
-                    required_documents=data.get('required_documents', []), # NEW: JSON List
-                    application_mode=data.get('application_mode', "Online/Offline"), # NEW: String
-                    tags=data.get('tags', []),             # NEW: JSON List
-                    category=data['category'],
-                    link=data['link'],
-                    embedding=embedding
-                )
-                session.add(new_scheme)
-                await session.commit()
-                print(f"   ✅ Saved with Pro Fields. Waiting 10s for next call...")
-                await asyncio.sleep(10) # Cooldown preserved
+        result = await session.execute(
+            select(Scheme.id, Scheme.name, Scheme.content_hash, *[getattr(Scheme, c) for c in CARD_FIELDS])
+        )
+        existing = {}
+        duplicate_ids = []
+        for row in result.all():
+            if row.name in existing:
+                duplicate_ids.append(row.id)
             else:
-                print(f"   ⏭️ Skipping {name} due to repeated API failures.")
+                existing[row.name] = row
+
+    # 1. Diff: kya naya hai, kya badla, kya hata
+    to_embed = []        # (data, embedding_text, hash, existing_row or None)
+    field_updates = []   # {"id": ..., card fields}
+    unchanged = 0
+    seen = set()
+    for data in schemes_data:
+        seen.add(data['name'])
+        embedding_text = build_embedding_text(data)
+        digest = content_hash(embedding_text)
+        row = existing.get(data['name'])
+
+        if row is None or force or row.content_hash != digest:
+            to_embed.append((data, embedding_text, digest, row))
+            continue
+
+        values = scheme_row(data)
+        if any(getattr(row, c) != values[c] for c in CARD_FIELDS):
+            field_updates.append({"id": row.id, **values})
+        else:
+            unchanged += 1
+
+    removed_ids = [row.id for name, row in existing.items() if name not in seen] + duplicate_ids
+    print(f"📋 {len(to_embed)} to embed, {len(field_updates)} field-only updates, "
+          f"{len(removed_ids)} to delete, {unchanged} unchanged")
+
+    # 2. Sirf naye/badle schemes ke embeddings (transaction ke bahar, slow network part)
+    vectors = await embed_all([t for _, t, _, _ in to_embed])
+
+    inserts, embed_updates, skipped = [], [], 0
+    for (data, _, digest, row), vector in zip(to_embed, vectors):
+        if vector is None:
+            skipped += 1
+            continue
+        values = {**scheme_row(data), "embedding": vector, "content_hash": digest}
+        if row is None:
+            inserts.append(values)
+        else:
+            embed_updates.append({"id": row.id, **values})
+
+    # 3. Ek hi transaction: live search kabhi half-empty table nahi dekhega
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            if inserts:
+                await session.execute(insert(Scheme), inserts)
+            if embed_updates:
+                await session.execute(update(Scheme), embed_updates)
+            if field_updates:
+                await session.execute(update(Scheme), field_updates)
+            if removed_ids:
+                await session.execute(delete(Scheme).where(Scheme.id.in_(removed_ids)))
+
+    print(f"\n🔥 SEEDING COMPLETED: {len(inserts)} inserted, {len(embed_updates)} re-embedded, "
+          f"{len(field_updates)} updated, {len(removed_ids)} deleted, {unchanged} unchanged")
+    if skipped:
+        print(f"   ⚠️ {skipped} schemes kept their previous state after embedding failures; re-run to retry.")
 
-    print("\n🔥 PRO SEEDING PROCESS COMPLETED!")
+    if inserts or embed_updates or field_updates or removed_ids:
+        # updated_at/count badla: har running worker agle SCHEME_INDEX_POLL_SECONDS mein reload karega
+        print("🔄 Running servers will pick up the changes on their next index version check.")
+    return {"inserted": len(inserts), "re_embedded": len(embed_updates), "updated": len(field_updates),
+            "deleted": len(removed_ids), "unchanged": unchanged, "skipped": skipped}
 
 if __name__ == "__main__":
-    asyncio.run(seed_schemes())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Incrementally sync data/schemes.json into Postgres with Gemini embeddings")
+    parser.add_argument("--force", action="store_true", help="rewrite every scheme even if its content hash is unchanged (vectors still come from the embedding cache)")
+    args = parser.parse_args()
+    asyncio.run(seed_schemes(force=args.force))
@@ -37,31 +37,20 @@ async def seed_schemes():
 
         print(f"Found {len(schemes_data)} schemes to insert.")
 
-        for scheme_data in schemes_data:
+        # Construct rich text for embedding
+        texts_to_embed = [
+            f"{scheme_data['name']}. {scheme_data['description']}. {scheme_data['benefits']}. Category: {scheme_data['category']}."
+            for scheme_data in schemes_data
+        ]
+
+        # Batched + concurrent; retry/backoff JinaService ke andar hota hai
+        embeddings = await jina_service.embed_texts(texts_to_embed, task="retrieval.passage")
+
+        for scheme_data, embedding in zip(schemes_data, embeddings):
             print(f"Processing: {scheme_data['name']}")
-            
-            # Generate embedding with retry logic
-            max_retries = 3
-            embedding = None
-            
-            # Construct rich text for embedding
-            text_to_embed = f"{scheme_data['name']}. {scheme_data['description']}. {scheme_data['benefits']}. Category: {scheme_data['category']}."
 
-            for attempt in range(max_retries):
-                try:
-                    # Use Jina service with 'retrieval.passage' task
-                    embedding = await jina_service.embed_text(
-                        text=text_to_embed,
-                        task="retrieval.passage"
-                    )
-                    if embedding:
-                        break
-                except Exception as e:
-                    print(f"  Attempt {attempt + 1} failed: {e}. Retrying in 2s...")
-                    await asyncio.sleep(2)
-            
             if not embedding:
-                print(f"  Failed to generate embedding for {scheme_data['name']} after {max_retries} attempts. Skipping.")
+                print(f"  Failed to generate embedding for {scheme_data['name']}. Skipping.")
                 continue
 
             # Create Scheme object
@@ -81,5 +70,7 @@ async def seed_schemes():
         await session.commit()
         print("Seeding completed successfully!")
 
+    await jina_service.aclose()
+
 if __name__ == "__main__":
     asyncio.run(seed_schemes())
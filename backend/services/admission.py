@@ -0,0 +1,169 @@
+"""
+Admission control for the chat endpoints.
+
+1. Per-user (ya per-session) token bucket: quota se zyada requests turant 429.
+2. Bounded concurrency: ek time par max CHAT_MAX_CONCURRENT graph executions.
+3. Fair queue: slot khali hone par users round-robin mein aage badhte hain, taaki
+   ek heavy user baaki sab ko starve na kare.
+4. Queue wait CHAT_QUEUE_BUDGET se zyada ho toh 429 + Retry-After, warna overload
+   mein saari requests provider timeouts tak latak kar fail hoti hain.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+
+from services.cache import LRUCache
+from services.rate_limiter import TokenBucket
+from services.metrics import ADMISSION_DECISIONS, ADMISSION_WAIT, ADMISSION_ACTIVE, ADMISSION_QUEUED
+
+
+class AdmissionRejected(Exception):
+    """Request turned away; retry_after is in seconds (for the Retry-After header)."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"{reason} (retry after {retry_after:.1f}s)")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class AdmissionController:
+    def __init__(self):
+        self.enabled = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+        self.max_concurrent = int(os.getenv("CHAT_MAX_CONCURRENT", "32"))
+        self.max_queue = int(os.getenv("CHAT_MAX_QUEUE", "256"))
+        # Seconds: isse zyada queue mein wait = 429
+        self.queue_budget = float(os.getenv("CHAT_QUEUE_BUDGET", "10"))
+        # Per user/session quota (token bucket)
+        self.rate_per_minute = float(os.getenv("CHAT_RATE_PER_MINUTE", "20"))
+        self.burst = float(os.getenv("CHAT_BURST", "5"))
+        self.buckets = LRUCache(maxsize=int(os.getenv("CHAT_RATE_TRACKED_KEYS", "10000")))
+
+        self.active = 0
+        # key -> FIFO of waiter futures; OrderedDict order = round-robin turn
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self._queued = 0
+        # EWMA of slot hold time, Retry-After estimate ke liye
+        self._avg_service = 1.0
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate=self.rate_per_minute / 60.0, capacity=self.burst)
+            self.buckets.set(key, bucket)
+        return bucket
+
+    def _estimated_wait(self) -> float:
+        """Rough time until a newly queued request would get a slot."""
+        return self._avg_service * (self._queued + 1) / max(1, self.max_concurrent)
+
+    def _grant_next(self):
+        """Hands a free slot to the next waiting key (round-robin across keys)."""
+        while self._waiting and self.active < self.max_concurrent:
+            key, waiters = next(iter(self._waiting.items()))
+            waiter = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._waiting.move_to_end(key)
+            else:
+                del self._waiting[key]
+            if waiter.done():
+                continue
+            self.active += 1
+            waiter.set_result(True)
+
+    def _withdraw(self, key: str, waiter):
+        waiters = self._waiting.get(key)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            self._queued -= 1
+            if not waiters:
+                del self._waiting[key]
+
+    def _release(self, held_for: float):
+        self.active -= 1
+        self._avg_service = 0.8 * self._avg_service + 0.2 * held_for
+        self._grant_next()
+
+    async def acquire(self, key: str, quota_key: str = None):
+        """
+        Waits for a slot and returns an idempotent release() callable.
+        `key` = fair-queue turn, `quota_key` = token bucket (default: same as key).
+        Raises AdmissionRejected when the quota is spent, the queue is full,
+        or the wait would exceed the queue budget.
+        """
+        if not self.enabled:
+            return lambda: None
+
+        bucket = self._bucket(quota_key or key)
+        if not bucket.try_acquire():
+            ADMISSION_DECISIONS.labels("rate_limited").inc()
+            raise AdmissionRejected("rate_limited", bucket.retry_after())
+
+        start = time.monotonic()
+        if self.active < self.max_concurrent and not self._waiting:
+            self.active += 1
+            ADMISSION_DECISIONS.labels("admitted").inc()
+        else:
+            if self._queued >= self.max_queue or self._estimated_wait() > self.queue_budget * 2:
+                ADMISSION_DECISIONS.labels("queue_full").inc()
+                raise AdmissionRejected("overloaded", self._estimated_wait())
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiting.setdefault(key, deque()).append(waiter)
+            self._queued += 1
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_budget)
+            except asyncio.TimeoutError:
+                if waiter.done():
+                    # Timeout ke saath hi slot mil gaya - use karo, wapas mat karo
+                    pass
+                else:
+                    self._withdraw(key, waiter)
+                    waiter.cancel()
+                    ADMISSION_DECISIONS.labels("queue_timeout").inc()
+                    raise AdmissionRejected("overloaded", self._estimated_wait())
+            except asyncio.CancelledError:
+                # Client chala gaya: mila hua slot aage do, warna queue se naam hata do
+                if waiter.done() and not waiter.cancelled():
+                    self._release(0.0)
+                else:
+                    self._withdraw(key, waiter)
+                    waiter.cancel()
+                raise
+            ADMISSION_DECISIONS.labels("queued").inc()
+
+        ADMISSION_WAIT.observe(time.monotonic() - start)
+        granted_at = time.monotonic()
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self._release(time.monotonic() - granted_at)
+
+        return release
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "active": self.active,
+            "queued": self._queued,
+            "max_concurrent": self.max_concurrent,
+            "avg_service_s": round(self._avg_service, 3),
+        }
+
+
+admission_controller = AdmissionController()
+ADMISSION_ACTIVE.set_function(lambda: admission_controller.active)
+ADMISSION_QUEUED.set_function(lambda: admission_controller.queued)
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import uuid
+from typing import Any, Awaitable, Dict, List, Optional
+
+from services.cache import LRUCache
+from services.metrics import SCHEME_ANALYSIS_OUTCOMES
+
+
+def apply_patch(schemes: List[Dict[str, Any]], patch: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Merges a ready analysis patch into cards: scores/explanations by id, patch order first."""
+    updates = {str(item["id"]): item for item in patch.get("schemes", [])}
+    order = list(updates)
+    merged = [{**card, **updates.get(str(card["id"]), {})} for card in schemes]
+    return sorted(merged, key=lambda c: order.index(str(c["id"])) if str(c["id"]) in order else len(order))
+
+
+class PendingAnalysisStore:
+    """
+    Two-phase scheme responses: cards turant chale jaate hain, LLM analysis
+    (scores, explanations, order, summary) background task mein chalta hai.
+    Result yahan analysis_id ke against rehta hai - SSE stream us par wait karta
+    hai, non-streaming client GET /api/chat/analysis/{id} se poll karta hai.
+    """
+
+    def __init__(self):
+        self.ttl = float(os.getenv("SCHEME_ANALYSIS_TTL", "300"))
+        # SSE stream analysis ka kitni der wait kare (phir "pending" event, client poll kare)
+        self.stream_wait = float(os.getenv("SCHEME_ANALYSIS_STREAM_WAIT", "15"))
+        self._entries = LRUCache(maxsize=int(os.getenv("SCHEME_ANALYSIS_MAX_PENDING", "1000")), ttl=self.ttl)
+        # Running tasks ka strong reference (LRU se evict ho jaayein tab bhi GC na kare)
+        self._running = set()
+
+    def submit(self, analysis: Awaitable[Dict[str, Any]]) -> str:
+        """Starts the analysis in the background and returns its id."""
+        analysis_id = uuid.uuid4().hex
+        task = asyncio.ensure_future(analysis)
+        self._running.add(task)
+        task.add_done_callback(self._finished)
+        self._entries.set(analysis_id, task)
+        return analysis_id
+
+    def _finished(self, task: asyncio.Task):
+        self._running.discard(task)
+        if task.cancelled():
+            SCHEME_ANALYSIS_OUTCOMES.labels("cancelled").inc()
+        elif task.exception() is not None:
+            print(f"⚠️ Scheme analysis failed (local scores stand): {task.exception()}")
+            SCHEME_ANALYSIS_OUTCOMES.labels("failed").inc()
+        else:
+            SCHEME_ANALYSIS_OUTCOMES.labels("ready").inc()
+
+    def poll(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """{"status": pending|ready|failed, ...patch} or None for an unknown/expired id."""
+        task = self._entries.get(analysis_id)
+        if task is None:
+            return None
+        if not task.done():
+            return {"analysis_id": analysis_id, "status": "pending"}
+        if task.cancelled() or task.exception() is not None:
+            return {"analysis_id": analysis_id, "status": "failed"}
+        return {"analysis_id": analysis_id, "status": "ready", **task.result()}
+
+    async def wait(self, analysis_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Like poll(), but waits up to `timeout` seconds for a pending analysis."""
+        task = self._entries.get(analysis_id)
+        if task is not None and not task.done():
+            # asyncio.wait timeout/cancel par task cancel nahi karta - poll karne walon ke liye chalta rahe
+            await asyncio.wait({task}, timeout=timeout)
+        return self.poll(analysis_id)
+
+    def stats(self) -> dict:
+        return {"tracked": len(self._entries), "running": len(self._running)}
+
+
+scheme_analysis_store = PendingAnalysisStore()
@@ -0,0 +1,44 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from jose import JWTError, jwt
+
+# Tokens issue karne wala service same secret/algorithm use kare
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+# Scripts/ops ke liye shared secret (X-Admin-Token header); unset = sirf admin JWT
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """Verified JWT claims, or None if the token is missing, invalid or expired (or no secret is configured)."""
+    if not token or not JWT_SECRET_KEY:
+        return None
+    try:
+        return jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        return None
+
+
+def bearer_claims(request: Request) -> Optional[dict]:
+    """Claims of the request's `Authorization: Bearer <jwt>` header, if valid."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    return decode_token(token.strip())
+
+
+def require_admin(request: Request) -> None:
+    """Dependency for operational endpoints: shared admin token or a JWT with role=admin."""
+    supplied = request.headers.get("x-admin-token")
+    if supplied and ADMIN_API_TOKEN and hmac.compare_digest(supplied, ADMIN_API_TOKEN):
+        return
+    claims = bearer_claims(request)
+    if claims is None:
+        if supplied or request.headers.get("authorization"):
+            raise HTTPException(status_code=403, detail="Invalid admin credentials.")
+        raise HTTPException(status_code=401, detail="Admin credentials required.")
+    if claims.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin role required.")
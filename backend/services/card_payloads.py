@@ -0,0 +1,103 @@
+from typing import Any, Dict, Iterable, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+
+from schemas import SchemeResponse
+
+# Static card fields (frontend SchemeCard); baaki keys (relevance_score, explanation) per-request overlay hain
+CARD_KEYS = ("id", "name", "category", "description", "benefits", "eligibility_criteria",
+             "required_documents", "application_mode", "link", "tags")
+# Purani rows mein yeh JSON columns string ho sakte hain
+JSON_FIELDS = ("benefits", "eligibility_criteria", "required_documents", "tags")
+
+
+def _parse(value):
+    if isinstance(value, str):
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return value
+    return value
+
+
+def normalize_card(card: Dict[str, Any]) -> Dict[str, Any]:
+    """Row dict -> SchemeResponse input: JSON strings parsed, same defaults as the agent's card mapping."""
+    normalized = {**card, **{field: _parse(card.get(field)) for field in JSON_FIELDS}}
+    normalized["category"] = card.get("category") or "Business"
+    normalized["application_mode"] = str(card.get("application_mode") or "Online/Offline")
+    return normalized
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; bytes content is treated as already-encoded JSON."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return orjson.dumps(content)
+
+
+class SchemeCardCache:
+    """
+    Catalogue-level cache of scheme card payloads, keyed by scheme id (str).
+    Index load par har card ek baar schemas.SchemeResponse se validate aur orjson
+    se serialize hota hai; request path par na safe_parse, na validation, na
+    static fields ka re-encode - sirf cached bytes + per-request overlay splice.
+    """
+
+    def __init__(self):
+        self._cards: Dict[str, Dict[str, Any]] = {}
+        # Serialized card bina closing "}" ke, taaki overlay seedha append ho sake
+        self._prefixes: Dict[str, bytes] = {}
+        self.invalid = 0
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def build(self, cards: Iterable[Dict[str, Any]]) -> None:
+        payloads, prefixes, invalid = {}, {}, 0
+        for card in cards:
+            try:
+                model = SchemeResponse.model_validate(normalize_card(card))
+            except ValidationError as e:
+                # Invalid row slow path (safe_parse mapping) se serve hoti hai
+                invalid += 1
+                print(f"⚠️ Scheme {card.get('id')} card failed validation: {e.error_count()} error(s)")
+                continue
+            dumped = model.model_dump(mode="json")
+            payload = {key: dumped[key] for key in CARD_KEYS}
+            payload["id"] = str(model.id)
+            payloads[payload["id"]] = payload
+            prefixes[payload["id"]] = orjson.dumps(payload)[:-1]
+
+        # Single assignment swap (request path kabhi half-built cache nahi dekhta)
+        self._cards, self._prefixes, self.invalid = payloads, prefixes, invalid
+
+    def card(self, scheme_id) -> Optional[Dict[str, Any]]:
+        """Shallow copy of the validated card payload, or None if the id isn't cached."""
+        payload = self._cards.get(str(scheme_id))
+        return dict(payload) if payload is not None else None
+
+    def encode(self, card: Dict[str, Any]) -> bytes:
+        """JSON for one card: cached static bytes + its per-request fields."""
+        prefix = self._prefixes.get(str(card.get("id")))
+        if prefix is None:
+            return orjson.dumps(card)
+        overlay = {key: value for key, value in card.items() if key not in CARD_KEYS}
+        if not overlay:
+            return prefix + b"}"
+        return prefix + b"," + orjson.dumps(overlay)[1:]
+
+    def encode_list(self, cards: Iterable[Dict[str, Any]]) -> bytes:
+        return b"[" + b",".join(self.encode(card) for card in cards) + b"]"
+
+    def encode_with_schemes(self, fields: Dict[str, Any], cards: Iterable[Dict[str, Any]]) -> bytes:
+        """JSON object of `fields` plus a "schemes" array spliced from cached card bytes."""
+        head = orjson.dumps(fields)
+        joiner = b"," if len(head) > 2 else b""
+        return head[:-1] + joiner + b'"schemes":' + self.encode_list(cards) + b"}"
+
+
+scheme_card_cache = SchemeCardCache()
@@ -1,36 +1,345 @@
-from sqlalchemy import select, distinct, desc
+import os
+import json
+import base64
+import asyncio
+from sqlalchemy import select, distinct, desc, insert, case, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import aliased
 from sqlalchemy.sql import func
 from sqlalchemy.ext.asyncio import AsyncSession
-from models import ChatHistory
-from datetime import datetime
+from models import ChatHistory, ChatSession
+from database import AsyncSessionLocal
+from services.metrics import track, HISTORY_ROWS_WRITTEN, HISTORY_ROWS_DROPPED, HISTORY_QUEUE_DEPTH
+from datetime import datetime, timezone
+
+SESSION_TITLE_CHARS = 60
+
+def session_title(content: str) -> str:
+    return " ".join((content or "").split())[:SESSION_TITLE_CHARS]
+
+def encode_cursor(*values) -> str:
+    """Opaque keyset cursor (urlsafe base64 JSON); datetimes as ISO strings."""
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode()
+
+def decode_cursor(cursor: str) -> list:
+    """Inverse of encode_cursor (first value is a datetime); raises ValueError if malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return [datetime.fromisoformat(values[0]), *values[1:]]
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
 
 class ChatHistoryService:
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        # Write-behind: messages memory queue mein, background task batch mein insert karta hai
+        self.write_behind = os.getenv("CHAT_HISTORY_WRITE_BEHIND", "true").lower() == "true"
+        self.flush_size = int(os.getenv("CHAT_HISTORY_FLUSH_SIZE", "100"))
+        self.flush_interval = float(os.getenv("CHAT_HISTORY_FLUSH_INTERVAL", "0.5"))
+        self.max_queue = int(os.getenv("CHAT_HISTORY_MAX_QUEUE", "10000"))
+        # Itni baar lagataar batch fail ho toh row-by-row, jo row phir bhi fail ho woh drop
+        self.max_retries = int(os.getenv("CHAT_HISTORY_MAX_RETRIES", "3"))
+        self._retries = 0
+        self._queue = []
+        self._wakeup = None
+        self._flush_lock = None
+        self._task = None
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> dict:
+        return {
+            "write_behind": self.running,
+            "queue_depth": self.queue_depth,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failures": self.failures,
+            "dropped": self.dropped,
+        }
+
+    async def start(self):
+        """Starts the background flusher (lifespan startup)."""
+        if not self.write_behind or self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stops the flusher and writes whatever is still queued (lifespan shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._queue:
+            await self.flush()
+        if self._queue:
+            print(f"❌ Chat history: {len(self._queue)} messages could not be written on shutdown.")
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._queue:
+                await self.flush()
+
+    async def flush(self) -> int:
+        """Writes queued messages as one multi-row INSERT; returns rows written."""
+        if not self._queue:
+            return 0
+        lock = self._flush_lock or asyncio.Lock()
+        async with lock:
+            batch, self._queue = self._queue, []
+            if not batch:
+                return 0
+            try:
+                await self._write(batch)
+            except Exception as e:
+                self.failures += 1
+                self._retries += 1
+                if self._retries <= self.max_retries:
+                    # Order bana rahe isliye failed batch queue ke aage wapas
+                    self._queue = batch + self._queue
+                    self._enforce_cap()
+                    print(f"❌ Chat history flush failed ({len(batch)} messages re-queued, "
+                          f"attempt {self._retries}/{self.max_retries}): {e}")
+                    return 0
+                # Retries khatam: ek poison row poori queue block na kare - row by row likho
+                self._retries = 0
+                print(f"❌ Chat history flush failed {self.max_retries + 1} times, retrying row by row: {e}")
+                return await self._write_rows(batch)
+            self._retries = 0
+            self.flushed += len(batch)
+            self.batches += 1
+            HISTORY_ROWS_WRITTEN.inc(len(batch))
+            return len(batch)
+
+    async def _write(self, rows: list):
+        """One transaction: history rows + their chat_sessions upserts."""
+        async with track("postgres", "history_flush"), self.session_factory() as db:
+            await db.execute(insert(ChatHistory).values(rows))
+            await self._upsert_sessions(db, rows)
+            await db.commit()
+
+    async def _write_rows(self, rows: list) -> int:
+        """Dead-letter path: each row in its own transaction; rows that still fail are logged and dropped."""
+        written = 0
+        for row in rows:
+            try:
+                await self._write([row])
+                written += 1
+            except Exception as e:
+                self.dropped += 1
+                HISTORY_ROWS_DROPPED.labels("write_failed").inc()
+                print(f"❌ Chat history row dropped (session={row['session_id']}, role={row['role']}, "
+                      f"user_id={row.get('user_id')}): {e}")
+        if written:
+            self.flushed += written
+            self.batches += 1
+            HISTORY_ROWS_WRITTEN.inc(written)
+        return written
+
+    def _enforce_cap(self):
+        """Keeps the queue at max_queue by dropping the oldest rows (DB down for too long)."""
+        overflow = len(self._queue) - self.max_queue
+        if overflow > 0:
+            del self._queue[:overflow]
+            self.dropped += overflow
+            HISTORY_ROWS_DROPPED.labels("queue_full").inc(overflow)
+            print(f"❌ Chat history queue full: dropped {overflow} oldest messages")
+
+    async def add_message(self, session_id: str, role: str, content: str, user_id: int = None):
+        """
+        Request path ke liye: flusher chal raha ho toh sirf queue mein daalta hai
+        (DB commit ka wait nahi), warna seedha save_message.
+        """
+        if not self.running:
+            async with self.session_factory() as db:
+                return await self.save_message(db, session_id, role, content, user_id)
+
+        # Timestamp abhi lagao, flush time par nahi - warna user/assistant order bigad sakta hai
+        self._queue.append({
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "user_id": user_id,
+            "timestamp": datetime.now(timezone.utc),
+        })
+        if len(self._queue) >= self.max_queue:
+            # Backpressure: DB peeche reh gaya toh producer khud flush ka wait kare
+            await self.flush()
+            # Flush bhi fail hua toh queue bina limit ke nahi badhti
+            self._enforce_cap()
+        elif len(self._queue) >= self.flush_size:
+            self._wakeup.set()
+
+    async def _upsert_sessions(self, db: AsyncSession, rows: list):
+        """Folds a batch of history rows into chat_sessions (one upsert row per session)."""
+        sessions = {}
+        for row in rows:
+            entry = sessions.setdefault(row["session_id"], {
+                "session_id": row["session_id"],
+                "user_id": row.get("user_id"),
+                "title": None,
+                "message_count": 0,
+                "last_activity": row["timestamp"],
+            })
+            entry["message_count"] += 1
+            entry["last_activity"] = max(entry["last_activity"], row["timestamp"])
+            entry["user_id"] = entry["user_id"] or row.get("user_id")
+            if entry["title"] is None and row["role"] == "user":
+                entry["title"] = session_title(row["content"])
+
+        dialect_insert = sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+        stmt = dialect_insert(ChatSession).values(list(sessions.values()))
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ChatSession.session_id],
+            set_={
+                "message_count": ChatSession.message_count + excluded.message_count,
+                # Dusre worker ka purana batch baad mein aaye toh last_activity peeche na jaaye
+                "last_activity": case(
+                    (excluded.last_activity > ChatSession.last_activity, excluded.last_activity),
+                    else_=ChatSession.last_activity
+                ),
+                "title": func.coalesce(ChatSession.title, excluded.title),
+                "user_id": func.coalesce(ChatSession.user_id, excluded.user_id),
+            }
+        )
+        await db.execute(stmt)
+
+    async def backfill_sessions(self, db: AsyncSession) -> int:
+        """
+        One-time migration: chat_sessions khaali ho aur chat_history mein data ho
+        toh purane sessions ki summary rows bana deta hai.
+        """
+        has_sessions = (await db.execute(select(ChatSession.session_id).limit(1))).first()
+        if has_sessions:
+            return 0
+
+        outer = aliased(ChatHistory)
+        first_user_message = (
+            select(func.substr(ChatHistory.content, 1, SESSION_TITLE_CHARS))
+            .where(ChatHistory.session_id == outer.session_id, ChatHistory.role == "user")
+            .order_by(ChatHistory.timestamp.asc(), ChatHistory.id.asc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        summary = (
+            select(
+                outer.session_id,
+                func.max(outer.user_id),
+                first_user_message,
+                func.count(outer.id),
+                func.min(outer.timestamp),
+                func.max(outer.timestamp),
+            )
+            .where(outer.session_id.is_not(None))
+            .group_by(outer.session_id)
+        )
+        result = await db.execute(
+            insert(ChatSession).from_select(
+                ["session_id", "user_id", "title", "message_count", "created_at", "last_activity"],
+                summary
+            )
+        )
+        await db.commit()
+        if result.rowcount:
+            print(f"✅ Backfilled {result.rowcount} chat sessions from chat_history.")
+        return result.rowcount or 0
+
     async def save_message(self, db: AsyncSession, session_id: str, role: str, content: str, user_id: int = None):
         message = ChatHistory(
             session_id=session_id,
             role=role,
             content=content,
-            user_id=user_id
+            user_id=user_id,
+            timestamp=datetime.now(timezone.utc)
         )
         db.add(message)
-        await db.commit()
-        await db.refresh(message)
+        await self._upsert_sessions(db, [{
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "user_id": user_id,
+            "timestamp": message.timestamp,
+        }])
+        async with track("postgres", "history_insert"):
+            await db.commit()
+            await db.refresh(message)
+        HISTORY_ROWS_WRITTEN.inc()
         return message
 
-    async def get_session_history(self, db: AsyncSession, session_id: str):
-        stmt = select(ChatHistory).where(ChatHistory.session_id == session_id).order_by(ChatHistory.timestamp.asc())
-        result = await db.execute(stmt)
-        return result.scalars().all()
-
-    async def get_user_sessions(self, db: AsyncSession, user_id: int = None):
-        # Simplify: Get unique session IDs ordered by their latest activity
-        stmt = (
-            select(ChatHistory.session_id)
-            .group_by(ChatHistory.session_id)
-            .order_by(func.max(ChatHistory.timestamp).desc())
-        )
-        
-        result = await db.execute(stmt)
-        return result.scalars().all()
+    async def get_session_history(self, db: AsyncSession, session_id: str, limit: int = 50, cursor: str = None):
+        """
+        Keyset-paginated history, newest page first: returns (messages oldest->newest, next_cursor).
+        next_cursor isse purane messages ka page laata hai; None matlab shuruaat tak pahunch gaye.
+        """
+        # Read-your-writes: queued messages pehle DB mein
+        await self.flush()
+        stmt = select(ChatHistory).where(ChatHistory.session_id == session_id)
+        if cursor:
+            before_ts, before_id = decode_cursor(cursor)
+            stmt = stmt.where(tuple_(ChatHistory.timestamp, ChatHistory.id) < tuple_(before_ts, before_id))
+        stmt = stmt.order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc()).limit(limit + 1)
+
+        async with track("postgres", "history_read"):
+            result = await db.execute(stmt)
+            messages = result.scalars().all()
+        next_cursor = None
+        if len(messages) > limit:
+            messages = messages[:limit]
+            next_cursor = encode_cursor(messages[-1].timestamp, messages[-1].id)
+        return list(reversed(messages)), next_cursor
+
+    async def get_user_sessions(self, db: AsyncSession, user_id: int = None, limit: int = 20, cursor: str = None):
+        """Sessions by latest activity from chat_sessions: returns (sessions, next_cursor)."""
+        await self.flush()
+        stmt = select(ChatSession)
+        if user_id is not None:
+            stmt = stmt.where(ChatSession.user_id == user_id)
+        if cursor:
+            before_ts, before_id = decode_cursor(cursor)
+            stmt = stmt.where(
+                tuple_(ChatSession.last_activity, ChatSession.session_id) < tuple_(before_ts, before_id)
+            )
+        stmt = stmt.order_by(ChatSession.last_activity.desc(), ChatSession.session_id.desc()).limit(limit + 1)
+
+        async with track("postgres", "sessions_read"):
+            result = await db.execute(stmt)
+            rows = result.scalars().all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].last_activity, rows[-1].session_id)
+        sessions = [
+            {
+                "session_id": row.session_id,
+                "title": row.title,
+                "message_count": row.message_count,
+                "last_activity": row.last_activity,
+            }
+            for row in rows
+        ]
+        return sessions, next_cursor
 
 chat_history_service = ChatHistoryService()
+HISTORY_QUEUE_DEPTH.set_function(lambda: chat_history_service.queue_depth)
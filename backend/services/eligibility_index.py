@@ -0,0 +1,256 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Profile / scheme values jo "sab ke liye" mean karte hain
+OPEN_SOCIAL = {"all", "general", "any", ""}
+OPEN_SECTOR_TOKENS = {"all", "any", "multi", "cross", "sectors", "sector"}
+
+# Region -> aliases jo geography string ya user location mein aa sakte hain
+REGION_ALIASES = {
+    "uttar pradesh": ["uttar pradesh", "up", "noida", "greater noida", "yamuna expressway", "lucknow", "kanpur", "varanasi"],
+    "jammu & kashmir": ["jammu", "kashmir", "j&k"],
+    "northeast": ["northeast", "north east", "ne region", "assam", "meghalaya", "manipur", "mizoram",
+                  "nagaland", "tripura", "arunachal", "sikkim"],
+    "kerala": ["kerala"],
+    "tamil nadu": ["tamil nadu", "tn"],
+}
+
+SOCIAL_ALIASES = {
+    "women": ["women", "woman", "female", "mahila"],
+    "sc": ["sc", "scheduled caste"],
+    "st": ["st", "scheduled tribe"],
+    "obc": ["obc", "backward class", "backward"],
+    "minority": ["minority"],
+    "ews": ["ews"],
+}
+
+_WORD_RE = re.compile(r"[a-z&]+")
+
+def _parse(value):
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+def _words(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall((text or "").lower()) if len(w) >= 3]
+
+def _contains_alias(text: str, alias: str) -> bool:
+    # Word-boundary match taaki "up" "startup" mein match na ho
+    return re.search(rf"(?<![a-z]){re.escape(alias)}(?![a-z])", text) is not None
+
+def regions_in(text: str) -> Set[str]:
+    text = (text or "").lower()
+    return {region for region, aliases in REGION_ALIASES.items()
+            if any(_contains_alias(text, a) for a in aliases)}
+
+def social_groups(values) -> Set[str]:
+    if isinstance(values, str):
+        values = [values]
+    groups = set()
+    for value in values or []:
+        text = str(value).lower().strip()
+        if text in OPEN_SOCIAL:
+            groups.add("all")
+            continue
+        matched = {g for g, aliases in SOCIAL_ALIASES.items() if any(_contains_alias(text, a) for a in aliases)}
+        groups |= matched or {text}
+    return groups
+
+
+def profile_groups(profile: Dict[str, Any]) -> Set[str]:
+    """Social groups a user_profile belongs to (category + gender), without "all"."""
+    groups = social_groups(profile.get("social_category") or profile.get("category") or [])
+    gender = str(profile.get("gender") or "").lower()
+    if gender in ("female", "woman", "women", "f"):
+        groups.add("women")
+    groups.discard("all")
+    return groups
+
+def profile_match(criteria, profile: Optional[Dict[str, Any]]) -> Tuple[float, List[str]]:
+    """
+    Per-scheme eligibility fit for the local relevance scorer: (0..1, reasons).
+    Specific match = 1, open-to-all = 0.5, mismatch = 0; profile mein jo field nahi
+    us par check nahi. Kuch check na ho toh neutral 0.5.
+    """
+    if not profile:
+        return 0.5, []
+    criteria = _parse(criteria) or {}
+    if not isinstance(criteria, dict):
+        criteria = {}
+    checks, reasons = [], []
+
+    groups = profile_groups(profile)
+    if groups:
+        targeted = social_groups(criteria.get("social_category")) - {"all"}
+        if not targeted:
+            checks.append(0.5)
+        elif groups & targeted:
+            checks.append(1.0)
+            names = ", ".join(g if g in ("women", "minority") else g.upper() for g in sorted(groups & targeted))
+            reasons.append(f"Reserved for {names} entrepreneurs like you")
+        else:
+            checks.append(0.0)
+
+    location = profile.get("location") or profile.get("state") or profile.get("geography")
+    if location:
+        regions = regions_in(str(criteria.get("geography") or ""))
+        if not regions:
+            checks.append(0.5)
+        elif regions & regions_in(str(location)):
+            checks.append(1.0)
+            reasons.append(f"Available in {location}")
+        else:
+            checks.append(0.0)
+
+    industry = profile.get("industry") or profile.get("sector")
+    if industry:
+        sector_words = set(_words(str(criteria.get("sector") or "")))
+        if not sector_words or sector_words & OPEN_SECTOR_TOKENS:
+            checks.append(0.5)
+        elif sector_words & set(_words(str(industry))):
+            checks.append(1.0)
+            reasons.append(f"Covers the {industry} sector")
+        else:
+            # Vocabulary mismatch ho sakta hai, isliye pura 0 nahi
+            checks.append(0.25)
+
+    age = profile.get("age")
+    if age is not None:
+        try:
+            # Age sirf disqualify karti hai, match ka signal nahi
+            if int(criteria.get("min_age") or 0) > int(age):
+                checks.append(0.0)
+        except (TypeError, ValueError):
+            pass
+
+    return (sum(checks) / len(checks) if checks else 0.5), reasons
+
+
+class EligibilityIndex:
+    """
+    Precomputed boolean bitmaps over the scheme rows (same row order as the
+    vector/BM25 indexes) for eligibility_criteria: social_category, geography,
+    sector and min_age. mask(profile) ANDs the relevant bitmaps so only
+    eligible rows get scored.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.social_open = None
+        self.social: Dict[str, np.ndarray] = {}
+        self.geo_open = None
+        self.geo: Dict[str, np.ndarray] = {}
+        self.sector_open = None
+        self.sector: Dict[str, np.ndarray] = {}
+        self.min_age = None
+
+    def build(self, cards: Sequence[Dict[str, Any]]) -> None:
+        n = len(cards)
+        social_open = np.zeros(n, dtype=bool)
+        geo_open = np.zeros(n, dtype=bool)
+        sector_open = np.zeros(n, dtype=bool)
+        min_age = np.zeros(n, dtype=np.int16)
+        social, geo, sector = {}, {}, {}
+
+        def bitmap(store, key):
+            if key not in store:
+                store[key] = np.zeros(n, dtype=bool)
+            return store[key]
+
+        for row, card in enumerate(cards):
+            criteria = _parse(card.get("eligibility_criteria")) or {}
+            if not isinstance(criteria, dict):
+                criteria = {}
+
+            groups = social_groups(criteria.get("social_category"))
+            if not groups or "all" in groups:
+                social_open[row] = True
+            for group in groups - {"all"}:
+                bitmap(social, group)[row] = True
+
+            regions = regions_in(str(criteria.get("geography") or ""))
+            if not regions:
+                # India-wide / Rural / Clusters etc. -> kisi state tak restricted nahi
+                geo_open[row] = True
+            for region in regions:
+                bitmap(geo, region)[row] = True
+
+            sector_words = set(_words(str(criteria.get("sector") or "")))
+            if not sector_words or sector_words & OPEN_SECTOR_TOKENS:
+                sector_open[row] = True
+            for word in sector_words:
+                bitmap(sector, word)[row] = True
+
+            try:
+                min_age[row] = int(criteria.get("min_age") or 0)
+            except (TypeError, ValueError):
+                min_age[row] = 0
+
+        self.social_open, self.social = social_open, social
+        self.geo_open, self.geo = geo_open, geo
+        self.sector_open, self.sector = sector_open, sector
+        self.min_age = min_age
+        self.size = n
+
+    @property
+    def is_ready(self) -> bool:
+        return self.size > 0
+
+    def mask(self, profile: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """
+        Boolean mask of eligible rows for a user_profile, or None if the profile
+        has nothing to filter on. Jo field profile mein nahi hai us par filter nahi lagta.
+        """
+        if not profile or not self.is_ready:
+            return None
+
+        mask = np.ones(self.size, dtype=bool)
+        applied = False
+
+        groups = profile_groups(profile)
+        if groups:
+            allowed = self.social_open.copy()
+            for group in groups:
+                if group in self.social:
+                    allowed |= self.social[group]
+            mask &= allowed
+            applied = True
+
+        location = profile.get("location") or profile.get("state") or profile.get("geography")
+        if location:
+            allowed = self.geo_open.copy()
+            for region in regions_in(str(location)):
+                if region in self.geo:
+                    allowed |= self.geo[region]
+            mask &= allowed
+            applied = True
+
+        industry = profile.get("industry") or profile.get("sector")
+        if industry:
+            matched = [self.sector[w] for w in set(_words(str(industry))) if w in self.sector]
+            # Vocabulary match hi nahi hua toh filter mat lagao (galat exclusion se bachne ke liye)
+            if matched:
+                allowed = self.sector_open.copy()
+                for bits in matched:
+                    allowed |= bits
+                mask &= allowed
+                applied = True
+
+        age = profile.get("age")
+        if age is not None:
+            try:
+                mask &= self.min_age <= int(age)
+                applied = True
+            except (TypeError, ValueError):
+                pass
+
+        return mask if applied else None
+
+
+scheme_eligibility_index = EligibilityIndex()
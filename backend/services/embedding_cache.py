@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from services.cache import LRUCache
+from services.metrics import register_cache
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "embeddings.sqlite3")
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache for embedding vectors.
+    Tier 1: in-process LRU (dict lookup, no I/O).
+    Tier 2: SQLite file (WAL mode) keyed by sha256(model + text), vectors stored
+    as float32 blobs. Restart ke baad bhi rehta hai aur saare uvicorn workers
+    same file share karte hain.
+    """
+
+    def __init__(self, path: Optional[str] = None, maxsize: Optional[int] = None):
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.enabled = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.memory = LRUCache(maxsize=maxsize or int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")))
+        self.disk_hits = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{text.strip()}".encode("utf-8")).hexdigest()
+
+    # --- SQLite (blocking, thread pool mein chalta hai) ---
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL,"
+                " vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _read_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            # SQLite variable limit ke andar rehne ke liye chunks
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vec = array("f")
+                    vec.frombytes(blob)
+                    found[key] = vec.tolist()
+        return found
+
+    def _write_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        now = time.time()
+        rows = [(key, model, len(vec), array("f", vec).tobytes(), now) for key, vec in items.items()]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows)
+            conn.commit()
+
+    # --- Async API ---
+
+    async def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Cached vectors in input order; None where both tiers miss."""
+        if not self.enabled:
+            return [None] * len(texts)
+
+        keys = [self.make_key(model, t) for t in texts]
+        results = [self.memory.get(k) for k in keys]
+        missing = [k for k, r in zip(keys, results) if r is None]
+        if not missing:
+            return results
+
+        try:
+            found = await asyncio.to_thread(self._read_many, missing)
+        except Exception as e:
+            print(f"⚠️ Embedding cache read failed: {e}")
+            return results
+
+        for i, key in enumerate(keys):
+            if results[i] is None and key in found:
+                results[i] = found[key]
+                self.memory.set(key, found[key])
+                self.disk_hits += 1
+        return results
+
+    async def get(self, model: str, text: str) -> Optional[List[float]]:
+        return (await self.get_many(model, [text]))[0]
+
+    async def set_many(self, model: str, texts: Sequence[str], vectors: Sequence[List[float]]) -> None:
+        if not self.enabled:
+            return
+        items = {}
+        for text, vec in zip(texts, vectors):
+            if vec:
+                key = self.make_key(model, text)
+                self.memory.set(key, vec)
+                items[key] = vec
+        if not items:
+            return
+        try:
+            await asyncio.to_thread(self._write_many, model, items)
+        except Exception as e:
+            print(f"⚠️ Embedding cache write failed: {e}")
+
+    async def set(self, model: str, text: str, vector: List[float]) -> None:
+        await self.set_many(model, [text], [vector])
+
+    def stats(self) -> dict:
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        return stats
+
+
+embedding_cache = EmbeddingCache()
+register_cache("embedding", embedding_cache.stats)
@@ -1,6 +1,10 @@
 import os
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from dotenv import load_dotenv
+from services.embedding_cache import embedding_cache
+from services.cache import normalize_text
+from services.metrics import track
+from services.single_flight import SingleFlight
 
 load_dotenv()
 
@@ -17,40 +21,97 @@ class GeminiService:
         api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
         if not api_key:
             print("❌ Error: Google API Key not found.")
+        # Local stand-in (load tests) ke liye override; None = Google ka default endpoint
+        base_url = os.getenv("GEMINI_BASE_URL") or None
         
         # 1. Chat Model: Gemini 1.5 Flash (Perfect for your Agent)
         self.llm = ChatGoogleGenerativeAI(
             model="gemini-flash-latest", 
             google_api_key=api_key,
-            temperature=0.7
+            temperature=0.7,
+            base_url=base_url
         )
 
         # 2. Embedding Model: text-embedding-004 (More stable than 001)
         # Yeh 768 dimensions hi return karega.
+        self.embedding_model_name = "models/text-embedding-004"
+        self.embedding_task_type = "retrieval_document"
         self.embeddings_model = GoogleGenerativeAIEmbeddings(
-            model="models/text-embedding-004", # UPDATED
+            model=self.embedding_model_name, # UPDATED
             google_api_key=api_key,
-            task_type="retrieval_document" # Document storage ke liye
+            task_type=self.embedding_task_type, # Document storage ke liye
+            base_url=base_url
         )
+        # Cache key mein model + task type dono, taaki model badalne par purane vectors na milein
+        self.embedding_cache_model = f"{self.embedding_model_name}|{self.embedding_task_type}"
+        # Router centroid + scheme search ek hi query ko saath-saath embed karte hain; ek call kaafi hai.
+        # Key exact text hai (embedding cache jaisa), normalized nahi - case se vector badalta hai
+        self.embed_inflight = SingleFlight("embed_query")
+        self.generate_inflight = SingleFlight("gemini_generate")
+
+    async def complete(self, prompt: str, system_prompt: str = None) -> str:
+        """Raw chat call, errors propagate (LLM pool ka fallback provider yahi use karta hai)."""
+        messages = [("system", system_prompt), ("human", prompt)] if system_prompt else prompt
+        response = await self.llm.ainvoke(messages)
+        # Naye Gemini models content ko parts ki list mein dete hain; .text dono cases sambhalta hai
+        return str(response.text)
 
     async def generate_response(self, prompt: str) -> str:
         """Generates text response for MAYA-AI Agent"""
+        return await self.generate_inflight.do(normalize_text(prompt), lambda: self._generate_response(prompt))
+
+    async def _generate_response(self, prompt: str) -> str:
         try:
-            response = await self.llm.ainvoke(prompt)
-            return response.content
+            async with track("gemini", "generate"):
+                return await self.complete(prompt)
         except Exception as e:
             print(f"❌ Gemini Generation Error: {e}")
             return "MAYA is currently unavailable. Please try again later."
 
     async def get_embeddings(self, text: str):
-        """Generates 768-dim vector for semantic search"""
+        """Generates 768-dim vector for semantic search (cache first)"""
+        cached = await embedding_cache.get(self.embedding_cache_model, text)
+        if cached:
+            return cached
+        return await self.embed_inflight.do(text, lambda: self._embed_query(text))
+
+    async def _embed_query(self, text: str):
         try:
             # LangChain uses aembed_query for a single string
-            embedding = await self.embeddings_model.aembed_query(text)
-            return embedding
+            async with track("gemini", "embed_query"):
+                embedding = await self.embeddings_model.aembed_query(text)
         except Exception as e:
             print(f"❌ Gemini Embedding Error (429/Other): {e}")
             return None
 
+        await embedding_cache.set(self.embedding_cache_model, text, embedding)
+        return embedding
+
+    async def embed_documents(self, texts: list):
+        """
+        Batch embedding (one API call for all uncached texts, same order as input).
+        Unlike get_embeddings_batch, provider errors (e.g. 429) are raised so
+        callers like the seeding pipeline can back off.
+        """
+        vectors = await embedding_cache.get_many(self.embedding_cache_model, texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if not missing:
+            return vectors
+
+        async with track("gemini", "embed_documents"):
+            fresh = await self.embeddings_model.aembed_documents([texts[i] for i in missing])
+        for i, vec in zip(missing, fresh):
+            vectors[i] = vec
+        await embedding_cache.set_many(self.embedding_cache_model, [texts[i] for i in missing], fresh)
+        return vectors
+
+    async def get_embeddings_batch(self, texts: list):
+        """Embeds many strings in a single API call (same order as input); cached ones are skipped"""
+        try:
+            return await self.embed_documents(texts)
+        except Exception as e:
+            print(f"❌ Gemini Batch Embedding Error (429/Other): {e}")
+            return None
+
 # Instance for easy import
 gemini_service = GeminiService()
\ No newline at end of file
@@ -1,27 +1,122 @@
 import os
+import random
+import asyncio
 import httpx
+from dotenv import load_dotenv
+from services.metrics import track, record_error
+
+load_dotenv()
+
+DEFAULT_JINA_URL = "https://api.jina.ai/v1"
+# In par dobara try karna safe hai; baaki 4xx (bad key, bad input) turant fail
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+try:
+    import h2  # noqa: F401  (httpx[http2] extra)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 class JinaService:
     def __init__(self):
         self.api_key = os.getenv("JINA_API_KEY")
-        self.url = "https://api.jina.ai/v1/embeddings"
-
-    async def embed_text(self, text: str):
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        data = {
-            "model": "jina-embeddings-v2-base-en", # Default 1024 dimensions
-            "input": [text]
-        }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(self.url, headers=headers, json=data)
-            if response.status_code == 200:
-                return response.json()['data'][0]['embedding']
-            else:
-                print(f"❌ Jina API Error: {response.status_code} - {response.text}")
+        # Local mock server (benchmarks/offline tests) ke liye override
+        self.base_url = os.getenv("JINA_BASE_URL", DEFAULT_JINA_URL).rstrip("/")
+        self.model = os.getenv("JINA_MODEL", "jina-embeddings-v2-base-en") # Default 768 dimensions
+        self.batch_size = int(os.getenv("JINA_BATCH_SIZE", "64"))
+        self.concurrency = int(os.getenv("JINA_CONCURRENCY", "4"))
+        self.max_retries = int(os.getenv("JINA_MAX_RETRIES", "4"))
+        self.timeout = float(os.getenv("JINA_TIMEOUT", "30"))
+        self._client = None
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/embeddings"
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Ek hi pooled keep-alive client; har call par TCP/TLS handshake nahi
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.api_key}"
+                },
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(max_connections=max(10, self.concurrency * 2),
+                                    max_keepalive_connections=max(5, self.concurrency)),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _retry_delay(attempt: int, response: httpx.Response = None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(30.0, float(retry_after))
+            except ValueError:
+                pass
+        # Exponential backoff with jitter: ~0.5s, 1s, 2s, 4s...
+        return min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def _embed_chunk(self, texts: list, task: str = None) -> list:
+        """One /embeddings call with retry + backoff; returns vectors in input order."""
+        data = {"model": self.model, "input": texts}
+        if task:
+            data["task"] = task  # e.g. retrieval.query / retrieval.passage (v3 models)
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                async with track("jina", "embed"):
+                    response = await self.client.post(self.url, json=data)
+                if response.status_code == 200:
+                    rows = sorted(response.json()['data'], key=lambda r: r.get('index', 0))
+                    return [row['embedding'] for row in rows]
+                # Status error raise nahi hota, isliye track() ise count nahi karta
+                record_error("jina", "embed", f"HTTP {response.status_code}")
+                if response.status_code not in RETRYABLE_STATUS:
+                    print(f"❌ Jina API Error: {response.status_code} - {response.text}")
+                    return None
+                reason = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                reason = f"{type(e).__name__}: {e}"
+
+            if attempt == self.max_retries:
+                print(f"❌ Jina API failed after {attempt + 1} attempts ({reason})")
                 return None
+            delay = self._retry_delay(attempt, response)
+            print(f"⚠️ Jina API {reason}, retrying in {delay:.1f}s (attempt {attempt + 1})")
+            await asyncio.sleep(delay)
+
+    async def embed_texts(self, texts: list, task: str = None) -> list:
+        """
+        Batch embeddings: texts ko JINA_BATCH_SIZE ke chunks mein baant kar
+        JINA_CONCURRENCY parallel calls se embed karta hai.
+        Returns one vector per text, in order (None where a chunk failed).
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        vectors = [None] * len(texts)
+
+        async def run(start: int):
+            chunk = texts[start:start + self.batch_size]
+            async with semaphore:
+                result = await self._embed_chunk(chunk, task)
+            if result and len(result) == len(chunk):
+                vectors[start:start + len(chunk)] = result
+
+        await asyncio.gather(*[run(start) for start in range(0, len(texts), self.batch_size)])
+        return vectors
+
+    async def embed_text(self, text: str, task: str = None):
+        result = await self._embed_chunk([text], task)
+        return result[0] if result else None
 
 # --- YE LINE ADD KARNA SABSE ZAROORI HAI ---
-jina_service = JinaService()
\ No newline at end of file
+jina_service = JinaService()
@@ -0,0 +1,117 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-/][a-z0-9]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from", "how",
+    "i", "in", "is", "it", "me", "my", "of", "on", "or", "the", "to", "what", "which",
+    "with", "about", "any", "tell", "there", "this", "under", "who", "get", "want",
+}
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens. Hyphen/slash wale words ke parts + joined form dono
+    emit hote hain: "Stand-Up" -> ["stand", "up", "standup"], "SC/ST" -> ["sc", "st", "scst"].
+    """
+    tokens = []
+    for match in _TOKEN_RE.findall((text or "").lower()):
+        parts = re.split(r"[-/]", match)
+        if len(parts) > 1:
+            tokens.extend(parts)
+            tokens.append("".join(parts))
+        else:
+            tokens.append(match)
+    return [t for t in tokens if t not in STOPWORDS]
+
+
+def scheme_search_text(card: Dict[str, Any]) -> str:
+    """Text indexed for a scheme: name (boosted x2), description, benefits, tags."""
+    def as_text(value):
+        if isinstance(value, (list, tuple)):
+            return " ".join(str(v) for v in value)
+        return str(value or "")
+
+    name = card.get("name") or ""
+    return " ".join([name, name, as_text(card.get("description")),
+                     as_text(card.get("benefits")), as_text(card.get("tags"))])
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index (term -> [(row, tf)])."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.idf: Dict[str, float] = {}
+        self.doc_len: Optional[np.ndarray] = None
+        self.avg_len = 0.0
+        self.size = 0
+
+    @property
+    def is_ready(self) -> bool:
+        return self.size > 0
+
+    def build(self, documents: Sequence[str]) -> None:
+        postings = defaultdict(list)
+        lengths = []
+        for row, doc in enumerate(documents):
+            tokens = tokenize(doc)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((row, tf))
+
+        n = len(documents)
+        idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in postings.items()
+        }
+
+        doc_len = np.asarray(lengths, dtype=np.float32)
+        # Swap at the end so searches never see a half-built index
+        self.postings, self.idf, self.doc_len = dict(postings), idf, doc_len
+        self.avg_len = float(doc_len.mean()) if n else 0.0
+        self.size = n
+
+    def search(self, query: str, k: int = 5, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Returns [(row, bm25_score)] best-first; only rows with at least one matching term."""
+        if not self.is_ready or k <= 0:
+            return []
+
+        scores = np.zeros(self.size, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / (self.avg_len or 1.0))
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            rows = np.fromiter((r for r, _ in plist), dtype=np.int64, count=len(plist))
+            tfs = np.fromiter((tf for _, tf in plist), dtype=np.float32, count=len(plist))
+            scores[rows] += self.idf[term] * tfs * (self.k1 + 1) / (tfs + norm[rows])
+
+        if allowed is not None:
+            scores = np.where(allowed, scores, 0.0)
+
+        matched = np.flatnonzero(scores > 0)
+        if matched.size == 0:
+            return []
+        if matched.size > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched])]
+        return [(int(i), float(scores[i])) for i in matched]
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[Sequence[Tuple[int, float]]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fuses ranked [(row, score)] lists: score(row) = sum(1 / (k + rank))."""
+    fused = defaultdict(float)
+    for results in result_lists:
+        for rank, (row, _) in enumerate(results, start=1):
+            fused[row] += 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+scheme_lexical_index = BM25Index()
@@ -0,0 +1,264 @@
+"""
+LLM provider pool: per-provider timeouts, failover, hedged requests and
+circuit breaking behind one complete(prompt, agent) call.
+
+Providers priority order mein try hote hain. Primary slow ho (apne p95 se
+zyada) toh agla provider bhi fire hota hai aur jo pehle jawab de woh jeetta
+hai; baar baar fail hone wala provider kuch der ke liye rotation se bahar.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from services.metrics import track, LLM_HEDGES, PROVIDER_CIRCUIT_OPEN, PROVIDER_QUEUED
+
+
+class ProviderPoolError(Exception):
+    """Every provider failed (or is circuit-open) for this request."""
+
+
+class ProviderUnavailable(Exception):
+    """Provider's circuit was open (or its half-open trial taken) by the time a slot freed up."""
+
+
+class CircuitBreaker:
+    """
+    closed -> (failure_threshold consecutive failures) -> open -> (reset_timeout) -> half_open.
+    half_open mein ek trial request jaati hai: success = closed, failure = phir open.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def available(self) -> bool:
+        """Like allow(), but doesn't claim the half-open trial (for picking a provider)."""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._trial_in_flight)
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self):
+        """Half-open trial was cancelled without a verdict; let the next request try."""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies (seconds)."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LLMProvider:
+    """
+    One completion backend: async complete(prompt, agent) -> str, plus its own
+    timeout/breaker/stats. max_concurrency provider ke rate limit ke hisaab se
+    in-flight calls bound karta hai; baaki slot ka wait karti hain (timeout slot milne ke baad shuru).
+    """
+
+    def __init__(self, name: str, complete: Callable[[str, Optional[str]], Awaitable[str]],
+                 timeout: float = 30.0, breaker: CircuitBreaker = None, window: int = 200,
+                 max_concurrency: Optional[int] = None):
+        self.name = name
+        self._complete = complete
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker(window)
+        self.calls = 0
+        self.failures = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Concurrency slot for one call (no-op without max_concurrency)."""
+        if self._semaphore is None:
+            yield
+            return
+        gauge = PROVIDER_QUEUED.labels(self.name)
+        gauge.inc()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            gauge.dec()
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    async def complete(self, prompt: str, agent: Optional[str] = None) -> str:
+        async with self.slot():
+            # Half-open trial slot milne ke baad claim hota hai: slot ke wait mein cancel
+            # (hedge haara, caller gaya) hua toh trial kabhi atka nahi rehta
+            if not self.breaker.allow():
+                raise ProviderUnavailable(f"{self.name} circuit is open")
+            return await self._timed_complete(prompt, agent)
+
+    async def _timed_complete(self, prompt: str, agent: Optional[str] = None) -> str:
+        self.calls += 1
+        start = time.perf_counter()
+        try:
+            async with track(self.name, "completion", agent):
+                text = await asyncio.wait_for(self._complete(prompt, agent), timeout=self.timeout)
+            if not text:
+                raise ValueError(f"{self.name} returned an empty completion")
+        except asyncio.CancelledError:
+            # Hedge haar gaya ya caller chala gaya - provider ki galti nahi
+            self.breaker.release_trial()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(time.perf_counter() - start)
+        return text
+
+    def record_success(self, seconds: Optional[float] = None):
+        """Also used by callers that talk to the provider directly (e.g. streaming)."""
+        if seconds is not None:
+            self.latency.add(seconds)
+        self.breaker.record_success()
+        PROVIDER_CIRCUIT_OPEN.labels(self.name).set(0)
+
+    def record_failure(self):
+        self.failures += 1
+        self.breaker.record_failure()
+        PROVIDER_CIRCUIT_OPEN.labels(self.name).set(int(self.breaker.opened_at is not None))
+
+    def stats(self) -> dict:
+        p50, p95 = self.latency.quantile(0.5), self.latency.quantile(0.95)
+        return {
+            "state": self.breaker.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class LLMProviderPool:
+    def __init__(self, providers: List[LLMProvider], hedging: bool = True, hedge_quantile: float = 0.95,
+                 hedge_min_delay: float = 1.0, hedge_max_delay: float = 10.0, hedge_min_samples: int = 20):
+        self.providers = providers
+        self.hedging = hedging
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        # Itne samples se pehle p95 bharosemand nahi, max delay use hota hai
+        self.hedge_min_samples = hedge_min_samples
+
+    def hedge_delay(self, provider: LLMProvider) -> float:
+        """How long to wait on `provider` before firing the next one."""
+        if len(provider.latency) < self.hedge_min_samples:
+            return self.hedge_max_delay
+        delay = provider.latency.quantile(self.hedge_quantile)
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, delay))
+
+    def _next_provider(self, tried: List[LLMProvider]) -> Optional[LLMProvider]:
+        for provider in self.providers:
+            if provider not in tried and provider.breaker.available():
+                return provider
+        return None
+
+    def get(self, name: str) -> Optional[LLMProvider]:
+        return next((p for p in self.providers if p.name == name), None)
+
+    async def complete(self, prompt: str, agent: Optional[str] = None, exclude: Sequence[str] = ()) -> str:
+        """
+        First successful completion across providers (minus `exclude`). A failure fails
+        over to the next provider immediately; a slow primary gets hedged after hedge_delay.
+        Raises ProviderPoolError when nothing is left to try.
+        """
+        tried: List[LLMProvider] = [p for p in self.providers if p.name in exclude]
+        running: Dict[asyncio.Task, LLMProvider] = {}
+        hedge_task = None
+        last_error: Optional[BaseException] = None
+
+        def launch() -> Optional[asyncio.Task]:
+            provider = self._next_provider(tried)
+            if provider is None:
+                return None
+            tried.append(provider)
+            task = asyncio.create_task(provider.complete(prompt, agent))
+            running[task] = provider
+            return task
+
+        if launch() is None:
+            raise ProviderPoolError("No LLM provider available (all circuit-open or excluded)")
+
+        try:
+            while running:
+                timeout = None
+                if self.hedging and hedge_task is None and len(running) == 1 and len(tried) < len(self.providers):
+                    timeout = self.hedge_delay(next(iter(running.values())))
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Primary apne p95 se slow - agla provider bhi fire, jo pehle jawab de woh jeete
+                    hedge_task = launch()
+                    if hedge_task is not None:
+                        LLM_HEDGES.labels("fired").inc()
+                    continue
+
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is None:
+                        if hedge_task is not None:
+                            LLM_HEDGES.labels("hedge_won" if task is hedge_task else "primary_won").inc()
+                        return task.result()
+                    last_error = task.exception()
+                    print(f"⚠️ LLM provider {provider.name} failed: {type(last_error).__name__}: {last_error}")
+
+                if not running:
+                    # Failover: koi aur provider bacha ho toh turant (hedge delay ka wait nahi)
+                    launch()
+        finally:
+            for task in running:
+                task.cancel()
+
+        raise ProviderPoolError(f"All LLM providers failed (last error: {last_error!r})")
+
+    def stats(self) -> dict:
+        return {p.name: p.stats() for p in self.providers}
@@ -0,0 +1,164 @@
+"""
+Prometheus metrics for MAYA, exposed on GET /metrics.
+
+Latency histograms per graph node and per provider call (OpenRouter, Gemini,
+Tavily, Postgres), error counters, in-flight gauges, routing decisions and
+cache hit ratios. Caches apne stats() scrape time par dete hain, isliye
+hot path par koi extra counter nahi lagta.
+"""
+import time
+import functools
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# 5ms (cache/index) se 40s (slow LLM) tak
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0)
+
+HTTP_LATENCY = Histogram(
+    "maya_http_request_duration_seconds", "HTTP request latency (until response headers)",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge("maya_http_requests_in_flight", "HTTP requests currently being handled")
+
+NODE_LATENCY = Histogram(
+    "maya_graph_node_duration_seconds", "LangGraph node execution time",
+    ["node"], buckets=LATENCY_BUCKETS
+)
+NODE_ERRORS = Counter("maya_graph_node_errors_total", "LangGraph node failures", ["node", "error"])
+NODE_IN_FLIGHT = Gauge("maya_graph_nodes_in_flight", "LangGraph nodes currently executing", ["node"])
+
+PROVIDER_LATENCY = Histogram(
+    "maya_provider_request_duration_seconds", "Latency of calls to external providers and the database",
+    ["provider", "operation", "agent"], buckets=LATENCY_BUCKETS
+)
+PROVIDER_ERRORS = Counter(
+    "maya_provider_errors_total", "Failed provider/database calls",
+    ["provider", "operation", "agent", "error"]
+)
+PROVIDER_IN_FLIGHT = Gauge("maya_provider_requests_in_flight", "Provider calls in flight", ["provider", "operation"])
+TIME_TO_FIRST_TOKEN = Histogram(
+    "maya_llm_time_to_first_token_seconds", "Streaming LLM latency until the first text delta",
+    ["provider", "agent"], buckets=LATENCY_BUCKETS
+)
+LLM_HEDGES = Counter(
+    "maya_llm_hedges_total", "Hedged LLM requests (fired) and which attempt answered first",
+    ["outcome"]
+)
+PROVIDER_CIRCUIT_OPEN = Gauge("maya_provider_circuit_open", "1 while a provider's circuit breaker is open", ["provider"])
+SINGLE_FLIGHT_CALLS = Counter(
+    "maya_singleflight_calls_total", "Coalesced provider calls: leader = made the call, follower = shared it",
+    ["call", "role"]
+)
+
+ROUTE_DECISIONS = Counter(
+    "maya_route_decisions_total", "Router decisions by target agent and decision source",
+    ["agent", "source"]
+)
+SCHEME_PREFETCH_OUTCOMES = Counter(
+    "maya_scheme_prefetch_total", "Speculative scheme retrievals started alongside routing, by outcome",
+    ["outcome"]
+)
+SCHEME_RERANK_OUTCOMES = Counter(
+    "maya_scheme_rerank_total", "Optional LLM rerank of locally scored scheme cards, by outcome",
+    ["outcome"]
+)
+SCHEME_ANALYSIS_OUTCOMES = Counter(
+    "maya_scheme_analysis_total", "Follow-up (two-phase) scheme analyses, by outcome",
+    ["outcome"]
+)
+ADMISSION_DECISIONS = Counter(
+    "maya_admission_decisions_total",
+    "Chat admission outcomes (admitted, queued, rate_limited, queue_full, queue_timeout)", ["outcome"]
+)
+ADMISSION_WAIT = Histogram("maya_admission_wait_seconds", "Time admitted chat requests spent queued",
+                           buckets=LATENCY_BUCKETS)
+ADMISSION_ACTIVE = Gauge("maya_admission_active", "Chat graph executions holding an admission slot")
+ADMISSION_QUEUED = Gauge("maya_admission_queued", "Chat requests waiting for an admission slot")
+PROVIDER_QUEUED = Gauge("maya_provider_queued", "Calls waiting for a provider concurrency slot", ["provider"])
+HISTORY_ROWS_WRITTEN = Counter("maya_chat_history_rows_written_total", "Chat history rows persisted")
+HISTORY_ROWS_DROPPED = Counter("maya_chat_history_rows_dropped_total", "Chat history rows given up on", ["reason"])
+HISTORY_QUEUE_DEPTH = Gauge("maya_chat_history_queue_depth", "Chat history messages waiting for the write-behind flush")
+
+
+@asynccontextmanager
+async def track(provider: str, operation: str, agent: Optional[str] = None):
+    """Times one provider call; exceptions are counted (by class name) and re-raised."""
+    agent = agent or "none"
+    in_flight = PROVIDER_IN_FLIGHT.labels(provider, operation)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        PROVIDER_ERRORS.labels(provider, operation, agent, type(e).__name__).inc()
+        raise
+    finally:
+        PROVIDER_LATENCY.labels(provider, operation, agent).observe(time.perf_counter() - start)
+        in_flight.dec()
+
+
+def record_error(provider: str, operation: str, error: str, agent: Optional[str] = None):
+    """For failures that don't raise (e.g. an HTTP error status that is handled inline)."""
+    PROVIDER_ERRORS.labels(provider, operation, agent or "none", error).inc()
+
+
+def instrument_node(name: str, fn: Callable) -> Callable:
+    """Wraps an async LangGraph node; functools.wraps keeps the (state, config) signature visible."""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        NODE_IN_FLIGHT.labels(name).inc()
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            NODE_ERRORS.labels(name, type(e).__name__).inc()
+            raise
+        finally:
+            NODE_LATENCY.labels(name).observe(time.perf_counter() - start)
+            NODE_IN_FLIGHT.labels(name).dec()
+    return wrapper
+
+
+class CacheCollector:
+    """Reads registered caches' stats() at scrape time (hits, misses, evictions, size, hit ratio)."""
+
+    def __init__(self):
+        self._caches: Dict[str, Callable[[], dict]] = {}
+
+    def register(self, name: str, stats_fn: Callable[[], dict]):
+        self._caches[name] = stats_fn
+
+    def collect(self):
+        hits = CounterMetricFamily("maya_cache_hits", "Cache hits (tier: memory, semantic, disk)", labels=["cache", "tier"])
+        misses = CounterMetricFamily("maya_cache_misses", "Cache misses", labels=["cache"])
+        evictions = CounterMetricFamily("maya_cache_evictions", "Cache LRU evictions", labels=["cache"])
+        size = GaugeMetricFamily("maya_cache_entries", "Entries currently cached", labels=["cache"])
+        ratio = GaugeMetricFamily("maya_cache_hit_ratio", "Lifetime hit ratio of the in-memory tier", labels=["cache"])
+        for name, stats_fn in list(self._caches.items()):
+            stats = stats_fn()
+            hits.add_metric([name, "memory"], stats.get("hits", 0))
+            # Extra tiers: response cache ke semantic_hits, embedding cache ke disk_hits
+            for key, value in stats.items():
+                if key.endswith("_hits"):
+                    hits.add_metric([name, key[:-len("_hits")]], value)
+            misses.add_metric([name], stats.get("misses", 0))
+            evictions.add_metric([name], stats.get("evictions", 0))
+            size.add_metric([name], stats.get("size", 0))
+            ratio.add_metric([name], stats.get("hit_ratio", 0.0))
+        yield from (hits, misses, evictions, size, ratio)
+
+
+cache_collector = CacheCollector()
+REGISTRY.register(cache_collector)
+
+
+def register_cache(name: str, stats_fn: Callable[[], dict]):
+    cache_collector.register(name, stats_fn)
+
+
+def render_metrics():
+    """(body, content_type) for the /metrics endpoint."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
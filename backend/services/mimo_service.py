@@ -1,6 +1,15 @@
 import os
+import time
+import asyncio
+from typing import AsyncIterator, Optional
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
+from services.response_cache import response_cache
+from services.gemini_service import gemini_service
+from services.metrics import track, TIME_TO_FIRST_TOKEN
+from services.llm_pool import LLMProvider, LLMProviderPool, CircuitBreaker
+from services.single_flight import SingleFlight
+from services.cache import normalize_text
 
 load_dotenv()
 
@@ -21,35 +30,217 @@ class MimoService:
         # OpenRouter requires these extra headers to avoid 401 errors
         self.client = AsyncOpenAI(
             api_key=api_key,
-            base_url="https://openrouter.ai/api/v1",
+            # Local stand-in (load tests) ke liye override
+            base_url=os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
+            # Retries ki jagah pool doosre provider par failover karta hai
+            max_retries=int(os.getenv("OPENROUTER_MAX_RETRIES", "0")),
             default_headers={
                 "HTTP-Referer": "http://localhost:3000", # Aapka site URL
                 "X-Title": "MAYA-AI-Local"               # Aapke app ka naam
             }
         )
         self.model = "xiaomi/mimo-v2-flash:free"
+        self.system_prompt = "You are MAYA, a helpful AI assistant for MSMEs in India. Provide direct, professional, and actionable advice. Do not include unnecessary greetings or self-introductions unless specifically asked who you are."
+        self.pool = self._build_pool()
+        # Streaming: do chunks ke beech max gap aur poore stream ka budget (seconds); stalled
+        # stream provider + admission slot hamesha ke liye na pakde
+        self.stream_chunk_timeout = float(os.getenv("OPENROUTER_STREAM_CHUNK_TIMEOUT", "15"))
+        self.stream_timeout = float(os.getenv("OPENROUTER_STREAM_TIMEOUT", "120"))
+        # Same agent + normalized prompt par concurrent calls ek hi completion share karte hain
+        self.inflight = SingleFlight("llm_completion")
 
-    async def generate_text(self, prompt: str) -> str:
+    def _build_pool(self) -> LLMProviderPool:
         """
-        Generates text using the Xiaomi Mimo V2 Flash model via OpenRouter.
+        Providers from LLM_PROVIDERS (priority order). Har provider ka apna timeout
+        aur circuit breaker; primary apne p95 se slow ho toh agla hedge hota hai.
+        """
+        completions = {
+            "openrouter": self._complete,
+            "gemini": self._complete_gemini,
+        }
+        providers = []
+        for name in os.getenv("LLM_PROVIDERS", "openrouter,gemini").split(","):
+            name = name.strip().lower()
+            if name not in completions:
+                if name:
+                    print(f"Warning: unknown LLM provider '{name}' in LLM_PROVIDERS, skipping.")
+                continue
+            providers.append(LLMProvider(
+                name,
+                completions[name],
+                timeout=float(os.getenv(f"{name.upper()}_TIMEOUT", "30")),
+                # Free-tier rate limit: zyada parallel calls sirf 429 laati hain
+                max_concurrency=int(os.getenv(f"{name.upper()}_MAX_CONCURRENCY", "8")) or None,
+                breaker=CircuitBreaker(
+                    failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+                    reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30")),
+                ),
+            ))
+        return LLMProviderPool(
+            providers,
+            hedging=os.getenv("LLM_HEDGING", "true").lower() == "true",
+            hedge_min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0")),
+            hedge_max_delay=float(os.getenv("LLM_HEDGE_MAX_DELAY", "10.0")),
+        )
+
+    def _build_messages(self, prompt: str) -> list:
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def _complete(self, prompt: str, agent: Optional[str] = None) -> str:
+        """Raw OpenRouter call. Errors propagate to the caller (timing/errors recorded by the pool)."""
+        completion = await self.client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(prompt)
+        )
+        return completion.choices[0].message.content
+
+    async def _complete_gemini(self, prompt: str, agent: Optional[str] = None) -> str:
+        """Fallback provider: same system prompt, Gemini chat model."""
+        return await gemini_service.complete(prompt, system_prompt=self.system_prompt)
+
+    async def _cache_lookup(self, prompt: str, agent: Optional[str], query: Optional[str] = None):
+        """
+        Returns (cached_response, semantic_entry). Semantic tier sirf tab jab caller ne
+        user query di ho: embedding query ka banta hai (poore prompt ka nahi, warna
+        template hi similarity decide kar deta), scope = prompt minus query.
+        """
+        if not response_cache.is_active(agent):
+            return None, None
+
+        cached = response_cache.get(agent, prompt)
+        if cached is not None or not response_cache.semantic_enabled or not query or query not in prompt:
+            return cached, None
+
+        embedding = await gemini_service.get_embeddings(query)
+        scope = response_cache.semantic_scope(agent, prompt, query)
+        return response_cache.get_semantic(agent, embedding, scope), (embedding, scope)
+
+    def _cache_store(self, prompt: str, agent: Optional[str], response: str, semantic=None):
+        if not response or not response_cache.is_active(agent):
+            return
+        key = response_cache.set(agent, prompt, response)
+        if semantic:
+            embedding, scope = semantic
+            response_cache.set_semantic(agent, key, embedding, scope)
+
+    async def generate_text(self, prompt: str, agent: Optional[str] = None, query: Optional[str] = None,
+                            cache: bool = True) -> str:
+        """
+        Generates text using the Xiaomi Mimo V2 Flash model via OpenRouter,
+        hedged / failed over to the other providers in the pool.
         
         Args:
             prompt (str): The input prompt for the model.
+            agent (str, optional): Calling agent ('router', 'scheme', ...). Selects
+                the response-cache TTL; None uses the default TTL.
+            query (str, optional): The user query inside the prompt. Only this is
+                embedded for the semantic cache; None skips the semantic tier.
+            cache (bool): False bypasses the response cache (no lookup, no store).
             
         Returns:
             str: The generated text response.
         """
+        cached, semantic = await self._cache_lookup(prompt, agent, query) if cache else (None, None)
+        if cached is not None:
+            return cached
+
+        return await self.inflight.do(
+            (agent, normalize_text(prompt)), lambda: self._generate_uncached(prompt, agent, semantic, cache)
+        )
+
+    async def _generate_uncached(self, prompt: str, agent: Optional[str], semantic=None, store: bool = True) -> str:
         try:
-            completion = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are MAYA, a helpful AI assistant for MSMEs in India. Provide direct, professional, and actionable advice. Do not include unnecessary greetings or self-introductions unless specifically asked who you are."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return completion.choices[0].message.content
+            response = await self.pool.complete(prompt, agent)
         except Exception as e:
             print(f"Error generating text with MimoService: {e}")
             return "I apologize, but I encountered an error while processing your request."
 
+        if store:
+            self._cache_store(prompt, agent, response, semantic)
+        return response
+
+    async def stream_text(self, prompt: str, agent: Optional[str] = None, query: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Streams the completion token-by-token as OpenRouter produces it.
+
+        Args:
+            prompt (str): The input prompt for the model.
+            agent (str, optional): Calling agent, used for the response cache.
+            query (str, optional): The user query inside the prompt (semantic cache key).
+
+        Yields:
+            str: Text deltas in the order they arrive.
+        """
+        cached, semantic = await self._cache_lookup(prompt, agent, query)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        openrouter = self.pool.get("openrouter")
+        if openrouter is not None and openrouter.breaker.allow():
+            try:
+                async with openrouter.slot(), track("openrouter", "stream", agent):
+                    started = time.perf_counter()
+                    stream = await asyncio.wait_for(
+                        self.client.chat.completions.create(
+                            model=self.model,
+                            messages=self._build_messages(prompt),
+                            stream=True
+                        ),
+                        timeout=openrouter.timeout
+                    )
+                    deadline = started + self.stream_timeout
+                    chunks = stream.__aiter__()
+                    try:
+                        while True:
+                            budget = min(self.stream_chunk_timeout, deadline - time.perf_counter())
+                            if budget <= 0:
+                                raise asyncio.TimeoutError(f"stream exceeded {self.stream_timeout:.0f}s")
+                            try:
+                                chunk = await asyncio.wait_for(chunks.__anext__(), timeout=budget)
+                            except StopAsyncIteration:
+                                break
+                            except asyncio.TimeoutError:
+                                raise asyncio.TimeoutError(f"no stream chunk within {budget:.1f}s") from None
+                            if not chunk.choices:
+                                continue
+                            delta = chunk.choices[0].delta.content
+                            if delta:
+                                if not parts:
+                                    TIME_TO_FIRST_TOKEN.labels("openrouter", agent or "none").observe(time.perf_counter() - started)
+                                parts.append(delta)
+                                yield delta
+                    finally:
+                        # Stalled/abandoned stream ka HTTP connection band karo
+                        await stream.close()
+            except Exception as e:
+                print(f"Error streaming text with MimoService: {e}")
+                openrouter.record_failure()
+                # Agar beech stream mein fail hua toh jo text aa chuka hai wahi rehne do
+                if parts:
+                    return
+            except BaseException:
+                # Client disconnect / cancel: provider ka koi verdict nahi
+                openrouter.breaker.release_trial()
+                raise
+            else:
+                openrouter.record_success()
+                self._cache_store(prompt, agent, "".join(parts), semantic)
+                return
+
+        # Stream shuru nahi ho paya (ya OpenRouter circuit open): baaki providers se single-shot answer
+        try:
+            response = await self.pool.complete(prompt, agent, exclude=("openrouter",))
+        except Exception as e:
+            print(f"Error generating fallback text with MimoService: {e}")
+            yield "I apologize, but I encountered an error while processing your request."
+            return
+
+        yield response
+        self._cache_store(prompt, agent, response, semantic)
+
 mimo_service = MimoService()
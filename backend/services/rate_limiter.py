@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens/second refill, burst up to `capacity`.
+    acquire() waits until enough tokens are available.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Non-blocking: takes tokens if available, else returns False."""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def retry_after(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` will be available."""
+        self._refill()
+        missing = tokens - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep(self.retry_after(tokens))
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """
+    Token bucket whose rate follows provider feedback (AIMD):
+    429 aaye toh rate aadha (multiplicative decrease), success par dheere
+    dheere badhao (additive increase) up to max_rate. Fixed sleeps ki zaroorat nahi.
+    """
+
+    def __init__(self, rate: float, capacity: float, min_rate: float = 0.05,
+                 max_rate: float = None, increase: float = None):
+        super().__init__(rate, capacity)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 4
+        self.increase = increase or rate * 0.1
+        self.throttled = 0
+
+    def on_success(self) -> None:
+        self._refill()
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self) -> None:
+        self._refill()
+        self.throttled += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        # Bucket khali karo taaki baaki concurrent workers bhi ruk jayein
+        self.tokens = 0.0
@@ -0,0 +1,101 @@
+"""
+Deterministic (no-LLM) relevance scoring for scheme candidates.
+
+score = vector similarity (0.5) + query/scheme term overlap (0.3) + eligibility
+fit against user_profile (0.2), 0-100 par. Explanation seed time par bane
+explanation_snippet + matched terms + eligibility reasons se banta hai, isliye
+scheme answer ke liye doosra LLM round trip zaroori nahi.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from services.eligibility_index import profile_match
+from services.lexical_index import tokenize, scheme_search_text
+
+VECTOR_WEIGHT = 0.5
+LEXICAL_WEIGHT = 0.3
+ELIGIBILITY_WEIGHT = 0.2
+
+# Gemini embeddings par cosine ~0.3 = unrelated, ~0.8 = near duplicate
+SIMILARITY_FLOOR = 0.3
+SIMILARITY_SPAN = 0.5
+
+SNIPPET_MAX_CHARS = 220
+
+
+def build_explanation_snippet(scheme: Dict[str, Any]) -> str:
+    """One-line 'why this scheme' text, computed once at seed time from the scheme's own fields."""
+    criteria = scheme.get("eligibility_criteria") or {}
+    if not isinstance(criteria, dict):
+        criteria = {}
+    benefits = scheme.get("benefits") or []
+    lead = str(benefits[0]).rstrip(".") if benefits else str(scheme.get("description") or "").rstrip(".")
+
+    audience = []
+    if criteria.get("type"):
+        audience.append(f"for {criteria['type']}")
+    if criteria.get("sector"):
+        audience.append(f"in {criteria['sector']}")
+    if criteria.get("geography"):
+        audience.append(f"({criteria['geography']})")
+
+    snippet = lead
+    if audience:
+        text = " ".join(audience)
+        snippet = f"{lead}. {text[0].upper()}{text[1:]}"
+    if len(snippet) > SNIPPET_MAX_CHARS:
+        snippet = snippet[:SNIPPET_MAX_CHARS - 1].rstrip() + "…"
+    return snippet
+
+
+def lexical_overlap(query: str, card: Dict[str, Any]) -> Tuple[float, List[str]]:
+    """Fraction of query terms found in the scheme's search text, plus those terms (query order)."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return 0.0, []
+    vocabulary = set(tokenize(scheme_search_text(card)))
+    matched = [t for t in terms if t in vocabulary]
+    return len(matched) / len(terms), matched
+
+
+def vector_score(similarity: Optional[float], rank: int, total: int) -> float:
+    """Cosine similarity mapped to 0..1; retrieval rank se estimate jab similarity nahi (lexical mode)."""
+    if similarity is None:
+        return 1.0 - 0.5 * rank / max(1, total)
+    return min(1.0, max(0.0, (similarity - SIMILARITY_FLOOR) / SIMILARITY_SPAN))
+
+
+def score_scheme(query: str, card: Dict[str, Any], rank: int, total: int,
+                 user_profile: Optional[Dict[str, Any]] = None) -> Tuple[int, str]:
+    """(relevance_score 0-100, explanation) for one retrieved card."""
+    overlap, matched = lexical_overlap(query, card)
+    fit, reasons = profile_match(card.get("eligibility_criteria"), user_profile)
+    score = (VECTOR_WEIGHT * vector_score(card.get("similarity"), rank, total)
+             + LEXICAL_WEIGHT * overlap
+             + ELIGIBILITY_WEIGHT * fit)
+
+    parts = [card.get("explanation_snippet") or build_explanation_snippet(card)]
+    if matched:
+        parts.append(f"Matches your query on: {', '.join(matched[:4])}")
+    parts.extend(reasons)
+    explanation = ". ".join(p.rstrip(".") for p in parts if p) + "."
+    return round(100 * score), explanation
+
+
+def score_schemes(query: str, cards: Sequence[Dict[str, Any]],
+                  user_profile: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Adds relevance_score/explanation to each card (in place) and returns them best-first."""
+    for rank, card in enumerate(cards):
+        card["relevance_score"], card["explanation"] = score_scheme(query, card, rank, len(cards), user_profile)
+        # Internal scoring inputs, card payload ka hissa nahi
+        card.pop("similarity", None)
+        card.pop("explanation_snippet", None)
+    return sorted(cards, key=lambda c: c["relevance_score"], reverse=True)
+
+
+def local_summary(cards: Sequence[Dict[str, Any]]) -> str:
+    """Template chat_summary for locally scored results."""
+    if not cards:
+        return "I'm sorry, I couldn't find any specific schemes matching your query."
+    if len(cards) == 1:
+        return f"I found one scheme that fits your query: {cards[0]['name']}."
+    return f"I found {len(cards)} schemes for you. {cards[0]['name']} looks like the strongest match."
@@ -0,0 +1,114 @@
+import hashlib
+import os
+from typing import List, Optional
+
+from services.cache import LRUCache, cosine_similarity, normalize_text
+from services.metrics import register_cache
+
+# Seconds. Router/scheme analysis deterministic hain, market data jaldi stale hota hai.
+DEFAULT_AGENT_TTLS = {
+    "router": 24 * 3600,
+    "scheme": 3600,
+    "market": 900,
+    "brand": 1800,
+    "finance": 1800,
+    "marketing": 1800,
+    "general": 1800,
+}
+
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+class ResponseCache:
+    """
+    Cache for MimoService completions.
+    - Exact match: sha256 of the normalized prompt, scoped per agent.
+    - Semantic match (optional, MIMO_SEMANTIC_CACHE=true): cosine similarity of
+      user-query embeddings above MIMO_SEMANTIC_THRESHOLD, within the same agent
+      and the same prompt around the query (template + context).
+    Per-agent TTL (MIMO_CACHE_TTL_<AGENT>, 0 = disabled), bounded LRU size.
+    """
+
+    def __init__(self):
+        self.enabled = _env_flag("MIMO_CACHE_ENABLED", "true")
+        self.semantic_enabled = _env_flag("MIMO_SEMANTIC_CACHE")
+        self.semantic_threshold = float(os.getenv("MIMO_SEMANTIC_THRESHOLD", "0.95"))
+        self.ttls = {
+            agent: float(os.getenv(f"MIMO_CACHE_TTL_{agent.upper()}", ttl))
+            for agent, ttl in DEFAULT_AGENT_TTLS.items()
+        }
+        self.default_ttl = float(os.getenv("MIMO_CACHE_TTL_DEFAULT", "600"))
+
+        maxsize = int(os.getenv("MIMO_CACHE_SIZE", "2048"))
+        self._exact = LRUCache(maxsize=maxsize)
+        # (agent, scope) -> LRUCache(key -> embedding); key points into self._exact
+        self._vectors = {}
+        self._vector_maxsize = int(os.getenv("MIMO_SEMANTIC_CACHE_SIZE", "512"))
+
+        self.semantic_hits = 0
+
+    def ttl_for(self, agent: Optional[str]) -> float:
+        return self.ttls.get(agent or "", self.default_ttl)
+
+    def is_active(self, agent: Optional[str]) -> bool:
+        return self.enabled and self.ttl_for(agent) > 0
+
+    @staticmethod
+    def make_key(agent: Optional[str], prompt: str) -> str:
+        digest = hashlib.sha256(normalize_text(prompt).encode("utf-8")).hexdigest()
+        return f"{agent or 'default'}:{digest}"
+
+    @classmethod
+    def semantic_scope(cls, agent: Optional[str], prompt: str, query: str) -> str:
+        """Prompt minus the query: similar queries only match under the same template and context."""
+        return cls.make_key(agent, prompt.replace(query, "", 1))
+
+    def get(self, agent: Optional[str], prompt: str) -> Optional[str]:
+        if not self.is_active(agent):
+            return None
+        return self._exact.get(self.make_key(agent, prompt))
+
+    def set(self, agent: Optional[str], prompt: str, response: str) -> str:
+        key = self.make_key(agent, prompt)
+        self._exact.set(key, response, ttl=self.ttl_for(agent))
+        return key
+
+    # --- Semantic layer ---
+
+    def get_semantic(self, agent: Optional[str], embedding: List[float], scope: str = None) -> Optional[str]:
+        vectors = self._vectors.get((agent, scope))
+        if not vectors or not embedding:
+            return None
+
+        best_key, best_sim = None, 0.0
+        for key, vec in vectors.items():
+            sim = cosine_similarity(embedding, vec)
+            if sim > best_sim:
+                best_key, best_sim = key, sim
+
+        if best_key is None or best_sim < self.semantic_threshold:
+            return None
+
+        response = self._exact.get(best_key)
+        if response is None:
+            # Exact entry expire/evict ho chuki hai
+            vectors.pop(best_key)
+            return None
+        self.semantic_hits += 1
+        return response
+
+    def set_semantic(self, agent: Optional[str], key: str, embedding: List[float], scope: str = None) -> None:
+        if not embedding:
+            return
+        vectors = self._vectors.setdefault((agent, scope), LRUCache(maxsize=self._vector_maxsize))
+        vectors.set(key, embedding, ttl=self.ttl_for(agent))
+
+    def stats(self) -> dict:
+        stats = self._exact.stats()
+        stats["semantic_hits"] = self.semantic_hits
+        return stats
+
+
+response_cache = ResponseCache()
+register_cache("llm_response", response_cache.stats)
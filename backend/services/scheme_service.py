@@ -1,45 +1,180 @@
-from sqlalchemy import select
+import asyncio
+import os
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from models import Scheme
 from services.gemini_service import gemini_service
+from services.metrics import track
+from services.vector_index import scheme_vector_index
+from services.eligibility_index import scheme_eligibility_index
+from services.lexical_index import scheme_lexical_index, scheme_search_text, reciprocal_rank_fusion
+from services.relevance import build_explanation_snippet
+from services.card_payloads import scheme_card_cache
+
+def scheme_to_dict(s: Scheme) -> dict:
+    """Clean dictionary (card payload) for one Scheme row."""
+    return {
+        "id": s.id,
+        "name": s.name,
+        "description": s.description,
+        "category": s.category,
+        "benefits": s.benefits,
+        "eligibility_criteria": s.eligibility_criteria,
+        "required_documents": s.required_documents,
+        "application_mode": s.application_mode,
+        "link": s.link,
+        "tags": s.tags,
+        "explanation_snippet": s.explanation_snippet
+    }
 
 class SchemeService:
-    async def search_schemes(self, db: AsyncSession, query: str, limit: int = 5):
-        try:
-            # 1. Get Gemini embedding for query
-            query_embedding = await gemini_service.get_embeddings(query)
-            
-            if not query_embedding:
-                print("⚠️ Could not generate embedding for query")
-                return []
+    def __init__(self):
+        # "memory" = in-process NumPy index, "pgvector" = ORDER BY cosine_distance in Postgres
+        self.backend = os.getenv("SCHEME_SEARCH_BACKEND", "memory").lower()
+        # "hybrid" = BM25 + vector (RRF), "vector", ya "lexical" (zero-network)
+        self.retrieval_mode = os.getenv("SCHEME_RETRIEVAL_MODE", "hybrid").lower()
+        # Fusion se pehle har retriever se kitne candidates lene hain
+        self.fusion_pool = int(os.getenv("SCHEME_FUSION_POOL", "20"))
+        self.index = scheme_vector_index
+        self.lexical_index = scheme_lexical_index
+        self.eligibility_index = scheme_eligibility_index
+        self.card_payloads = scheme_card_cache
+        # Har worker khud DB version poll karta hai (reseed ke baad sab workers reload, sirf ek nahi)
+        self.poll_interval = float(os.getenv("SCHEME_INDEX_POLL_SECONDS", "30"))
+        self.index_version = None
+        self._watcher = None
+
+    @staticmethod
+    async def table_version(db: AsyncSession):
+        """Cheap fingerprint of the schemes table: changes on any insert, update or delete."""
+        result = await db.execute(select(func.count(Scheme.id), func.max(Scheme.id), func.max(Scheme.updated_at)))
+        return tuple(result.one())
+
+    async def reload_index(self, db: AsyncSession) -> int:
+        """Loads all Scheme embeddings + card payloads into the in-memory vector, BM25 and eligibility indexes."""
+        # Version pehle: load ke beech ka change agle poll mein pakda jaayega
+        version = await self.table_version(db)
+        result = await db.execute(select(Scheme).where(Scheme.embedding.isnot(None)).order_by(Scheme.id))
+        schemes = result.scalars().all()
+
+        cards = [scheme_to_dict(s) for s in schemes]
+        for card in cards:
+            # Purane seed ki rows mein snippet nahi hota
+            if not card["explanation_snippet"]:
+                card["explanation_snippet"] = build_explanation_snippet(card)
+        # Saare indexes same row order use karte hain (row i = cards[i])
+        self.index.build(cards, [s.embedding for s in schemes])
+        self.lexical_index.build([scheme_search_text(c) for c in cards])
+        self.eligibility_index.build(cards)
+        # Validated + pre-serialized card payloads (response hot path)
+        self.card_payloads.build(cards)
+        self.index_version = version
+        print(f"📚 Scheme index loaded: {len(self.index)} schemes")
+        return len(self.index)
+
+    async def refresh_if_stale(self, db: AsyncSession) -> bool:
+        """Reloads the indexes if the schemes table changed since the last load; True if it reloaded."""
+        if await self.table_version(db) == self.index_version:
+            return False
+        await self.reload_index(db)
+        return True
+
+    async def start_watcher(self, session_factory):
+        """Starts the per-worker index version poll (lifespan startup)."""
+        if self.poll_interval <= 0 or (self._watcher is not None and not self._watcher.done()):
+            return
+        self._watcher = asyncio.create_task(self._watch_loop(session_factory))
+
+    async def stop_watcher(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    async def _watch_loop(self, session_factory):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                async with session_factory() as db:
+                    await self.refresh_if_stale(db)
+            except Exception as e:
+                print(f"⚠️ Scheme index version check failed (serving the loaded index): {e}")
+
+    async def _search_pgvector(self, db: AsyncSession, query_embedding, limit: int):
+        distance = Scheme.embedding.cosine_distance(query_embedding).label("distance")
+        stmt = select(Scheme, distance).order_by(distance).limit(limit)
 
-            # 2. Vector Similarity Search
-            stmt = select(Scheme).order_by(
-                Scheme.embedding.cosine_distance(query_embedding)
-            ).limit(limit)
-            
+        async with track("postgres", "pgvector_search"):
             result = await db.execute(stmt)
-            schemes = result.scalars().all()
-            
-            # 3. Clean Dictionary Formatting
-            formatted_results = []
-            for s in schemes:
-                formatted_results.append({
-                    "id": s.id,
-                    "name": s.name,
-                    "description": s.description,
-                    "category": s.category,
-                    "benefits": s.benefits,
-                    "eligibility_criteria": s.eligibility_criteria,
-                    "required_documents": s.required_documents,
-                    "application_mode": s.application_mode,
-                    "link": s.link,
-                    "tags": s.tags
-                })
-            return formatted_results
-            
+            rows = result.all()
+        # similarity = local relevance scoring ka vector signal
+        return [{**scheme_to_dict(s), "similarity": 1.0 - float(d)} for s, d in rows]
+
+    def _rows_to_cards(self, rows, limit: int, query_embedding=None):
+        # Copy, taaki caller ka mutation index ke cards ko na chhede
+        rows = [row for row, _ in rows[:limit]]
+        cards = [dict(self.index.cards[row]) for row in rows]
+        if query_embedding is not None:
+            for card, similarity in zip(cards, self.index.similarity(query_embedding, rows)):
+                card["similarity"] = similarity
+        return cards
+
+    def eligible_mask(self, profile):
+        """Eligibility pre-filter for a user_profile; None = no filtering."""
+        mask = self.eligibility_index.mask(profile)
+        if mask is not None and not mask.any():
+            # Profile se koi bhi scheme eligible nahi nikli - khali result se better hai unfiltered ranking
+            print("⚠️ Eligibility filter excluded every scheme, ignoring it for this query")
+            return None
+        return mask
+
+    async def search_schemes(self, db: AsyncSession, query: str, limit: int = 5, user_profile: dict = None):
+        try:
+            backend = "memory" if self.backend == "memory" and self.index.is_ready else "pgvector"
+            async with track("scheme_search", backend):
+                return await self._search(db, query, limit, user_profile)
         except Exception as e:
             print(f"❌ Search Error in MAYA Knowledge Base: {e}")
             return []
 
-scheme_service = SchemeService()
\ No newline at end of file
+    async def _search(self, db: AsyncSession, query: str, limit: int, user_profile: dict = None):
+        """Picks backend/mode and runs the retrieval (errors handled by search_schemes)."""
+        use_memory = self.backend == "memory" and self.index.is_ready
+        mode = self.retrieval_mode if use_memory else "vector"
+        # Pre-filter sirf in-memory backend par (pgvector path unfiltered rehta hai)
+        allowed = self.eligible_mask(user_profile) if use_memory else None
+
+        # 1. Get Gemini embedding for query (lexical mode mein network call nahi)
+        query_embedding = None
+        if mode != "lexical":
+            query_embedding = await gemini_service.get_embeddings(query)
+
+        if not use_memory:
+            if query_embedding:
+                return await self._search_pgvector(db, query_embedding, limit)
+            # Startup par BM25 index backend se independent load hota hai - wahi fallback
+            if not self.lexical_index.is_ready:
+                print("⚠️ Could not generate embedding for query (no lexical index to fall back to)")
+                return []
+            print("⚠️ Embedding unavailable, falling back to lexical (BM25) search")
+            return self._rows_to_cards(self.lexical_index.search(query, k=limit), limit)
+
+        # 2. Lexical-only: explicit mode, ya embedding provider down/throttled
+        if not query_embedding:
+            if mode != "lexical":
+                print("⚠️ Embedding unavailable, falling back to lexical (BM25) search")
+            return self._rows_to_cards(self.lexical_index.search(query, k=limit, allowed=allowed), limit)
+
+        pool = max(limit, self.fusion_pool)
+        vector_hits = self.index.search(query_embedding, k=pool, allowed=allowed)
+        if mode == "vector":
+            return self._rows_to_cards(vector_hits, limit, query_embedding)
+
+        # 3. Hybrid: BM25 + vector via reciprocal rank fusion
+        lexical_hits = self.lexical_index.search(query, k=pool, allowed=allowed)
+        return self._rows_to_cards(reciprocal_rank_fusion([vector_hits, lexical_hits]), limit, query_embedding)
+
+scheme_service = SchemeService()
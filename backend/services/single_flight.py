@@ -0,0 +1,63 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from services.metrics import SINGLE_FLIGHT_CALLS
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Request coalescing: same key par concurrent calls ek hi in-flight task share
+    karte hain (spike mein 50 identical queries = 1 provider call).
+
+    Har caller shared task ko asyncio.shield ke through await karta hai, isliye
+    ek caller ka cancel/timeout baaki callers ko fail nahi karta. Jab saare
+    waiters chale jaayein tab hi underlying call cancel hoti hai.
+    Sirf in-flight dedup hai - result cache nahi (woh response/embedding caches ka kaam hai).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: Hashable, call: _Call):
+        # Sirf apni entry hatao - key par ab koi naya call ho sakta hai
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            self.leaders += 1
+            SINGLE_FLIGHT_CALLS.labels(self.name, "leader").inc()
+        else:
+            self.followers += 1
+            SINGLE_FLIGHT_CALLS.labels(self.name, "follower").inc()
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Koi bhi result ka intezaar nahi kar raha - provider call band karo
+                self._forget(key, call)
+                call.task.cancel()
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "followers": self.followers}
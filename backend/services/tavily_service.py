@@ -1,9 +1,14 @@
 import os
-from tavily import TavilyClient
+import httpx
 from dotenv import load_dotenv
+from services.cache import LRUCache, normalize_text
+from services.metrics import track, record_error, register_cache
+from services.single_flight import SingleFlight
 
 load_dotenv()
 
+DEFAULT_TAVILY_URL = "https://api.tavily.com"
+
 class TavilyService:
     _instance = None
 
@@ -14,41 +19,103 @@ class TavilyService:
         return cls._instance
 
     def _initialize(self):
-        api_key = os.getenv("TAVILY_API_KEY")
-        if not api_key:
+        self.api_key = os.getenv("TAVILY_API_KEY")
+        # Local stand-in server (offline tests/benchmarks) ke liye override
+        self.base_url = os.getenv("TAVILY_BASE_URL", DEFAULT_TAVILY_URL).rstrip("/")
+        self.timeout = float(os.getenv("TAVILY_TIMEOUT", "15"))
+        self.cache = LRUCache(
+            maxsize=int(os.getenv("TAVILY_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("TAVILY_CACHE_TTL", "900"))
+        )
+        self._client = None
+        # Spike mein same market query ke concurrent searches ek hi HTTP call share karte hain
+        self.inflight = SingleFlight("tavily_search")
+
+        if not self.api_key and self.base_url == DEFAULT_TAVILY_URL:
             print("Warning: TAVILY_API_KEY not found in environment variables.")
-            self.client = None
-        else:
-            self.client = TavilyClient(api_key=api_key)
 
-    def search(self, query: str, max_results: int = 5) -> str:
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key) or self.base_url != DEFAULT_TAVILY_URL
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Lazily created so it binds to the running event loop; shared + pooled across requests
+        if self._client is None or self._client.is_closed:
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _format(results: list) -> str:
+        formatted_results = []
+        for result in results:
+            title = result.get("title", "No Title")
+            url = result.get("url", "#")
+            content = result.get("content", "No Content")
+            formatted_results.append(f"Source: {title} ({url})\nContent: {content}\n")
+
+        return "\n".join(formatted_results) if formatted_results else "No relevant information found."
+
+    async def search(self, query: str, max_results: int = 5, search_depth: str = "advanced",
+                     timeout: float = None) -> str:
         """
-        Performs a web search using Tavily API.
-        
+        Performs a web search using Tavily API without blocking the event loop.
+
         Args:
             query (str): The search query.
             max_results (int): Maximum number of results to return.
-            
+            search_depth (str): 'basic' or 'advanced'.
+            timeout (float, optional): Per-call timeout in seconds (default TAVILY_TIMEOUT).
+
         Returns:
             str: A formatted string containing the search results.
         """
-        if not self.client:
+        if not self.available:
             return "Web search is currently unavailable (API Key missing)."
 
+        cache_key = (normalize_text(query), max_results, search_depth)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        return await self.inflight.do(
+            cache_key, lambda: self._search(cache_key, query, max_results, search_depth, timeout)
+        )
+
+    async def _search(self, cache_key, query: str, max_results: int, search_depth: str, timeout: float = None) -> str:
         try:
-            response = self.client.search(query, search_depth="advanced", max_results=max_results)
-            results = response.get("results", [])
-            
-            formatted_results = []
-            for result in results:
-                title = result.get("title", "No Title")
-                url = result.get("url", "#")
-                content = result.get("content", "No Content")
-                formatted_results.append(f"Source: {title} ({url})\nContent: {content}\n")
-            
-            return "\n".join(formatted_results) if formatted_results else "No relevant information found."
+            async with track("tavily", "search"):
+                response = await self.client.post(
+                    "/search",
+                    json={"query": query, "search_depth": search_depth, "max_results": max_results},
+                    timeout=timeout or self.timeout,
+                )
+            if response.is_error:
+                record_error("tavily", "search", f"HTTP {response.status_code}")
+                print(f"Tavily search failed: HTTP {response.status_code} - {response.text[:200]}")
+                return f"Error performing web search: HTTP {response.status_code}"
+            formatted = self._format(response.json().get("results", []))
+        except httpx.TimeoutException:
+            print(f"Tavily search timed out after {timeout or self.timeout}s: {query!r}")
+            return "Web search timed out. Answer from general knowledge."
         except Exception as e:
             print(f"Error searching with TavilyService: {e}")
             return f"Error performing web search: {str(e)}"
 
+        self.cache.set(cache_key, formatted)
+        return formatted
+
 tavily_service = TavilyService()
+register_cache("tavily", tavily_service.cache.stats)
@@ -0,0 +1,90 @@
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class SchemeVectorIndex:
+    """
+    In-process vector index for the scheme catalogue.
+    Saare embeddings ek contiguous, L2-normalized float32 matrix mein rehte hain,
+    isliye top-k = ek matrix-vector dot product + argpartition (no DB I/O).
+    """
+
+    def __init__(self):
+        self.matrix: Optional[np.ndarray] = None   # shape (n, dim), rows unit-norm
+        self.cards: List[Dict[str, Any]] = []      # row i -> card payload
+        self.ids: List[Any] = []
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.matrix is not None and len(self.cards) > 0
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def build(self, cards: Sequence[Dict[str, Any]], embeddings: Sequence[Sequence[float]]) -> None:
+        """Replaces the index contents atomically (search never sees a half-built index)."""
+        if not cards:
+            self.matrix, self.cards, self.ids = None, [], []
+            self.loaded_at = time.time()
+            return
+
+        # Copy: neeche in-place normalize caller ka float32 array na badle
+        matrix = np.array(embeddings, dtype=np.float32, copy=True, order="C")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+
+        # Single assignment swap
+        self.matrix, self.cards, self.ids = matrix, list(cards), [c.get("id") for c in cards]
+        self.loaded_at = time.time()
+
+    def search(self, query_embedding: Sequence[float], k: int = 5,
+               allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Returns [(row, cosine_similarity)] sorted best-first.
+        `allowed` is an optional boolean mask over rows; masked-out rows are never returned.
+        """
+        if not self.is_ready or k <= 0:
+            return []
+
+        matrix = self.matrix
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+
+        query = query / norm
+        if allowed is not None:
+            # Sirf eligible rows score hoti hain
+            rows = np.flatnonzero(allowed)
+            scores = matrix[rows] @ query
+        else:
+            rows = None
+            scores = matrix @ query
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        if rows is not None:
+            return [(int(rows[i]), float(scores[i])) for i in top]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def similarity(self, query_embedding: Sequence[float], rows: Sequence[int]) -> List[float]:
+        """Cosine similarity of the query against specific rows (e.g. fused hybrid results)."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not self.is_ready or norm == 0 or not rows:
+            return [0.0] * len(rows)
+        return [float(s) for s in self.matrix[list(rows)] @ (query / norm)]
+
+
+scheme_vector_index = SchemeVectorIndex()
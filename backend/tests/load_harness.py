@@ -0,0 +1,322 @@
+"""
+Offline end-to-end load test for POST /api/chat/agent.
+
+Local stand-ins (tests/stubs.py) replace OpenRouter, Gemini embeddings and Tavily,
+with injectable latency/jitter/error rates. A throwaway SQLite database is seeded
+with data/schemes.json (stub embeddings), the real app is started with uvicorn
+in a subprocess pointed at all of them, and requests are driven at a fixed
+concurrency. The JSON report (throughput + p50/p95/p99 overall and per agent
+route) can be diffed against a previous run with --baseline.
+
+Usage:
+    python tests/load_harness.py --requests 300 --concurrency 20 --llm-latency 0.4 --output report.json
+    python tests/load_harness.py --requests 300 --concurrency 20 --baseline report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(BACKEND_DIR)
+
+import httpx
+
+from tests.stubs import (StubConfig, StubServer, create_gemini_app, create_openrouter_app,
+                         create_tavily_app, stub_embedding)
+
+# Har agent route ke liye kuch realistic queries (router inhe khud classify karta hai)
+QUERIES = {
+    "scheme": ["Which government schemes give collateral-free loans for a small manufacturing unit?",
+               "Mudra loan eligibility for a women-owned tailoring business",
+               "subsidy for setting up a food processing unit in Uttar Pradesh"],
+    "market": ["What are the current market trends for organic tea in India?",
+               "Who are the main competitors for a D2C handloom saree brand?"],
+    "brand": ["Suggest a brand name and tagline for a chai cafe",
+              "Brand identity ideas for an eco-friendly packaging startup"],
+    "finance": ["How should I price handmade candles to keep a 30% margin?",
+                "Explain GST input tax credit for a small trader"],
+    "marketing": ["Low-cost marketing ideas to promote my bakery on Instagram",
+                  "Local SEO tips for a hardware store"],
+    "general": ["hello", "What can MAYA help me with?"],
+}
+
+LATENCY_KEYS = ("p50", "p95", "p99")
+
+
+def percentile(values, q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100.0
+    lo, hi = int(pos), min(int(pos) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def latency_summary(latencies) -> dict:
+    ms = [l * 1000 for l in latencies]
+    return {
+        "p50": round(percentile(ms, 50), 2),
+        "p95": round(percentile(ms, 95), 2),
+        "p99": round(percentile(ms, 99), 2),
+        "mean": round(sum(ms) / len(ms), 2) if ms else 0.0,
+        "max": round(max(ms), 2) if ms else 0.0,
+    }
+
+
+async def seed_database(db_url: str) -> int:
+    """Creates the schema in a fresh SQLite file and loads the scheme catalogue with stub embeddings."""
+    from sqlalchemy import insert
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from database import Base
+    from models import Scheme
+    from seed import build_embedding_text, scheme_row
+
+    with open(os.path.join(BACKEND_DIR, "data", "schemes.json")) as f:
+        schemes = json.load(f)
+
+    engine = create_async_engine(db_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Scheme), [
+            {**scheme_row(data), "embedding": stub_embedding(build_embedding_text(data))}
+            for data in schemes
+        ])
+    await engine.dispose()
+    return len(schemes)
+
+
+def start_app(port: int, env: dict, workers: int, log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.time() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"App exited during startup (code {proc.returncode})")
+            try:
+                if (await client.get(f"{url}/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"App did not become ready within {timeout}s")
+
+
+def build_workload(total: int, sessions: int):
+    """Round-robin over every query; sessions > 0 reuses that many conversations (multi-turn load)."""
+    pool = [(agent, q) for agent, queries in QUERIES.items() for q in queries]
+    session_ids = [str(uuid.uuid4()) for _ in range(sessions)]
+    return [
+        (agent, query, session_ids[i % sessions] if sessions else str(uuid.uuid4()))
+        for i, (agent, query) in ((i, pool[i % len(pool)]) for i in range(total))
+    ]
+
+
+async def run_load(url: str, workload, concurrency: int, timeout: float):
+    """Drives the workload with `concurrency` workers; returns per-request results and wall time."""
+    queue = asyncio.Queue()
+    for item in workload:
+        queue.put_nowait(item)
+    results = []
+
+    async def worker(client: httpx.AsyncClient):
+        while not queue.empty():
+            expected, query, session_id = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                resp = await client.post(f"{url}/api/chat/agent",
+                                         json={"message": query, "session_id": session_id})
+                status = resp.status_code
+                agent = resp.json().get("agent") if status == 200 else None
+            except Exception as e:
+                status, agent = type(e).__name__, None
+            results.append({"expected": expected, "agent": agent or "error", "status": status,
+                            "latency": time.perf_counter() - start})
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+        duration = time.perf_counter() - started
+    return results, duration
+
+
+def build_report(results, duration: float, config: dict, stub_requests: dict) -> dict:
+    ok = [r for r in results if r["status"] == 200]
+    # Admission control ke 429: overload mein yeh fast hone chahiye
+    rejected = [r for r in results if r["status"] == 429]
+    by_agent = defaultdict(list)
+    for r in results:
+        by_agent[r["agent"]].append(r)
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "config": config,
+        "summary": {
+            "requests": len(results),
+            "ok": len(ok),
+            "errors": len(results) - len(ok),
+            "duration_s": round(duration, 3),
+            "throughput_rps": round(len(ok) / duration, 2) if duration else 0.0,
+            "latency_ms": latency_summary([r["latency"] for r in ok]),
+            "rejected": len(rejected),
+            "rejected_latency_ms": latency_summary([r["latency"] for r in rejected]),
+        },
+        "by_agent": {
+            agent: {
+                "count": len(rows),
+                "errors": sum(1 for r in rows if r["status"] != 200),
+                "misrouted": sum(1 for r in rows if r["agent"] not in (r["expected"], "error")),
+                "latency_ms": latency_summary([r["latency"] for r in rows]),
+            }
+            for agent, rows in sorted(by_agent.items())
+        },
+        "status_codes": dict(Counter(str(r["status"]) for r in results)),
+        "stub_requests": stub_requests,
+    }
+
+
+def compare(baseline: dict, report: dict, tolerance: float) -> list:
+    """Latency percentiles that got worse by more than `tolerance` (fraction), plus throughput drops."""
+    regressions = []
+
+    def check(label, old, new):
+        for key in LATENCY_KEYS:
+            before, after = old.get(key, 0.0), new.get(key, 0.0)
+            if before and after > before * (1 + tolerance):
+                regressions.append(f"{label} {key}: {before:.1f}ms -> {after:.1f}ms")
+
+    check("overall", baseline["summary"]["latency_ms"], report["summary"]["latency_ms"])
+    for agent, stats in report["by_agent"].items():
+        if agent in baseline.get("by_agent", {}):
+            check(agent, baseline["by_agent"][agent]["latency_ms"], stats["latency_ms"])
+
+    before_rps, after_rps = baseline["summary"]["throughput_rps"], report["summary"]["throughput_rps"]
+    if before_rps and after_rps < before_rps * (1 - tolerance):
+        regressions.append(f"throughput: {before_rps:.2f} -> {after_rps:.2f} req/s")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test for /api/chat/agent against local provider stand-ins")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--sessions", type=int, default=0, help="reuse N conversations (0 = new session per request)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request client timeout (s)")
+    for name, latency in (("llm", 0.3), ("embed", 0.05), ("search", 0.5)):
+        parser.add_argument(f"--{name}-latency", type=float, default=latency)
+        parser.add_argument(f"--{name}-jitter", type=float, default=0.0)
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0)
+    parser.add_argument("--with-caches", action="store_true",
+                        help="keep router/response/embedding/Tavily caches on (default: cold, every call hits a stub)")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout only)")
+    parser.add_argument("--baseline", help="previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression vs baseline (0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None) -> int:
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="maya-load-")
+    db_url = f"sqlite+aiosqlite:///{os.path.join(workdir, 'maya.sqlite3')}"
+
+    configs = {
+        name: StubConfig(latency=getattr(args, f"{name}_latency"), jitter=getattr(args, f"{name}_jitter"),
+                         error_rate=getattr(args, f"{name}_error_rate"))
+        for name in ("llm", "embed", "search")
+    }
+    servers = {
+        "openrouter": StubServer(create_openrouter_app(configs["llm"])),
+        "gemini": StubServer(create_gemini_app(configs["embed"])),
+        "tavily": StubServer(create_tavily_app(configs["search"])),
+    }
+    for server in servers.values():
+        server.start()
+
+    env = {
+        **os.environ,
+        "DATABASE_URL": db_url,
+        "OPENROUTER_API_KEY": "stub", "OPENROUTER_BASE_URL": f"{servers['openrouter'].url}/v1",
+        "GOOGLE_API_KEY": "stub", "GEMINI_BASE_URL": servers["gemini"].url,
+        "TAVILY_API_KEY": "stub", "TAVILY_BASE_URL": servers["tavily"].url,
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embeddings.sqlite3"),
+        # Few sessions, many requests: per-session quota off unless explicitly set
+        "CHAT_RATE_PER_MINUTE": os.environ.get("CHAT_RATE_PER_MINUTE", "1000000"),
+        "CHAT_BURST": os.environ.get("CHAT_BURST", "1000000"),
+    }
+    env.pop("CHECKPOINT_DATABASE_URL", None)
+    if not args.with_caches:
+        env.update({"MIMO_CACHE_ENABLED": "false", "EMBEDDING_CACHE_ENABLED": "false",
+                    "ROUTER_CACHE_SIZE": "0", "TAVILY_CACHE_SIZE": "0"})
+    # seed_database isi process mein backend modules import karta hai
+    os.environ.update({k: env[k] for k in ("DATABASE_URL", "OPENROUTER_API_KEY", "GOOGLE_API_KEY")})
+
+    port = StubServer._free_port()
+    url = f"http://127.0.0.1:{port}"
+    log_path = os.path.join(workdir, "server.log")
+    proc = None
+    try:
+        seeded = await seed_database(db_url)
+        print(f"🌱 Seeded {seeded} schemes into {db_url}")
+        proc = start_app(port, env, args.workers, log_path)
+        await wait_ready(url, proc)
+        print(f"🚀 App ready at {url} (log: {log_path})")
+
+        workload = build_workload(args.requests, args.sessions)
+        results, duration = await run_load(url, workload, args.concurrency, args.timeout)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        for server in servers.values():
+            server.stop()
+
+    config = {
+        "requests": args.requests, "concurrency": args.concurrency, "sessions": args.sessions,
+        "workers": args.workers, "caches": args.with_caches,
+        "stubs": {name: {"latency": c.latency, "jitter": c.jitter, "error_rate": c.error_rate}
+                  for name, c in configs.items()},
+    }
+    stub_requests = {"openrouter": configs["llm"].requests, "gemini": configs["embed"].requests,
+                     "tavily": configs["search"].requests}
+    report = build_report(results, duration, config, stub_requests)
+    report["server_log"] = log_path
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"📝 Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        if regressions:
+            print("❌ Latency regressions vs baseline:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"✅ No regressions beyond {args.tolerance:.0%} vs {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
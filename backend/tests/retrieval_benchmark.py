@@ -0,0 +1,295 @@
+"""
+Retrieval quality + latency benchmark for scheme search.
+
+Labelled queries (tests/retrieval_queries.json) are mapped to expected scheme
+names from data/schemes.json. Every available backend (in-memory vector,
+BM25, hybrid RRF, optionally pgvector) is built over the same catalogue and
+reports recall@k, MRR, per-query latency, build time and index memory.
+
+Embeddings:
+  --embeddings hash    deterministic hashed bag-of-words vectors (offline, default)
+  --embeddings cache   real Gemini vectors from the persistent embedding cache;
+                       --allow-network fills missing ones via the API
+
+--scale N replicates the catalogue (with jittered vectors) to N rows to show how
+each backend scales; quality numbers then also reflect near-duplicate crowding.
+
+Usage:
+    python tests/retrieval_benchmark.py
+    python tests/retrieval_benchmark.py --embeddings cache --output retrieval.json
+    python tests/retrieval_benchmark.py --scale 100000 --backends vector,hybrid
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(BACKEND_DIR)
+# seed.py / gemini_service import-time par key maangte hain; hash mode mein network use nahi hota
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+import numpy as np
+
+from seed import build_embedding_text
+from services.vector_index import SchemeVectorIndex
+from services.lexical_index import BM25Index, scheme_search_text, reciprocal_rank_fusion, tokenize
+from services.eligibility_index import EligibilityIndex
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), "retrieval_queries.json")
+SCHEMES_PATH = os.path.join(BACKEND_DIR, "data", "schemes.json")
+K_VALUES = (1, 3, 5, 10)
+FUSION_POOL = int(os.getenv("SCHEME_FUSION_POOL", "20"))
+ALL_BACKENDS = ("vector", "lexical", "hybrid", "pgvector")
+
+
+def hash_embedding(text: str, dim: int = 768) -> list:
+    """Deterministic signed feature hashing of tokens + bigrams (offline stand-in for a real embedder)."""
+    tokens = tokenize(text)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in features:
+        digest = hashlib.md5(feature.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+async def cached_embeddings(texts: list, allow_network: bool) -> list:
+    """Real Gemini vectors from the persistent embedding cache (optionally filling misses)."""
+    from services.embedding_cache import embedding_cache
+    from services.gemini_service import gemini_service
+
+    model = gemini_service.embedding_cache_model
+    vectors = await embedding_cache.get_many(model, texts)
+    missing = [t for t, v in zip(texts, vectors) if v is None]
+    if missing and not allow_network:
+        raise SystemExit(f"❌ {len(missing)}/{len(texts)} texts are not in the embedding cache "
+                         f"({embedding_cache.path}); rerun with --allow-network or use --embeddings hash")
+    if missing:
+        print(f"🌐 Embedding {len(missing)} uncached texts via Gemini...")
+        return await gemini_service.embed_documents(texts)
+    return vectors
+
+
+def scale_catalogue(cards: list, embeddings: np.ndarray, rows: int, noise: float, seed: int = 7):
+    """Replicates cards to `rows`; copies get Gaussian-jittered, re-normalized vectors."""
+    if rows <= len(cards):
+        return cards[:rows], embeddings[:rows]
+    rng = np.random.default_rng(seed)
+    reps = -(-rows // len(cards))
+    matrix = np.tile(embeddings, (reps, 1))[:rows]
+    jitter = rng.standard_normal(matrix[len(cards):].shape).astype(np.float32) * noise
+    matrix[len(cards):] += jitter
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    scaled = [cards[i % len(cards)] for i in range(rows)]
+    return scaled, matrix
+
+
+def measure_build(fn):
+    """(result, seconds, bytes allocated and still held) for one index build."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current
+
+
+def ranking_metrics(ranked_names: list, relevant: set) -> dict:
+    metrics = {f"recall@{k}": len(relevant & set(ranked_names[:k])) / len(relevant) for k in K_VALUES}
+    rank = next((i for i, name in enumerate(ranked_names, start=1) if name in relevant), None)
+    metrics["rr"] = 1.0 / rank if rank else 0.0
+    return metrics
+
+
+def summarize(per_query: list, latencies: list) -> dict:
+    ms = sorted(l * 1000 for l in latencies)
+    report = {key: round(float(np.mean([q[key] for q in per_query])), 4)
+              for key in [f"recall@{k}" for k in K_VALUES]}
+    report["mrr"] = round(float(np.mean([q["rr"] for q in per_query])), 4)
+    report["latency_ms"] = {
+        "p50": round(float(np.percentile(ms, 50)), 4),
+        "p95": round(float(np.percentile(ms, 95)), 4),
+        "mean": round(float(np.mean(ms)), 4),
+    }
+    return report
+
+
+def run_backend(name: str, search, queries: list, query_vectors: list, masks: list, repeat: int):
+    """Runs every query `repeat` times through `search(query, vector, mask) -> [name]`."""
+    per_query, latencies = [], []
+    for q, vector, mask in zip(queries, query_vectors, masks):
+        ranked = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ranked = search(q["query"], vector, mask)
+            latencies.append(time.perf_counter() - start)
+        per_query.append({"query": q["query"], **ranking_metrics(ranked, set(q["relevant"])),
+                          "top": ranked[:3]})
+    return {"backend": name, **summarize(per_query, latencies), "queries": per_query}
+
+
+async def pgvector_search_fn(max_k: int):
+    """pgvector backend against DATABASE_URL (needs a seeded Postgres with matching embeddings)."""
+    from database import AsyncSessionLocal
+    from services.scheme_service import scheme_service
+
+    session = AsyncSessionLocal()
+    loop = asyncio.get_running_loop()
+
+    def search(query, vector, mask):
+        # Benchmark loop sync hai; ek hi event loop par DB call chalao
+        cards = loop.run_until_complete(scheme_service._search_pgvector(session, vector, max_k))
+        return [c["name"] for c in cards]
+    return session, search
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Recall@k / MRR / latency benchmark for scheme retrieval")
+    parser.add_argument("--embeddings", choices=("hash", "cache"), default="hash")
+    parser.add_argument("--allow-network", action="store_true", help="cache mode: embed uncached texts via Gemini")
+    parser.add_argument("--backends", default="vector,lexical,hybrid",
+                        help=f"comma-separated subset of {','.join(ALL_BACKENDS)} (pgvector needs DATABASE_URL)")
+    parser.add_argument("--scale", type=int, default=0, help="replicate the catalogue to N rows (e.g. 10000..1000000)")
+    parser.add_argument("--noise", type=float, default=0.02, help="per-dimension jitter for replicated vectors")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per query")
+    parser.add_argument("--no-profile", action="store_true", help="ignore per-query user_profile eligibility filters")
+    parser.add_argument("--output", help="write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def run_benchmark(args) -> dict:
+    """Builds the requested backends, runs every labelled query and returns the report."""
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = set(backends) - set(ALL_BACKENDS)
+    if unknown:
+        raise SystemExit(f"Unknown backends: {', '.join(sorted(unknown))}")
+
+    with open(SCHEMES_PATH) as f:
+        schemes = json.load(f)
+    with open(QUERIES_PATH) as f:
+        queries = json.load(f)
+
+    cards = [{**s, "id": i} for i, s in enumerate(schemes)]
+    doc_texts = [build_embedding_text(s) for s in schemes]
+    query_texts = [q["query"] for q in queries]
+
+    loop = asyncio.new_event_loop()
+    if args.embeddings == "hash":
+        doc_vectors = [hash_embedding(t) for t in doc_texts]
+        query_vectors = [hash_embedding(t) for t in query_texts]
+    else:
+        vectors = loop.run_until_complete(cached_embeddings(doc_texts + query_texts, args.allow_network))
+        doc_vectors, query_vectors = vectors[:len(doc_texts)], vectors[len(doc_texts):]
+
+    embeddings = np.asarray(doc_vectors, dtype=np.float32)
+    if args.scale:
+        cards, embeddings = scale_catalogue(cards, embeddings, args.scale, args.noise)
+        print(f"📈 Scaled catalogue to {len(cards):,} rows")
+
+    # Eligibility masks (same pre-filter SchemeService applies to user_profile)
+    # (tracemalloc yahan nahi - per-row Python objects par woh build ko 10x slow kar deta hai)
+    started = time.perf_counter()
+    eligibility = _build_eligibility(cards)
+    eligibility_s = time.perf_counter() - started
+    masks = []
+    for q in queries:
+        mask = None if args.no_profile else eligibility.mask(q.get("profile"))
+        masks.append(mask if mask is not None and mask.any() else None)
+
+    max_k = max(K_VALUES)
+    results, builds = [], {}
+    vector_index = lexical_index = None
+
+    if {"vector", "hybrid"} & set(backends):
+        vector_index, seconds, memory = measure_build(lambda: _build_vector(cards, embeddings))
+        builds["vector"] = {"seconds": round(seconds, 3), "memory_mb": round(memory / 2**20, 2)}
+    if {"lexical", "hybrid"} & set(backends):
+        lexical_index, seconds, memory = measure_build(
+            lambda: _build_lexical([scheme_search_text(c) for c in cards]))
+        builds["lexical"] = {"seconds": round(seconds, 3), "memory_mb": round(memory / 2**20, 2)}
+    builds["eligibility"] = {"seconds": round(eligibility_s, 3)}
+
+    def names(rows):
+        return [cards[row]["name"] for row, _ in rows[:max_k]]
+
+    searches = {
+        "vector": lambda q, v, m: names(vector_index.search(v, k=max_k, allowed=m)),
+        "lexical": lambda q, v, m: names(lexical_index.search(q, k=max_k, allowed=m)),
+        "hybrid": lambda q, v, m: names(reciprocal_rank_fusion([
+            vector_index.search(v, k=max(max_k, FUSION_POOL), allowed=m),
+            lexical_index.search(q, k=max(max_k, FUSION_POOL), allowed=m),
+        ])),
+    }
+
+    for backend in backends:
+        if backend == "pgvector":
+            if args.scale:
+                print("⏭️ pgvector skipped in --scale mode (it searches the real table)")
+                continue
+            asyncio.set_event_loop(loop)
+            session, search = loop.run_until_complete(pgvector_search_fn(max_k))
+            try:
+                results.append(run_backend("pgvector", search, queries, query_vectors, [None] * len(queries), args.repeat))
+            finally:
+                loop.run_until_complete(session.close())
+            continue
+        results.append(run_backend(backend, searches[backend], queries, query_vectors, masks, args.repeat))
+
+    loop.close()
+    return {
+        "config": {"embeddings": args.embeddings, "rows": len(cards), "queries": len(queries),
+                   "repeat": args.repeat, "fusion_pool": FUSION_POOL, "profiles": not args.no_profile},
+        "builds": builds,
+        "results": results,
+    }
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = run_benchmark(args)
+    results, builds = report["results"], report["builds"]
+
+    print(f"\n{'backend':<10}" + "".join(f"{'R@' + str(k):>8}" for k in K_VALUES)
+          + f"{'MRR':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for r in results:
+        print(f"{r['backend']:<10}" + "".join(f"{r[f'recall@{k}']:>8.3f}" for k in K_VALUES)
+              + f"{r['mrr']:>8.3f}{r['latency_ms']['p50']:>10.3f}{r['latency_ms']['p95']:>10.3f}")
+    for name, b in builds.items():
+        memory = f", {b['memory_mb']} MB" if "memory_mb" in b else ""
+        print(f"   build {name}: {b['seconds']}s{memory}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report written to {args.output}")
+    return 0
+
+
+def _build_vector(cards, embeddings):
+    index = SchemeVectorIndex()
+    index.build(cards, embeddings)
+    return index
+
+
+def _build_lexical(documents):
+    index = BM25Index()
+    index.build(documents)
+    return index
+
+
+def _build_eligibility(cards):
+    index = EligibilityIndex()
+    index.build(cards)
+    return index
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Local stand-ins for MAYA's external providers, for offline tests and benchmarks.
+Har stub ek chhota FastAPI app hai jo background thread mein uvicorn par chalta hai;
+latency aur error rate runtime par StubConfig se badle ja sakte hain.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+
+async def make_session_factory(engine, *models):
+    """Creates only `models`' tables on `engine` (e.g. in-memory SQLite) and returns a session factory."""
+    async with engine.begin() as conn:
+        for model in models:
+            await conn.run_sync(model.__table__.create)
+    return sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class StubConfig:
+    """Injected behaviour for a stub: fixed latency (+ jitter) and a failure rate."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 500):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Agle N requests deterministic tarike se fail honge (retry tests ke liye)
+        self.fail_next = 0
+        self.requests = 0
+
+    async def apply(self):
+        """Sleeps for the injected latency; returns an error response or None."""
+        self.requests += 1
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            return JSONResponse({"error": "injected failure"}, status_code=self.error_status)
+        if self.error_rate and random.random() < self.error_rate:
+            return JSONResponse({"error": "injected failure"}, status_code=self.error_status)
+        return None
+
+
+def create_tavily_app(config: StubConfig) -> FastAPI:
+    """Tavily /search stand-in: returns deterministic results derived from the query."""
+    app = FastAPI()
+
+    @app.post("/search")
+    async def search(request: Request):
+        body = await request.json()
+        error = await config.apply()
+        if error:
+            return error
+        query = body.get("query", "")
+        results = [
+            {"title": f"Market report {i + 1}: {query}", "url": f"https://example.com/{i + 1}",
+             "content": f"Stub insight {i + 1} about {query}."}
+            for i in range(int(body.get("max_results", 5)))
+        ]
+        return {"query": query, "results": results}
+
+    return app
+
+
+def stub_embedding(text: str, dim: int = 768) -> list:
+    """Deterministic pseudo-embedding: same text -> same unit vector."""
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+def create_jina_app(config: StubConfig, dim: int = 768) -> FastAPI:
+    """Jina /v1/embeddings stand-in (OpenAI-style response with per-input index)."""
+    app = FastAPI()
+    app.state.batch_sizes = []
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        error = await config.apply()
+        if error:
+            return error
+        inputs = body.get("input", [])
+        app.state.batch_sizes.append(len(inputs))
+        return {
+            "model": body.get("model"),
+            "data": [{"index": i, "embedding": stub_embedding(text, dim)} for i, text in enumerate(inputs)],
+        }
+
+    return app
+
+
+def create_gemini_app(config: StubConfig, dim: int = 768) -> FastAPI:
+    """Gemini batchEmbedContents + generateContent stand-in (google-genai SDK, GEMINI_BASE_URL)."""
+    app = FastAPI()
+
+    @app.post("/{version}/models/{model}:batchEmbedContents")
+    async def batch_embed(version: str, model: str, request: Request):
+        body = await request.json()
+        error = await config.apply()
+        if error:
+            return error
+        texts = [" ".join(p.get("text", "") for p in r["content"]["parts"]) for r in body.get("requests", [])]
+        return {"embeddings": [{"values": stub_embedding(text, dim)} for text in texts]}
+
+    @app.post("/{version}/models/{model}:generateContent")
+    async def generate(version: str, model: str, request: Request):
+        body = await request.json()
+        error = await config.apply()
+        if error:
+            return error
+        prompt = " ".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+        return {
+            "candidates": [{
+                "index": 0, "finishReason": "STOP",
+                "content": {"role": "model", "parts": [{"text": stub_completion(prompt)}]},
+            }],
+            "usageMetadata": {"promptTokenCount": 1, "candidatesTokenCount": 1, "totalTokenCount": 2},
+        }
+
+    return app
+
+
+ROUTER_KEYWORDS = {
+    "scheme": ["scheme", "loan", "subsidy", "yojana", "mudra", "grant"],
+    "market": ["market", "competitor", "trend", "industry"],
+    "brand": ["brand", "name", "tagline", "logo"],
+    "finance": ["price", "pricing", "profit", "cost", "tax", "gst"],
+    "marketing": ["marketing", "promote", "instagram", "ads", "seo"],
+}
+
+
+STUB_ANSWER = ("Here is a practical plan for your business: focus on your local customers, "
+               "keep costs low, track cash flow weekly and grow through referrals.")
+
+
+def stub_route(prompt: str) -> str:
+    query = prompt.rsplit("User Query:", 1)[-1].lower()
+    for category, words in ROUTER_KEYWORDS.items():
+        if any(w in query for w in words):
+            return category
+    return "general"
+
+
+def stub_completion(prompt: str) -> str:
+    """Plausible reply for each MAYA prompt type (router label, routed JSON, scheme JSON, or free text)."""
+    if "intent classifier" in prompt:
+        return stub_route(prompt)
+    if '{"intent"' in prompt:
+        category = stub_route(prompt)
+        answer = "" if category in ("scheme", "market") else STUB_ANSWER
+        return json.dumps({"intent": category, "answer": answer})
+    if "schemes_metadata" in prompt:
+        match = re.search(r"Data: (\[.*?\])\s*\n", prompt, re.S)
+        items = json.loads(match.group(1)) if match else []
+        return json.dumps({
+            "chat_summary": "Here are the schemes that best match your business.",
+            "schemes_metadata": [
+                {"id": item["id"], "relevance_score": 90 - 10 * i, "explanation": f"{item['name']} fits the query."}
+                for i, item in enumerate(items)
+            ],
+        })
+    return STUB_ANSWER
+
+
+def create_openrouter_app(config: StubConfig) -> FastAPI:
+    """OpenAI-compatible /v1/chat/completions stand-in (OPENROUTER_BASE_URL), with streaming."""
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        error = await config.apply()
+        if error:
+            return error
+        prompt = body["messages"][-1]["content"]
+        text = stub_completion(prompt)
+        base = {"id": "stub-1", "created": int(time.time()), "model": body.get("model", "stub")}
+
+        if not body.get("stream"):
+            return {**base, "object": "chat.completion", "choices": [{
+                "index": 0, "finish_reason": "stop",
+                "message": {"role": "assistant", "content": text},
+            }]}
+
+        async def chunks():
+            for word in re.findall(r"\S+\s*", text):
+                chunk = {**base, "object": "chat.completion.chunk", "choices": [{
+                    "index": 0, "finish_reason": None, "delta": {"content": word},
+                }]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+
+class StubServer:
+    """Runs an ASGI app with uvicorn on 127.0.0.1 in a daemon thread."""
+
+    def __init__(self, app, port: int = 0):
+        self.app = app
+        self.port = port or self._free_port()
+        self._server = None
+        self._thread = None
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> str:
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self._server.started:
+            if time.time() > deadline:
+                raise RuntimeError(f"Stub server on port {self.port} did not start")
+            time.sleep(0.02)
+        return self.url
+
+    def stop(self):
+        if self._server:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,161 @@
+import sys
+import os
+import time
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.admission import AdmissionController, AdmissionRejected
+
+def make_controller(max_concurrent=2, queue_budget=0.5, rate_per_minute=6000, burst=100):
+    controller = AdmissionController()
+    controller.enabled = True
+    controller.max_concurrent = max_concurrent
+    controller.queue_budget = queue_budget
+    controller.rate_per_minute = rate_per_minute
+    controller.burst = burst
+    return controller
+
+async def check_admission():
+    # 1. Per-user token bucket: burst allowed, then an immediate 429 with Retry-After
+    controller = make_controller(rate_per_minute=6, burst=2)
+    for _ in range(2):
+        (await controller.acquire("user:1"))()
+    try:
+        await controller.acquire("user:1")
+        assert False, "expected rate limit"
+    except AdmissionRejected as e:
+        assert e.reason == "rate_limited" and int(e.retry_after_header) >= 1
+    (await controller.acquire("user:2"))()  # doosre user ka quota alag
+    print("✅ Per-user quota enforced with Retry-After")
+
+    # 1b. Quota key (client IP) se bucket: naya session_id/user_id quota reset nahi karta
+    controller = make_controller(rate_per_minute=6, burst=2)
+    for n in range(2):
+        (await controller.acquire(f"session:s{n}", "ip:10.0.0.1"))()
+    try:
+        await controller.acquire("session:fresh", "ip:10.0.0.1")
+        assert False, "expected rate limit"
+    except AdmissionRejected as e:
+        assert e.reason == "rate_limited"
+    (await controller.acquire("session:fresh", "ip:10.0.0.2"))()
+    print("✅ Rotating session ids doesn't bypass the per-IP quota")
+
+    # 2. Bounded concurrency; queued request runs when a slot frees up
+    controller = make_controller(max_concurrent=2)
+    first = await controller.acquire("a")
+    second = await controller.acquire("b")
+    waiting = asyncio.create_task(controller.acquire("c"))
+    await asyncio.sleep(0.05)
+    assert controller.active == 2 and controller.queued == 1 and not waiting.done()
+    first()
+    first()  # release idempotent hai
+    third = await waiting
+    assert controller.active == 2 and controller.queued == 0
+    second(); third()
+    assert controller.active == 0
+    print("✅ Concurrency bounded, queue drains on release")
+
+    # 3. Queue wait over budget -> fast rejection, not a pile-up
+    controller = make_controller(max_concurrent=1, queue_budget=0.2)
+    held = await controller.acquire("a")
+    start = time.perf_counter()
+    try:
+        await controller.acquire("b")
+        assert False, "expected overload rejection"
+    except AdmissionRejected as e:
+        assert e.reason == "overloaded"
+    assert time.perf_counter() - start < 0.5 and controller.queued == 0
+    held()
+    print("✅ Queue budget exceeded -> 429 within the budget")
+
+    # 4. Fairness: a heavy user's backlog doesn't starve a light user
+    controller = make_controller(max_concurrent=1, queue_budget=5)
+    order = []
+    held = await controller.acquire("heavy")
+
+    async def request(key):
+        release = await controller.acquire(key)
+        order.append(key)
+        await asyncio.sleep(0.01)
+        release()
+
+    tasks = [asyncio.create_task(request("heavy")) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    tasks.append(asyncio.create_task(request("light")))
+    await asyncio.sleep(0.01)
+    held()
+    await asyncio.gather(*tasks)
+    assert order.index("light") <= 1, order
+    print(f"✅ Round-robin across users: {order}")
+
+    # 5. A queued client that disconnects gives its place back
+    controller = make_controller(max_concurrent=1, queue_budget=5)
+    held = await controller.acquire("a")
+    gone = asyncio.create_task(controller.acquire("b"))
+    await asyncio.sleep(0.01)
+    gone.cancel()
+    await asyncio.gather(gone, return_exceptions=True)
+    assert controller.queued == 0
+    held()
+    assert controller.active == 0
+    print("✅ Cancelled waiter leaves no slot or queue entry behind")
+
+def check_endpoint_429():
+    from fastapi.testclient import TestClient
+    import main
+
+    controller = main.admission_controller
+    controller.enabled = True
+    # TestClient ka client host "testclient" hai; quota IP par hai, session_id par nahi
+    bucket = controller._bucket("ip:testclient")
+    bucket.tokens = 0
+    client = TestClient(main.app)
+    response = client.post("/api/chat/agent", json={"message": "hi", "session_id": "quota-test"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    bucket.tokens = 0
+    fresh = client.post("/api/chat/agent", json={"message": "hi", "session_id": "brand-new", "user_id": 42})
+    assert fresh.status_code == 429
+    print(f"✅ /api/chat/agent returns 429 with Retry-After: {response.headers['retry-after']}s")
+
+    # Verified JWT: quota us user par, IP par nahi (NAT ke peeche doosre users bache rehte hain)
+    from fastapi import Request
+    from jose import jwt
+    import services.auth as auth
+
+    def quota_key(token):
+        scope = {"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())], "client": ("10.0.0.9", 1234)}
+        return main._quota_key(Request(scope))
+
+    auth.JWT_SECRET_KEY = "quota-test-secret"
+    try:
+        token = jwt.encode({"sub": "42"}, "quota-test-secret", algorithm="HS256")
+        assert quota_key(token) == "user:42"
+        controller._bucket("user:42").tokens = 0
+        bucket.tokens = bucket.capacity
+        limited = client.post("/api/chat/agent", json={"message": "hi"}, headers={"Authorization": f"Bearer {token}"})
+        assert limited.status_code == 429
+        # Forged token = unauthenticated, IP quota (abhi bhara hua) lagta hai
+        forged = jwt.encode({"sub": "42"}, "not-the-secret", algorithm="HS256")
+        assert quota_key(forged) == "ip:10.0.0.9"
+        print("✅ Authenticated requests are limited per JWT user, forged tokens fall back to the IP")
+    finally:
+        auth.JWT_SECRET_KEY = None
+
+    # Trusted proxy: uvicorn ka ProxyHeadersMiddleware X-Forwarded-For ko client IP banata hai
+    from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+    proxied = TestClient(ProxyHeadersMiddleware(main.app, trusted_hosts="*"))
+    controller._bucket("ip:203.0.113.9").tokens = 0
+    bucket.tokens = bucket.capacity
+    behind_proxy = proxied.post("/api/chat/agent", json={"message": "hi"}, headers={"X-Forwarded-For": "203.0.113.9"})
+    assert behind_proxy.status_code == 429
+    print("✅ Behind a trusted proxy the quota uses the forwarded client IP")
+
+def test_admission():
+    asyncio.run(check_admission())
+    check_endpoint_429()
+
+if __name__ == "__main__":
+    test_admission()
@@ -0,0 +1,73 @@
+import sys
+import os
+import json
+import time
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.card_payloads import SchemeCardCache, FastJSONResponse, CARD_KEYS
+from agents.graph import card_from_row
+
+def load_cards():
+    with open(os.path.join(os.path.dirname(__file__), "..", "data", "schemes.json")) as f:
+        schemes = json.load(f)
+    # DB rows jaise: id + kuch JSON columns string form mein
+    cards = [{**s, "id": i + 1, "explanation_snippet": "snippet"} for i, s in enumerate(schemes)]
+    cards[0] = {**cards[0], "benefits": json.dumps(cards[0]["benefits"])}
+    return cards
+
+def test_card_payloads():
+    cards = load_cards()
+    cache = SchemeCardCache()
+    broken = {**cards[1], "id": 999, "link": "not a url"}
+    cache.build(cards + [broken])
+    assert len(cache) == len(cards) and cache.invalid == 1
+    print(f"✅ {len(cache)} cards validated and pre-serialized, 1 invalid row skipped")
+
+    # 1. Payload = agent card shape (string id, parsed JSON fields, no internal keys)
+    card = cache.card(1)
+    assert tuple(card) == CARD_KEYS and card["id"] == "1"
+    assert isinstance(card["benefits"], list) and isinstance(card["eligibility_criteria"], dict)
+    assert cache.card(999) is None and cache.card("missing") is None
+    card["relevance_score"] = 91
+    assert "relevance_score" not in cache.card(1)
+    print("✅ Cached cards match the agent card shape and are copied per request")
+
+    # 2. Overlay splice: cached bytes + per-request fields decode to the full card
+    card["explanation"] = "Fits because \"quotes\" & ₹ survive"
+    assert json.loads(cache.encode(card)) == card
+    plain = cache.card(2)
+    assert json.loads(cache.encode(plain)) == plain
+    slow = {**card_from_row(broken), "relevance_score": 10}
+    assert json.loads(cache.encode(slow)) == slow
+    body = cache.encode_with_schemes({"response": "hi", "agent": "scheme", "analysis_id": None}, [card, slow])
+    assert json.loads(body) == {"response": "hi", "agent": "scheme", "analysis_id": None, "schemes": [card, slow]}
+    assert json.loads(cache.encode_with_schemes({}, [])) == {"schemes": []}
+    print("✅ Spliced JSON decodes to the same cards (cached and slow-path)")
+
+    # 3. Fast response class passes pre-encoded bytes straight through
+    assert FastJSONResponse(body).body == body
+    assert json.loads(FastJSONResponse({"a": [1, "₹"]}).body) == {"a": [1, "₹"]}
+
+    # 4. Hot path vs per-request parse + json.dumps
+    rows = cards[:3]
+    runs = 2000
+    start = time.perf_counter()
+    for _ in range(runs):
+        schemes = [{**card_from_row(r), "relevance_score": 80, "explanation": "x"} for r in rows]
+        json.dumps({"response": "hi", "schemes": schemes}, ensure_ascii=False)
+    slow_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(runs):
+        schemes = []
+        for r in rows:
+            sd = cache.card(r["id"])
+            sd.update(relevance_score=80, explanation="x")
+            schemes.append(sd)
+        cache.encode_with_schemes({"response": "hi"}, schemes)
+    fast_s = time.perf_counter() - start
+    print(f"✅ Card assembly + encode: {slow_s / runs * 1e6:.0f}µs -> {fast_s / runs * 1e6:.0f}µs per response")
+
+if __name__ == "__main__":
+    test_card_payloads()
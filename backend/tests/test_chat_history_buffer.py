@@ -0,0 +1,183 @@
+import sys
+import os
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select, func, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from models import ChatHistory, ChatSession, User
+from services.chat_history_service import ChatHistoryService
+from tests.stubs import make_session_factory
+
+async def check_write_behind():
+    # Local SQLite stand-in for Postgres (sirf chat_history table)
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    session_factory = await make_session_factory(engine, ChatHistory, ChatSession)
+
+    service = ChatHistoryService(session_factory=session_factory)
+    service.write_behind = True
+    service.flush_size = 50
+    service.flush_interval = 0.2
+    await service.start()
+
+    # 1. Enqueue is non-blocking: nothing written yet
+    for i in range(40):
+        await service.add_message(f"s{i % 4}", "user" if i % 2 == 0 else "assistant", f"message {i}")
+    assert service.queue_depth == 40
+    print("✅ 40 messages queued without touching the DB")
+
+    # 2. Time threshold flushes them in one batch
+    await asyncio.sleep(0.5)
+    assert service.queue_depth == 0 and service.batches == 1 and service.flushed == 40
+    print("✅ Time-based flush wrote one multi-row batch")
+
+    # 3. Size threshold wakes the flusher early
+    service.flush_interval = 30
+    await asyncio.sleep(0.25)
+    for i in range(50):
+        await service.add_message("big", "user", f"bulk {i}")
+    await asyncio.sleep(0.1)
+    assert service.queue_depth == 0 and service.batches == 2
+    print("✅ Size-based flush triggered before the interval")
+
+    # 4. Reads flush first and keep enqueue order
+    await service.add_message("s0", "assistant", "latest reply")
+    async with session_factory() as db:
+        history, _ = await service.get_session_history(db, "s0")
+    assert history[-1].content == "latest reply"
+    print("✅ Reads see queued messages in order")
+
+    # 5. Shutdown flushes the remainder
+    await service.add_message("s1", "user", "last words")
+    await service.stop()
+    async with session_factory() as db:
+        total = (await db.execute(select(func.count(ChatHistory.id)))).scalar()
+    assert total == 92 and service.queue_depth == 0
+    print(f"✅ Shutdown flush complete ({total} rows, {service.batches} batches)")
+
+    # 6. Session summaries were upserted incrementally with every flush
+    async with session_factory() as db:
+        sessions, _ = await service.get_user_sessions(db, limit=10)
+    counts = {s["session_id"]: s["message_count"] for s in sessions}
+    assert counts == {"s0": 11, "s1": 11, "s2": 10, "s3": 10, "big": 50}
+    assert sessions[0]["session_id"] == "s1"
+    assert next(s for s in sessions if s["session_id"] == "big")["title"] == "bulk 0"
+    print("✅ chat_sessions counts, titles and recency are correct")
+
+    await engine.dispose()
+
+async def check_keyset_pagination():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    session_factory = await make_session_factory(engine, ChatHistory, ChatSession)
+    service = ChatHistoryService(session_factory=session_factory)
+    service.write_behind = False
+
+    for i in range(7):
+        await service.add_message("chat", "user", f"turn {i}")
+    for n in range(5):
+        await service.add_message(f"other-{n}", "user", f"hello {n}")
+
+    # History: newest page first, each page oldest->newest, cursor walks backwards
+    pages = []
+    cursor = None
+    async with session_factory() as db:
+        while True:
+            page, cursor = await service.get_session_history(db, "chat", limit=3, cursor=cursor)
+            pages.append([m.content for m in page])
+            if not cursor:
+                break
+    assert pages == [["turn 4", "turn 5", "turn 6"], ["turn 1", "turn 2", "turn 3"], ["turn 0"]]
+    print("✅ History keyset pagination walks back through the session")
+
+    # Sessions: newest activity first, no duplicates across pages
+    seen = []
+    cursor = None
+    async with session_factory() as db:
+        while True:
+            page, cursor = await service.get_user_sessions(db, limit=2, cursor=cursor)
+            seen.extend(s["session_id"] for s in page)
+            if not cursor:
+                break
+    assert seen == ["other-4", "other-3", "other-2", "other-1", "other-0", "chat"]
+    print("✅ Session keyset pagination is ordered and complete")
+
+    # Backfill rebuilds summaries from chat_history when the table is empty
+    async with session_factory() as db:
+        await db.execute(ChatSession.__table__.delete())
+        await db.commit()
+        assert await service.backfill_sessions(db) == 6
+        sessions, _ = await service.get_user_sessions(db, limit=10)
+    assert {s["session_id"]: s["message_count"] for s in sessions}["chat"] == 7
+    print("✅ Backfill recreated session summaries")
+
+    await engine.dispose()
+
+async def check_poison_rows():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    # SQLite default mein foreign keys enforce nahi karta - Postgres jaisa behaviour chahiye
+    event.listen(engine.sync_engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    session_factory = await make_session_factory(engine, User, ChatHistory, ChatSession)
+    async with engine.begin() as conn:
+        await conn.execute(User.__table__.insert().values(id=1, email="a@example.com"))
+
+    service = ChatHistoryService(session_factory=session_factory)
+    service.write_behind = True
+    service.flush_interval = 30
+    service.max_retries = 2
+    await service.start()
+
+    # 1. Unknown user_id breaks the users.id FK for the whole batch
+    await service.add_message("p", "user", "good 1", user_id=1)
+    await service.add_message("p", "user", "poison", user_id=999)
+    await service.add_message("p", "assistant", "good 2", user_id=1)
+    assert await service.flush() == 0 and await service.flush() == 0
+    assert service.queue_depth == 3
+    print("✅ Failed batch re-queued up to max_retries")
+
+    # 2. Retries exhausted: good rows written one by one, poison row dropped
+    assert await service.flush() == 2
+    assert service.queue_depth == 0 and service.dropped == 1
+    await service.add_message("p", "user", "after", user_id=1)
+    assert await service.flush() == 1
+    async with session_factory() as db:
+        contents = (await db.execute(select(ChatHistory.content).order_by(ChatHistory.id))).scalars().all()
+    assert contents == ["good 1", "good 2", "after"]
+    print("✅ Poison row dropped, later writes unblocked")
+    await service.stop()
+    await engine.dispose()
+
+    # 3. DB completely down: queue never grows past max_queue
+    def broken_factory():
+        raise ConnectionError("database unreachable")
+
+    down = ChatHistoryService(session_factory=broken_factory)
+    down.write_behind = True
+    down.flush_interval = 30
+    down.max_queue = 5
+    down.max_retries = 100
+    await down.start()
+    for i in range(12):
+        await down.add_message("d", "user", f"lost {i}")
+        assert down.queue_depth <= down.max_queue
+    assert down.dropped > 0
+    down._task.cancel()
+    print(f"✅ Queue capped at {down.max_queue} while the DB is down ({down.dropped} dropped)")
+
+def test_chat_history_write_behind():
+    print("\n--- Testing Chat History Write-Behind ---")
+    asyncio.run(check_write_behind())
+
+def test_history_keyset_pagination():
+    print("\n--- Testing History Keyset Pagination ---")
+    asyncio.run(check_keyset_pagination())
+
+def test_chat_history_poison_rows():
+    print("\n--- Testing Chat History Retry Cap ---")
+    asyncio.run(check_poison_rows())
+
+if __name__ == "__main__":
+    test_chat_history_write_behind()
+    test_chat_history_poison_rows()
+    test_history_keyset_pagination()
@@ -0,0 +1,71 @@
+import sys
+import os
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+import agents.checkpointer as checkpointer
+from agents.checkpointer import LatestOnlyMemorySaver, open_checkpointer
+
+def echo_graph(saver):
+    async def reply(state):
+        return {"messages": [AIMessage(content=f"echo: {state['messages'][-1].content}")]}
+
+    workflow = StateGraph(MessagesState)
+    workflow.add_node("reply", reply)
+    workflow.add_edge(START, "reply")
+    workflow.add_edge("reply", END)
+    return workflow.compile(checkpointer=saver)
+
+async def turn(graph, thread_id, text):
+    config = {"configurable": {"thread_id": thread_id}}
+    return await graph.ainvoke({"messages": [HumanMessage(content=text)]}, config)
+
+async def check_latest_only():
+    saver = LatestOnlyMemorySaver(max_threads=2)
+    graph = echo_graph(saver)
+
+    # 1. Har turn kai checkpoints likhta hai; sirf latest bachta hai, state poori rehti hai
+    for n in range(3):
+        result = await turn(graph, "s1", f"question {n}")
+    assert len(result["messages"]) == 6
+    (latest_id,) = saver.storage["s1"][""].keys()
+    assert all(key[2] == latest_id for key in saver.writes if key[0] == "s1")
+    latest = saver.get_tuple({"configurable": {"thread_id": "s1", "checkpoint_ns": ""}})
+    blob_keys = {(key[2], key[3]) for key in saver.blobs if key[0] == "s1"}
+    assert blob_keys <= set(latest.checkpoint["channel_versions"].items())
+    assert [m.content for m in latest.checkpoint["channel_values"]["messages"]][-1] == "echo: question 2"
+    print("✅ One checkpoint per thread after several turns, conversation state intact")
+
+    # 2. Thread cap: least recently written session is evicted
+    await turn(graph, "s2", "hello")
+    await turn(graph, "s1", "question 3")
+    await turn(graph, "s3", "hello")
+    assert set(saver.storage) == {"s1", "s3"}
+    assert not any(key[0] == "s2" for key in list(saver.writes) + list(saver.blobs))
+    result = await turn(graph, "s1", "question 4")
+    assert len(result["messages"]) == 10
+    print("✅ MemorySaver capped at max_threads, oldest session dropped")
+
+async def check_fallback_warning(capsys):
+    async with open_checkpointer() as saver:
+        assert isinstance(saver, LatestOnlyMemorySaver) and saver.max_threads == 50
+    assert "single worker only" in capsys.readouterr().out
+    print("✅ In-memory fallback warns and is capped")
+
+def test_latest_only_checkpoints():
+    asyncio.run(check_latest_only())
+
+def test_memory_fallback_warning(monkeypatch, capsys):
+    monkeypatch.delenv("CHECKPOINT_DATABASE_URL", raising=False)
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///maya.sqlite3")
+    monkeypatch.setattr(checkpointer, "MEMORY_MAX_THREADS", 50)
+    asyncio.run(check_fallback_warning(capsys))
+
+if __name__ == "__main__":
+    test_latest_only_checkpoints()
@@ -0,0 +1,53 @@
+import sys
+import os
+import json
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.eligibility_index import EligibilityIndex
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'schemes.json')
+
+def load_index():
+    with open(DATA_PATH, "r") as f:
+        schemes = json.load(f)
+    index = EligibilityIndex()
+    index.build(schemes)
+    return schemes, index
+
+def eligible_names(schemes, mask):
+    return {s["name"] for s, ok in zip(schemes, mask) if ok}
+
+def test_eligibility_prefilter():
+    print("\n--- Testing Eligibility Pre-filter ---")
+    schemes, index = load_index()
+
+    # Empty profile -> no filtering
+    assert index.mask({}) is None
+
+    # Non-UP user ko UP-only schemes nahi dikhni chahiye
+    maharashtra = eligible_names(schemes, index.mask({"location": "Maharashtra"}))
+    assert "UP Startup Policy 2020" not in maharashtra
+    assert "Stand-Up India" in maharashtra
+    up = eligible_names(schemes, index.mask({"location": "Uttar Pradesh"}))
+    assert "UP Startup Policy 2020" in up
+    print(f"✅ Geography: Maharashtra={len(maharashtra)}, Uttar Pradesh={len(up)} eligible")
+
+    # SC-only scheme general category user ke liye filter ho jaani chahiye
+    general = eligible_names(schemes, index.mask({"social_category": "OBC"}))
+    sc = eligible_names(schemes, index.mask({"social_category": "SC"}))
+    assert "Venture Capital Fund for SC" in sc
+    assert "Venture Capital Fund for SC" not in general
+    women = eligible_names(schemes, index.mask({"gender": "female"}))
+    assert "Stand-Up India" in women
+    print(f"✅ Social category: SC={len(sc)}, OBC={len(general)}, Women={len(women)} eligible")
+
+    # Unknown industry vocabulary -> filter skip, known -> narrows
+    assert index.mask({"industry": "bakery"}) is None
+    textiles = index.mask({"industry": "Textiles"})
+    assert 0 < textiles.sum() < len(schemes)
+    print(f"✅ Sector: Textiles={int(textiles.sum())} eligible")
+
+if __name__ == "__main__":
+    test_eligibility_prefilter()
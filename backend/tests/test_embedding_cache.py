@@ -0,0 +1,46 @@
+import sys
+import os
+import asyncio
+import tempfile
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.embedding_cache import EmbeddingCache
+
+MODEL = "models/text-embedding-004"
+
+async def check_persistence(path):
+    # 1. Write through both tiers
+    cache = EmbeddingCache(path=path, maxsize=8)
+    cache.enabled = True
+    await cache.set_many(MODEL, ["mudra loan", "stand up india", "empty"], [[0.25, -1.5, 3.0], [1.0, 2.0, 4.0], []])
+    assert await cache.get(MODEL, "mudra loan") == [0.25, -1.5, 3.0] and cache.disk_hits == 0
+    assert os.path.exists(path)
+    print("✅ Vectors served from the in-process tier after set")
+
+    # 2. "Restart": a fresh instance on the same file reads from SQLite, then from memory
+    restarted = EmbeddingCache(path=path, maxsize=8)
+    restarted.enabled = True
+    results = await restarted.get_many(MODEL, ["stand up india", "never seen", "mudra loan", "empty"])
+    assert results == [[1.0, 2.0, 4.0], None, [0.25, -1.5, 3.0], None], results
+    assert restarted.disk_hits == 2
+    assert await restarted.get(MODEL, " mudra loan ") == [0.25, -1.5, 3.0] and restarted.disk_hits == 2
+    print("✅ Vectors survive a restart (SQLite tier), order kept, memory tier refilled")
+
+    # 3. Keys are scoped per model
+    assert await restarted.get("other-model", "mudra loan") is None
+    print("✅ Same text under another model misses")
+
+    for instance in (cache, restarted):
+        instance._conn.close()
+
+def check_embedding_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(check_persistence(os.path.join(tmp, "nested", "embeddings.sqlite3")))
+
+def test_embedding_cache():
+    check_embedding_cache()
+
+if __name__ == "__main__":
+    check_embedding_cache()
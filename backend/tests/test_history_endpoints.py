@@ -0,0 +1,72 @@
+import sys
+import os
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import main
+from database import get_db
+from models import ChatHistory, ChatSession
+from services.chat_history_service import chat_history_service
+from tests.stubs import make_session_factory
+
+
+class FakeGraph:
+    """Stand-in for app_graph: har message ka fixed reply, no LLM/DB."""
+
+    async def ainvoke(self, state, config):
+        return {"messages": [*state["messages"], AIMessage(content="noted")], "current_agent": "general", "schemes": []}
+
+
+def test_sessions_by_user(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    session_factory = asyncio.run(make_session_factory(engine, ChatHistory, ChatSession))
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    monkeypatch.setattr(main, "app_graph", FakeGraph())
+    # Lifespan nahi chalta, isliye flusher off - add_message seedha DB mein likhta hai
+    monkeypatch.setattr(chat_history_service, "session_factory", session_factory)
+    monkeypatch.setattr(main.admission_controller, "enabled", False)
+    monkeypatch.setitem(main.app.dependency_overrides, get_db, override_get_db)
+    try:
+        client = TestClient(main.app)
+        for n in range(3):
+            resp = client.post("/api/chat/agent", json={"message": f"user 7 chat {n}", "session_id": f"u7-{n}", "user_id": 7})
+            assert resp.status_code == 200, resp.text
+        client.post("/api/chat/agent", json={"message": "someone else", "session_id": "u8-0", "user_id": 8})
+        client.post("/api/chat/agent", json={"message": "anonymous", "session_id": "anon-0"})
+
+        # user_id filter, keyset pages of 2
+        seen, cursor = [], None
+        while True:
+            params = {"user_id": 7, "limit": 2, **({"cursor": cursor} if cursor else {})}
+            page = client.get("/api/history/sessions", params=params).json()
+            seen.extend(s["session_id"] for s in page["sessions"])
+            assert all(s["message_count"] == 2 for s in page["sessions"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        assert seen == ["u7-2", "u7-1", "u7-0"], seen
+        print("✅ /api/history/sessions?user_id= pages only that user's sessions")
+
+        others = client.get("/api/history/sessions", params={"user_id": 8}).json()["sessions"]
+        assert [s["session_id"] for s in others] == ["u8-0"]
+        everyone = client.get("/api/history/sessions").json()["sessions"]
+        assert len(everyone) == 5
+        print("✅ Other users (and unfiltered listing) unaffected")
+    finally:
+        asyncio.run(engine.dispose())
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as mp:
+        test_sessions_by_user(mp)
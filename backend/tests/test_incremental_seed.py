@@ -0,0 +1,109 @@
+import sys
+import os
+import json
+import asyncio
+import tempfile
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+import seed
+from models import Scheme
+from tests.stubs import stub_embedding
+
+async def rows_by_name(session_factory):
+    async with session_factory() as session:
+        result = await session.execute(select(Scheme.id, Scheme.name, Scheme.description, Scheme.link, Scheme.content_hash))
+        return {row.name: row for row in result.all()}
+
+async def check_reseed(workdir, monkeypatch):
+    # Same throwaway SQLite setup as tests/load_harness.py, stub vectors instead of Gemini
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(workdir, 'maya.sqlite3')}")
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    embedded = []
+
+    async def fake_embed_documents(texts):
+        embedded.append(list(texts))
+        return [stub_embedding(t) for t in texts]
+
+    monkeypatch.setattr(seed, "engine", engine)
+    monkeypatch.setattr(seed, "AsyncSessionLocal", session_factory)
+    monkeypatch.setattr(seed.gemini_service, "embed_documents", fake_embed_documents)
+    monkeypatch.setattr(seed, "START_RATE", 100.0)
+
+    with open(seed.SCHEMES_PATH) as f:
+        schemes = json.load(f)
+    path = os.path.join(workdir, "schemes.json")
+
+    def write_catalogue(data):
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+    try:
+        # 1. First seed: every scheme embedded and inserted
+        write_catalogue(schemes)
+        stats = await seed.seed_schemes(path=path)
+        assert stats["inserted"] == len(schemes) and sum(map(len, embedded)) == len(schemes)
+        before = await rows_by_name(session_factory)
+        # Purane non-incremental seed ka duplicate row
+        dup = schemes[3]
+        async with session_factory() as session, session.begin():
+            await session.execute(insert(Scheme), [{**seed.scheme_row(dup), "embedding": stub_embedding(dup["name"])}])
+        print(f"✅ Initial seed: {len(schemes)} schemes in {len(embedded)} batch call(s)")
+
+        # 2. One embedded edit, one card-only edit, one removal
+        edited = [dict(s) for s in schemes]
+        edited[0]["description"] += " Now covers service enterprises too."
+        edited[1]["link"] = "https://example.gov.in/updated"
+        removed = edited.pop(2)["name"]
+        write_catalogue(edited)
+        embedded.clear()
+        stats = await seed.seed_schemes(path=path)
+        assert embedded == [[seed.build_embedding_text(edited[0])]], embedded
+        assert stats == {"inserted": 0, "re_embedded": 1, "updated": 1, "deleted": 2,
+                         "unchanged": len(edited) - 2, "skipped": 0}, stats
+
+        after = await rows_by_name(session_factory)
+        first, second = edited[0]["name"], edited[1]["name"]
+        assert removed not in after and len(after) == len(edited)
+        assert after[first].id == before[first].id and after[first].content_hash != before[first].content_hash
+        assert after[first].description == edited[0]["description"]
+        assert after[second].link == edited[1]["link"] and after[second].content_hash == before[second].content_hash
+        assert after[dup["name"]].id == before[dup["name"]].id
+        print("✅ Editing one scheme = one embedded text; field-only update, removed + duplicate rows deleted")
+
+        # 3. Nothing changed: no embedding call, no writes
+        embedded.clear()
+        stats = await seed.seed_schemes(path=path)
+        assert embedded == [] and stats["unchanged"] == len(edited)
+        assert stats["inserted"] + stats["re_embedded"] + stats["updated"] + stats["deleted"] == 0
+        print("✅ Unchanged reseed makes no embedding call")
+
+        # 4. Writes are one transaction: a failing DELETE rolls back the UPDATE before it
+        broken = [dict(s) for s in edited[:-1]]
+        broken[0]["link"] = "https://example.gov.in/never-committed"
+        write_catalogue(broken)
+
+        def failing_delete(*args):
+            raise RuntimeError("delete failed")
+        monkeypatch.setattr(seed, "delete", failing_delete)
+        with pytest.raises(RuntimeError):
+            await seed.seed_schemes(path=path)
+        rows = await rows_by_name(session_factory)
+        assert rows[first].link == after[first].link and len(rows) == len(edited)
+        print("✅ Failed write leaves the table exactly as it was")
+    finally:
+        await engine.dispose()
+
+def test_incremental_seed(monkeypatch):
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(check_reseed(workdir, monkeypatch))
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as mp:
+        test_incremental_seed(mp)
@@ -0,0 +1,129 @@
+import sys
+import os
+import json
+import asyncio
+import tempfile
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import delete, insert, update
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+import main
+import services.auth as auth
+from database import Base, get_db
+from models import Scheme
+from seed import SCHEMES_PATH, scheme_row, build_embedding_text
+from services.card_payloads import SchemeCardCache
+from services.eligibility_index import EligibilityIndex
+from services.lexical_index import BM25Index
+from services.scheme_service import SchemeService
+from services.vector_index import SchemeVectorIndex
+from tests.stubs import stub_embedding
+
+with open(SCHEMES_PATH) as f:
+    SCHEMES = json.load(f)[:4]
+
+def fresh_service():
+    """SchemeService with its own indexes (scheme_service singleton untouched)."""
+    service = SchemeService()
+    service.index, service.lexical_index = SchemeVectorIndex(), BM25Index()
+    service.eligibility_index, service.card_payloads = EligibilityIndex(), SchemeCardCache()
+    return service
+
+async def check_per_worker_refresh(db_url):
+    engine = create_async_engine(db_url)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Scheme), [
+            {**scheme_row(s), "embedding": stub_embedding(build_embedding_text(s))} for s in SCHEMES
+        ])
+
+    # Do "workers", dono ka apna index
+    workers = [fresh_service(), fresh_service()]
+    try:
+        for worker in workers:
+            worker.poll_interval = 0.05
+            async with session_factory() as db:
+                assert await worker.reload_index(db) == 4
+                assert not await worker.refresh_if_stale(db)
+
+        # 1. Reseed deletes a row: every worker reloads on its own poll, no HTTP call
+        for worker in workers:
+            await worker.start_watcher(session_factory)
+        async with session_factory() as db, db.begin():
+            await db.execute(delete(Scheme).where(Scheme.name == SCHEMES[3]["name"]))
+        # Poll interval 0.05s; slow CI ke liye 3s tak wait
+        for _ in range(60):
+            if all(len(w.index) == 3 for w in workers):
+                break
+            await asyncio.sleep(0.05)
+        assert [len(w.index) for w in workers] == [3, 3]
+        print("✅ Every worker reloaded after a delete")
+
+        # 2. Field-only UPDATE (same row count) also bumps the version
+        for worker in workers:
+            await worker.stop_watcher()
+        # SQLite CURRENT_TIMESTAMP second resolution hai
+        await asyncio.sleep(1.1)
+        async with session_factory() as db, db.begin():
+            row_id = workers[0].index.cards[0]["id"]
+            await db.execute(update(Scheme), [{"id": row_id, "link": "https://example.gov.in/new"}])
+        for worker in workers:
+            async with session_factory() as db:
+                assert await worker.refresh_if_stale(db)
+            assert worker.card_payloads.card(row_id)["link"] == "https://example.gov.in/new"
+        print("✅ Field-only update detected by the version check")
+    finally:
+        for worker in workers:
+            await worker.stop_watcher()
+        await engine.dispose()
+
+def test_per_worker_refresh():
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(check_per_worker_refresh(f"sqlite+aiosqlite:///{os.path.join(workdir, 'maya.sqlite3')}"))
+
+def test_reload_requires_admin(monkeypatch):
+    reloads = []
+
+    async def fake_reload(db):
+        reloads.append(db)
+        return 4
+
+    async def no_db():
+        yield None
+
+    monkeypatch.setattr(auth, "ADMIN_API_TOKEN", "ops-secret")
+    monkeypatch.setattr(auth, "JWT_SECRET_KEY", "jwt-secret")
+    monkeypatch.setattr(main.scheme_service, "reload_index", fake_reload)
+    monkeypatch.setitem(main.app.dependency_overrides, get_db, no_db)
+    client = TestClient(main.app)
+
+    def post(headers=None):
+        return client.post("/api/schemes/reload", headers=headers or {}).status_code
+
+    assert post() == 401
+    assert post({"X-Admin-Token": "guess"}) == 403
+    user_jwt = jwt.encode({"sub": "7", "role": "user"}, "jwt-secret", algorithm="HS256")
+    assert post({"Authorization": f"Bearer {user_jwt}"}) == 403
+    forged = jwt.encode({"sub": "1", "role": "admin"}, "not-the-secret", algorithm="HS256")
+    assert post({"Authorization": f"Bearer {forged}"}) == 403
+    assert reloads == []
+    print("✅ Reload rejected without valid admin credentials")
+
+    assert post({"X-Admin-Token": "ops-secret"}) == 200
+    admin_jwt = jwt.encode({"sub": "1", "role": "admin"}, "jwt-secret", algorithm="HS256")
+    assert post({"Authorization": f"Bearer {admin_jwt}"}) == 200
+    assert len(reloads) == 2
+    print("✅ Reload allowed with the admin token or an admin JWT")
+
+if __name__ == "__main__":
+    test_per_worker_refresh()
+    with pytest.MonkeyPatch.context() as mp:
+        test_reload_requires_admin(mp)
@@ -0,0 +1,63 @@
+import sys
+import os
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from prometheus_client import REGISTRY
+from tests.stubs import StubConfig, StubServer, create_jina_app, stub_embedding
+from services.jina_service import JinaService
+
+def http_errors(status):
+    return REGISTRY.get_sample_value("maya_provider_errors_total", {"provider": "jina", "operation": "embed",
+                                                                   "agent": "none", "error": f"HTTP {status}"}) or 0.0
+
+async def check_jina(base_url: str, config: StubConfig, app):
+    service = JinaService()
+    service.base_url = f"{base_url}/v1"
+    service.batch_size = 4
+    service.concurrency = 2
+
+    # 1. Single text (task= ab accepted hai)
+    vector = await service.embed_text("loans for small businesses", task="retrieval.query")
+    assert vector == stub_embedding("loans for small businesses")
+    print("✅ embed_text works with task argument")
+
+    # 2. Batch: chunked, order preserved, one pooled client
+    texts = [f"scheme number {i}" for i in range(10)]
+    client = service.client
+    vectors = await service.embed_texts(texts)
+    assert vectors == [stub_embedding(t) for t in texts]
+    assert sorted(app.state.batch_sizes[-3:]) == [2, 4, 4]
+    assert service.client is client
+    print("✅ embed_texts chunks 10 texts into 3 calls and keeps order")
+
+    # 3. Transient 503s are retried with backoff
+    config.fail_next = 2
+    config.error_status = 503
+    errors = http_errors(503)
+    vector = await service.embed_text("retry me")
+    assert vector == stub_embedding("retry me")
+    assert http_errors(503) == errors + 2
+    print("✅ Transient errors retried (and counted in maya_provider_errors_total)")
+
+    # 4. Non-retryable error fails fast
+    config.fail_next = 1
+    config.error_status = 401
+    before = config.requests
+    assert await service.embed_text("bad key") is None
+    assert config.requests == before + 1 and http_errors(401) >= 1
+    print("✅ Non-retryable errors are not retried")
+
+    await service.aclose()
+
+def test_jina_batch():
+    print("\n--- Testing Pooled Jina Client ---")
+    config = StubConfig()
+    app = create_jina_app(config)
+    with StubServer(app) as server:
+        asyncio.run(check_jina(server.url, config, app))
+
+if __name__ == "__main__":
+    test_jina_batch()
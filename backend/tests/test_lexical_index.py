@@ -0,0 +1,75 @@
+import sys
+import os
+import json
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from services.lexical_index import BM25Index, scheme_search_text, reciprocal_rank_fusion
+from services.vector_index import SchemeVectorIndex
+from services.scheme_service import SchemeService
+from services.gemini_service import gemini_service
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'schemes.json')
+
+# Exact names/acronyms jo embedding search miss kar deta hai
+CASES = [
+    ("Stand-Up India", "Stand-Up India"),
+    ("standup india loan", "Stand-Up India"),
+    ("PMFME", "PM Formalisation of Micro Food Processing Enterprises (PMFME)"),
+    ("SFURTI cluster", "Scheme of Fund for Regeneration of Traditional Industries (SFURTI)"),
+    ("PM SVANidhi street vendor", "PM SVANidhi"),
+    ("iDEX defence innovation", "Innovations for Defence Excellence (iDEX)"),
+]
+
+def test_bm25_exact_names():
+    print("\n--- Testing BM25 Lexical Index ---")
+    with open(DATA_PATH, "r") as f:
+        schemes = json.load(f)
+
+    index = BM25Index()
+    index.build([scheme_search_text(s) for s in schemes])
+
+    for query, expected in CASES:
+        hits = index.search(query, k=3)
+        top = schemes[hits[0][0]]["name"] if hits else None
+        print(f"{'✅' if top == expected else '❌'} '{query}' -> {top}")
+        assert top == expected
+
+    assert index.search("zzzz qqqq", k=3) == []
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[(1, 0.9), (2, 0.8), (3, 0.7)], [(3, 12.0), (1, 9.0)]])
+    # Row 1 dono lists mein upar hai -> first; row 3 dono mein hai -> row 2 se upar
+    assert [row for row, _ in fused] == [1, 3, 2]
+    print("✅ Reciprocal rank fusion verified.")
+
+def test_pgvector_lexical_fallback(monkeypatch):
+    with open(DATA_PATH, "r") as f:
+        cards = [{"id": i + 1, **s} for i, s in enumerate(json.load(f))]
+
+    # Alag instances, taaki scheme_service singleton ke indexes na badlein
+    service = SchemeService()
+    service.backend, service.index, service.lexical_index = "pgvector", SchemeVectorIndex(), BM25Index()
+
+    async def no_embedding(text):
+        return None
+
+    monkeypatch.setattr(gemini_service, "get_embeddings", no_embedding)
+    # 1. Index not loaded: nothing to fall back to
+    assert asyncio.run(service._search(None, "Stand-Up India", limit=3)) == []
+
+    # 2. Index loaded at startup: BM25 answers, Postgres never queried (db=None)
+    service.index.build(cards, [[1.0, 0.0]] * len(cards))
+    service.lexical_index.build([scheme_search_text(c) for c in cards])
+    results = asyncio.run(service._search(None, "standup india loan", limit=3))
+    assert results and results[0]["name"] == "Stand-Up India"
+    print("✅ pgvector backend falls back to BM25 when the query embedding fails")
+
+if __name__ == "__main__":
+    test_bm25_exact_names()
+    test_reciprocal_rank_fusion()
+    with pytest.MonkeyPatch.context() as mp:
+        test_pgvector_lexical_fallback(mp)
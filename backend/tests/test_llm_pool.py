@@ -0,0 +1,132 @@
+import sys
+import os
+import time
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from openai import AsyncOpenAI
+from services.llm_pool import LLMProvider, LLMProviderPool, CircuitBreaker, ProviderPoolError
+from tests.stubs import StubConfig, StubServer, create_openrouter_app
+
+def openai_provider(name, url, timeout=2.0, breaker=None):
+    """LLMProvider backed by an OpenAI-compatible stub server."""
+    client = AsyncOpenAI(api_key="stub", base_url=f"{url}/v1", max_retries=0)
+
+    async def complete(prompt, agent=None):
+        completion = await client.chat.completions.create(
+            model="stub", messages=[{"role": "user", "content": prompt}]
+        )
+        return completion.choices[0].message.content
+
+    return LLMProvider(name, complete, timeout=timeout, breaker=breaker)
+
+async def check_pool(primary_url, backup_url, primary_config):
+    prompt = "marketing ideas for my bakery"
+
+    # 1. Failover: primary returns 500 -> backup answers in the same call
+    primary_config.fail_next = 1
+    pool = LLMProviderPool([openai_provider("primary", primary_url), openai_provider("backup", backup_url)])
+    assert "practical plan" in await pool.complete(prompt)
+    assert pool.providers[0].failures == 1 and pool.providers[1].calls == 1
+    print("✅ Error on primary fails over to backup")
+
+    # 2. Per-provider timeout counts as a failure
+    primary_config.latency = 0.5
+    pool = LLMProviderPool([openai_provider("primary", primary_url, timeout=0.2),
+                            openai_provider("backup", backup_url)], hedging=False)
+    await pool.complete(prompt)
+    assert pool.providers[0].failures == 1
+    print("✅ Slow primary times out and fails over")
+
+    # 3. Hedging: after warm-up, a primary slower than its p95 gets hedged and the backup wins
+    primary_config.latency = 0.0
+    pool = LLMProviderPool([openai_provider("primary", primary_url), openai_provider("backup", backup_url)],
+                           hedge_min_delay=0.05, hedge_min_samples=5)
+    for _ in range(5):
+        await pool.complete(prompt)
+    assert pool.providers[1].calls == 0
+    primary_config.latency = 1.0
+    start = time.perf_counter()
+    await pool.complete(prompt)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 0.8, elapsed
+    assert pool.providers[1].calls == 1
+    print(f"✅ Hedged request answered by backup in {elapsed:.2f}s (primary stuck for 1s)")
+    primary_config.latency = 0.0
+
+    # 4. Circuit breaker: after 2 failures primary is skipped, then half-open trial closes it again
+    primary_config.fail_next = 2
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.3)
+    pool = LLMProviderPool([openai_provider("primary", primary_url, breaker=breaker),
+                            openai_provider("backup", backup_url)], hedging=False)
+    await pool.complete(prompt)
+    await pool.complete(prompt)
+    assert breaker.state == "open"
+    calls = primary_config.requests
+    await pool.complete(prompt)
+    assert primary_config.requests == calls, "open circuit must not send traffic"
+    await asyncio.sleep(0.35)
+    assert breaker.state == "half_open"
+    await pool.complete(prompt)
+    assert breaker.state == "closed"
+    stats = pool.stats()
+    assert stats["primary"]["failures"] == 2 and stats["backup"]["calls"] == 3
+    print(f"✅ Circuit opened, skipped, then closed after a half-open trial: {stats}")
+
+    # 5. Nothing left to try -> ProviderPoolError (MimoService turns it into the apology text)
+    async def broken(prompt, agent=None):
+        raise ConnectionError("down")
+    pool = LLMProviderPool([LLMProvider("a", broken), LLMProvider("b", broken)])
+    try:
+        await pool.complete(prompt)
+        assert False, "expected ProviderPoolError"
+    except ProviderPoolError:
+        pass
+    print("✅ All providers failing raises ProviderPoolError")
+
+async def check_trial_release():
+    """A half-open provider cancelled while waiting for its concurrency slot must stay eligible."""
+    gate = asyncio.Event()
+
+    async def blocked(prompt, agent=None):
+        await gate.wait()
+        return "ok"
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    provider = LLMProvider("slow", blocked, max_concurrency=1, breaker=breaker)
+    breaker.record_failure()
+    await asyncio.sleep(0.06)
+    assert breaker.state == "half_open"
+
+    # Slot kisi aur ke paas: pool ka call slot ke wait mein cancel ho jaata hai (hedge haara / caller gaya)
+    pool = LLMProviderPool([provider], hedging=False)
+    await provider._semaphore.acquire()
+    waiter = asyncio.create_task(pool.complete("hi"))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    try:
+        await waiter
+    except asyncio.CancelledError:
+        pass
+    provider._semaphore.release()
+
+    # Trial atka nahi: agla request provider tak pahunchta hai aur circuit close karta hai
+    gate.set()
+    assert await pool.complete("hi") == "ok"
+    assert breaker.state == "closed"
+    print("✅ Cancel during slot wait leaves the half-open trial available")
+
+def run_pool_checks():
+    primary_config = StubConfig()
+    with StubServer(create_openrouter_app(primary_config)) as primary, \
+         StubServer(create_openrouter_app(StubConfig())) as backup:
+        asyncio.run(check_pool(primary.url, backup.url, primary_config))
+    asyncio.run(check_trial_release())
+
+def test_llm_pool():
+    run_pool_checks()
+
+if __name__ == "__main__":
+    run_pool_checks()
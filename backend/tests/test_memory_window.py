@@ -0,0 +1,57 @@
+import sys
+import os
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph.message import add_messages
+import agents.graph as graph
+
+def conversation(turns, start=0):
+    messages = []
+    for n in range(start, start + turns):
+        messages += [HumanMessage(content=f"question {n}", id=f"h{n}"), AIMessage(content=f"answer {n}", id=f"a{n}")]
+    return messages
+
+async def check_memory_window(monkeypatch):
+    monkeypatch.setattr(graph, "MESSAGE_WINDOW", 4)
+    monkeypatch.setattr(graph, "SUMMARY_MAX_CHARS", 120)
+
+    # 1. Window not full: no update at all
+    assert await graph.memory_node({"messages": conversation(2)}) == {}
+    print("✅ Short conversation left untouched")
+
+    # 2. Over the window: oldest messages removed from state, folded into the summary
+    messages = conversation(3)
+    update = await graph.memory_node({"messages": messages})
+    kept = add_messages(messages, update["messages"])
+    assert [m.id for m in kept] == ["h1", "a1", "h2", "a2"]
+    assert update["summary"] == "User: question 0 | MAYA: answer 0"
+    print("✅ Oldest messages trimmed and folded into the summary")
+
+    # 3. Next eviction appends to the existing summary; context prompt carries it
+    kept += conversation(1, start=3)
+    update = await graph.memory_node({"messages": kept, "summary": update["summary"]})
+    assert update["summary"] == "User: question 0 | MAYA: answer 0 | User: question 1 | MAYA: answer 1"
+    kept = add_messages(kept, update["messages"])
+    assert len(kept) == 4
+    context = graph.conversation_context({"messages": kept, "summary": update["summary"]})
+    assert context.startswith("Earlier: User: question 0") and context.endswith("User: question 3")
+    print("✅ Summary accumulates across turns and reaches the prompt context")
+
+    # 4. Summary capped at SUMMARY_MAX_CHARS, newest text kept
+    long_turns = [HumanMessage(content="x" * 100, id=f"x{n}") for n in range(6)]
+    update = await graph.memory_node({"messages": long_turns, "summary": "old " * 50})
+    assert len(update["summary"]) == graph.SUMMARY_MAX_CHARS + 1 and update["summary"].startswith("…")
+    assert update["summary"].endswith("x" * 100)
+    print("✅ Summary capped, oldest text dropped first")
+
+def test_memory_window(monkeypatch):
+    asyncio.run(check_memory_window(monkeypatch))
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as mp:
+        test_memory_window(mp)
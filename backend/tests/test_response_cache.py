@@ -0,0 +1,128 @@
+import sys
+import os
+import re
+import time
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+import agents.router as router
+from services.mimo_service import mimo_service
+from services.gemini_service import gemini_service
+from services.response_cache import ResponseCache, response_cache
+from services.cache import LRUCache
+
+VOCAB = {}
+
+async def bag_of_words(text):
+    """Deterministic stand-in embedding: word counts over a growing vocabulary."""
+    vec = [0.0] * 2048
+    for word in re.findall(r"\w+", text.lower()):
+        vec[VOCAB.setdefault(word, len(VOCAB))] += 1
+    return vec
+
+def check_ttl_and_lru():
+    cache = ResponseCache()
+    cache.enabled = True
+    cache.ttls = {"router": 0.05, "market": 0}
+    cache._exact = LRUCache(maxsize=2)
+
+    # 1. Exact tier: normalized prompt, scoped per agent
+    cache.set("router", "MUDRA loan eligibility?", "scheme")
+    assert cache.get("router", "mudra  loan eligibility") == "scheme"
+    assert cache.get("general", "mudra loan eligibility") is None
+    print("✅ Exact hits survive case/punctuation changes, scoped per agent")
+
+    # 2. Per-agent TTL: entry expires, TTL 0 disables the agent
+    time.sleep(0.06)
+    assert cache.get("router", "mudra loan eligibility") is None
+    assert not cache.is_active("market") and cache.get("market", "anything") is None
+    print("✅ Per-agent TTL expiry; TTL 0 disables caching")
+
+    # 3. LRU: oldest untouched entry is evicted at maxsize
+    for prompt in ("a", "b"):
+        cache.set("general", prompt, prompt.upper())
+    cache.get("general", "a")
+    cache.set("general", "c", "C")
+    assert cache.get("general", "b") is None and cache.get("general", "a") == "A"
+    assert cache.stats()["evictions"] == 1
+    print("✅ LRU evicts the least recently used entry")
+
+    # 4. Semantic tier: threshold, per-scope vectors, expired exact entry not served
+    cache.semantic_threshold = 0.9
+    key = cache.set("general", "prompt around q1", "answer")
+    cache.set_semantic("general", key, [1.0, 0.0], scope="t1")
+    assert cache.get_semantic("general", [0.99, 0.1], scope="t1") == "answer"
+    assert cache.get_semantic("general", [0.5, 0.5], scope="t1") is None
+    assert cache.get_semantic("general", [1.0, 0.0], scope="t2") is None
+    cache._exact.pop(key)
+    assert cache.get_semantic("general", [1.0, 0.0], scope="t1") is None
+    assert len(cache._vectors[("general", "t1")]) == 0
+    print("✅ Semantic tier: threshold, scope and stale vectors handled")
+
+async def check_semantic_query_only(monkeypatch):
+    calls = {"llm": 0, "embedded": []}
+
+    async def fake_complete(prompt, agent=None, exclude=()):
+        calls["llm"] += 1
+        return "finance"
+
+    async def fake_embed(text):
+        calls["embedded"].append(text)
+        return await bag_of_words(text)
+
+    monkeypatch.setattr(mimo_service.pool, "complete", fake_complete)
+    monkeypatch.setattr(gemini_service, "get_embeddings", fake_embed)
+    monkeypatch.setattr(response_cache, "semantic_enabled", True)
+    monkeypatch.setattr(response_cache, "semantic_threshold", 0.85)
+    monkeypatch.setattr(response_cache, "semantic_hits", 0)
+
+    # 1. Sirf user query embed hoti hai, router template nahi
+    assert await router.classify_with_llm("loan for my bakery") == "finance"
+    assert calls["llm"] == 1 and calls["embedded"] == ["loan for my bakery"]
+    print("✅ Semantic tier embeds the user query, not the prompt template")
+
+    # 2. Rephrased query under the same template: served from cache
+    assert await router.classify_with_llm("loan for my bakery please") == "finance"
+    assert calls["llm"] == 1 and response_cache.semantic_hits == 1
+    print("✅ Similar query under the same template hits")
+
+    # 3. Different question under the same (long, shared) template: miss
+    await router.classify_with_llm("logo ideas for my bakery")
+    assert calls["llm"] == 2 and response_cache.semantic_hits == 1
+    print("✅ Semantically different question under the same template misses")
+
+    # 4. Same query, different prompt around it (routed-generation template): miss
+    await mimo_service.generate_text(f"{router.ROUTED_GENERATION_PROMPT}\nUser Query: loan for my bakery",
+                                     agent="router", query="loan for my bakery")
+    assert calls["llm"] == 3 and response_cache.semantic_hits == 1
+    print("✅ Same query under another template misses")
+
+    # 5. No query from the caller: exact tier only, nothing embedded
+    embedded = len(calls["embedded"])
+    await mimo_service.generate_text("Summarize: loan for my bakery", agent="router")
+    assert len(calls["embedded"]) == embedded
+    print("✅ Without a query the semantic tier is skipped")
+
+    # 6. Routed intent + answer: router ke 24h TTL par cache nahi, har baar LLM (intent route_cache mein)
+    entries, llm_calls = len(response_cache._exact), calls["llm"]
+    for _ in range(2):
+        await router.classify_and_answer("naming ideas for my bakery")
+    assert calls["llm"] == llm_calls + 2 and len(response_cache._exact) == entries
+    print("✅ Routed answers bypass the router's response cache")
+
+def test_response_cache(monkeypatch):
+    check_ttl_and_lru()
+    response_cache._exact.clear()
+    response_cache._vectors.clear()
+    try:
+        asyncio.run(check_semantic_query_only(monkeypatch))
+    finally:
+        response_cache._exact.clear()
+        response_cache._vectors.clear()
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as mp:
+        test_response_cache(mp)
@@ -0,0 +1,24 @@
+import sys
+import os
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.retrieval_benchmark import parse_args, run_benchmark
+
+def test_retrieval_quality_floor():
+    """Offline (hashed embeddings) guard: search or embedding-text changes shouldn't tank recall."""
+    print("\n--- Testing Retrieval Quality (offline) ---")
+    report = run_benchmark(parse_args(["--repeat", "1"]))
+    results = {r["backend"]: r for r in report["results"]}
+
+    for backend, r in results.items():
+        print(f"✅ {backend}: recall@5={r['recall@5']:.3f} MRR={r['mrr']:.3f} p50={r['latency_ms']['p50']:.3f}ms")
+
+    assert results["lexical"]["recall@5"] >= 0.9
+    assert results["hybrid"]["recall@5"] >= 0.9
+    assert results["hybrid"]["mrr"] >= 0.85
+    assert results["vector"]["recall@10"] >= 0.85
+
+if __name__ == "__main__":
+    test_retrieval_quality_floor()
@@ -0,0 +1,79 @@
+import sys
+import os
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from agents.intent_classifier import intent_classifier, IntentClassifier
+from agents.router import ROUTER_CONFIDENCE_THRESHOLD
+from services.gemini_service import gemini_service
+
+# (query, expected category) - sab keyword rules se confidently route hone chahiye
+CASES = [
+    ("hey", "general"),
+    ("Who are you?", "general"),
+    ("Tell me about MUDRA loan eligibility", "scheme"),
+    ("PMEGP subsidy for food processing", "scheme"),
+    ("Suggest a tagline for my organic tea brand", "brand"),
+    ("How should I price my handmade soaps?", "finance"),
+    ("Instagram marketing ideas for my bakery", "marketing"),
+    ("Who are my competitors for a cloud kitchen?", "market"),
+]
+
+def test_keyword_fast_path():
+    print("\n--- Testing Local Router Fast Path ---")
+    for query, expected in CASES:
+        category, confidence = intent_classifier.classify_keywords(query)
+        status = "✅" if category == expected and confidence >= ROUTER_CONFIDENCE_THRESHOLD else "❌"
+        print(f"{status} '{query}' -> {category} ({confidence:.2f})")
+        assert category == expected
+        assert confidence >= ROUTER_CONFIDENCE_THRESHOLD
+
+    # Ambiguous query should NOT be confident (LLM fallback)
+    category, confidence = intent_classifier.classify_keywords("I need a loan to expand my business")
+    print(f"ℹ️ Ambiguous query -> {category} ({confidence:.2f}), falls back to LLM")
+    assert confidence < ROUTER_CONFIDENCE_THRESHOLD
+
+async def check_centroid_backoff(monkeypatch):
+    calls = {"batch": 0}
+    behaviour = {"up": False}
+
+    async def fake_batch(texts):
+        calls["batch"] += 1
+        await asyncio.sleep(0.05)
+        return [[1.0, float(i % 3)] for i in range(len(texts))] if behaviour["up"] else None
+
+    async def fake_embed(text):
+        return [1.0, 0.0]
+
+    monkeypatch.setattr(gemini_service, "get_embeddings_batch", fake_batch)
+    monkeypatch.setattr(gemini_service, "get_embeddings", fake_embed)
+    classifier = IntentClassifier()
+    classifier.use_embeddings = True
+    query = "I need a loan to expand my business"
+
+    # 1. Failure remembered: concurrent and later requests don't retry the batch embed
+    results = await asyncio.gather(*[classifier.classify(query) for _ in range(5)])
+    assert calls["batch"] == 1 and all(source == "keywords" for _, _, source in results)
+    await classifier.classify(query)
+    assert calls["batch"] == 1
+    print("✅ Failed centroid load backs off (keywords only -> LLM router)")
+
+    # 2. After the backoff window: retried once, centroids used again
+    behaviour["up"] = True
+    classifier._centroid_failed_at -= classifier.centroid_retry_after
+    await classifier.classify(query)
+    assert calls["batch"] == 2 and classifier._centroids is not None
+    await classifier.classify(query)
+    assert calls["batch"] == 2
+    print("✅ Centroids retried after the backoff window")
+
+def test_centroid_backoff(monkeypatch):
+    asyncio.run(check_centroid_backoff(monkeypatch))
+
+if __name__ == "__main__":
+    test_keyword_fast_path()
+    with pytest.MonkeyPatch.context() as mp:
+        test_centroid_backoff(mp)
@@ -0,0 +1,86 @@
+import sys
+import os
+import json
+import time
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from langchain_core.messages import HumanMessage
+import agents.graph as graph
+from services.analysis_store import scheme_analysis_store, apply_patch
+
+LLM_DELAY = 0.3
+CANDIDATES = [
+    {"id": 1, "name": "PM Mudra Yojana", "description": "Loans for micro units.", "benefits": ["Loans up to ₹10 Lakh."],
+     "tags": ["loan"], "similarity": 0.7, "eligibility_criteria": {"sector": "All", "geography": "India-wide"}},
+    {"id": 2, "name": "Stand-Up India", "description": "Loans for SC/ST and women.", "benefits": ["Loans up to ₹1 Crore."],
+     "tags": ["loan", "women"], "similarity": 0.5, "eligibility_criteria": {"sector": "Manufacturing", "geography": "India-wide"}},
+]
+
+def reversed_analysis(prompt):
+    # LLM local order ulta kar deta hai, taaki reorder patch dikh sake
+    items = json.loads(prompt.split("Data: ", 1)[1].split("\n", 1)[0])
+    return json.dumps({
+        "chat_summary": "Stand-Up India suits you best.",
+        "schemes_metadata": [{"id": item["id"], "relevance_score": 60 + 20 * i, "explanation": f"LLM on {item['name']}"}
+                             for i, item in enumerate(items)],
+    })
+
+async def check_followup(monkeypatch):
+    behaviour = {"reply": reversed_analysis}
+
+    async def fake_retrieve(query, user_profile=None):
+        return [dict(c) for c in CANDIDATES]
+
+    async def fake_generate(prompt, agent=None, query=None):
+        await asyncio.sleep(LLM_DELAY)
+        return behaviour["reply"](prompt)
+
+    monkeypatch.setattr(graph, "retrieve_schemes", fake_retrieve)
+    monkeypatch.setattr(graph.mimo_service, "generate_text", fake_generate)
+    monkeypatch.setattr(graph, "SCHEME_RERANK_MODE", "followup")
+    state = {"messages": [HumanMessage(content="loan for my unit")], "user_profile": None}
+
+    # 1. Phase one: locally scored cards without waiting for the LLM
+    start = time.perf_counter()
+    result = await graph.scheme_agent_node(state)
+    elapsed = time.perf_counter() - start
+    assert elapsed < LLM_DELAY / 2, elapsed
+    cards = result["schemes"]
+    assert [c["id"] for c in cards] == ["1", "2"] and all("relevance_score" in c for c in cards)
+    analysis_id = result["pending_analysis"]
+    assert scheme_analysis_store.poll(analysis_id)["status"] == "pending"
+    print(f"✅ Cards returned in {elapsed * 1000:.0f}ms, analysis pending")
+
+    # 2. Phase two: patch with scores, explanations, new order and summary
+    patch = await scheme_analysis_store.wait(analysis_id, timeout=2)
+    assert patch["status"] == "ready" and patch["response"] == "Stand-Up India suits you best."
+    assert [s["id"] for s in patch["schemes"]] == ["2", "1"]
+    patched = apply_patch(cards, patch)
+    assert [c["id"] for c in patched] == ["2", "1"]
+    assert patched[0]["explanation"] == "LLM on Stand-Up India" and patched[0]["name"] == "Stand-Up India"
+    assert scheme_analysis_store.poll(analysis_id) == patch
+    print("✅ Follow-up patch reorders and rescores the cards")
+
+    # 3. Malformed LLM reply: analysis fails, client keeps the local scores
+    behaviour["reply"] = lambda prompt: "not json"
+    result = await graph.scheme_agent_node(state)
+    patch = await scheme_analysis_store.wait(result["pending_analysis"], timeout=2)
+    assert patch["status"] == "failed"
+    assert scheme_analysis_store.poll("no-such-id") is None
+    print("✅ Failed analysis reported as failed, unknown id as None")
+
+    # 4. Other modes never leave a pending analysis behind
+    monkeypatch.setattr(graph, "SCHEME_RERANK_MODE", "off")
+    assert (await graph.scheme_agent_node(state))["pending_analysis"] is None
+    print("✅ No pending analysis outside followup mode")
+
+def test_scheme_followup(monkeypatch):
+    asyncio.run(check_followup(monkeypatch))
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as mp:
+        test_scheme_followup(mp)
@@ -0,0 +1,66 @@
+import sys
+import os
+import time
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from langchain_core.messages import HumanMessage
+import agents.graph as graph
+
+ROUTER_DELAY = 0.2
+RETRIEVAL_DELAY = 0.2
+
+def fake_router(category):
+    async def route_request(state, context=""):
+        await asyncio.sleep(ROUTER_DELAY)
+        return {"current_agent": category}
+    return route_request
+
+async def check_prefetch(monkeypatch):
+    calls = {"started": 0, "finished": 0}
+
+    async def fake_retrieve(query, user_profile=None):
+        calls["started"] += 1
+        await asyncio.sleep(RETRIEVAL_DELAY)
+        calls["finished"] += 1
+        return [{"id": 1, "name": "PM Mudra Yojana", "description": "Loans for micro units"}]
+
+    monkeypatch.setattr(graph, "retrieve_schemes", fake_retrieve)
+    query = "need a loan scheme for my bakery"
+    state = {"messages": [HumanMessage(content=query)], "user_profile": None}
+
+    # 1. Scheme route: retrieval overlaps routing, so the node takes ~max() not sum
+    monkeypatch.setattr(graph, "route_request", fake_router("scheme"))
+    start = time.perf_counter()
+    result = await graph.router_node(state)
+    elapsed = time.perf_counter() - start
+    assert result["current_agent"] == "scheme"
+    assert result["prefetched_schemes"]["query"] == query
+    assert result["prefetched_schemes"]["schemes"][0]["name"] == "PM Mudra Yojana"
+    assert elapsed < ROUTER_DELAY + RETRIEVAL_DELAY - 0.05, elapsed
+    print(f"✅ Router + retrieval overlapped ({elapsed:.2f}s)")
+
+    # 2. Other route: speculative retrieval is cancelled before it finishes
+    monkeypatch.setattr(graph, "route_request", fake_router("market"))
+    calls.update(started=0, finished=0)
+    result = await graph.router_node({**state, "messages": [HumanMessage(content="what should I do next with my shop")]})
+    await asyncio.sleep(RETRIEVAL_DELAY)
+    assert result["prefetched_schemes"] is None
+    assert calls["started"] == 1 and calls["finished"] == 0
+    print("✅ Wrong guess: prefetch cancelled and discarded")
+
+    # 3. Confident keyword match for another agent skips speculation entirely
+    calls.update(started=0, finished=0)
+    await graph.router_node({**state, "messages": [HumanMessage(content="suggest a tagline and logo for my brand")]})
+    assert calls["started"] == 0
+    print("✅ No speculation for a confidently non-scheme query")
+
+def test_scheme_prefetch(monkeypatch):
+    asyncio.run(check_prefetch(monkeypatch))
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as mp:
+        test_scheme_prefetch(mp)
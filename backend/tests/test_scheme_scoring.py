@@ -0,0 +1,146 @@
+import sys
+import os
+import json
+import time
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from langchain_core.messages import HumanMessage
+import agents.graph as graph
+from services.response_cache import response_cache
+from services.relevance import build_explanation_snippet, score_schemes
+
+CANDIDATES = [
+    {"id": 1, "name": "Credit Guarantee Scheme", "description": "Collateral-free credit for MSEs.",
+     "benefits": ["Guarantee cover up to ₹5 Crore."], "tags": ["credit", "msme"], "similarity": 0.62,
+     "eligibility_criteria": {"type": "MSEs", "sector": "Manufacturing/Services", "social_category": ["All"],
+                              "geography": "India-wide", "min_age": 18}},
+    {"id": 2, "name": "Stand-Up India", "description": "Financing SC/ST and Women Entrepreneurs.",
+     "benefits": ["Loans from ₹10 Lakh to ₹1 Crore."], "tags": ["loan", "women"], "similarity": 0.60,
+     "eligibility_criteria": {"type": "SC/ST/Women", "sector": "Manufacturing/Services/Trading",
+                              "social_category": ["SC", "ST", "Women"], "geography": "India-wide", "min_age": 18}},
+    {"id": 3, "name": "Kerala Startup Grant", "description": "Grants for startups in Kerala.",
+     "benefits": ["Grant up to ₹12 Lakh."], "tags": ["grant"], "similarity": 0.58,
+     "eligibility_criteria": {"type": "Startups", "sector": "All", "social_category": ["All"],
+                              "geography": "Kerala", "min_age": 18}},
+]
+PROFILE = {"gender": "female", "location": "Noida", "industry": "manufacturing"}
+QUERY = "loan for women entrepreneurs"
+
+def candidates():
+    return [dict(c) for c in CANDIDATES]
+
+def check_local_scorer():
+    snippet = build_explanation_snippet(CANDIDATES[1])
+    assert snippet == "Loans from ₹10 Lakh to ₹1 Crore. For SC/ST/Women in Manufacturing/Services/Trading (India-wide)"
+
+    ranked = score_schemes(QUERY, candidates(), PROFILE)
+    assert [c["id"] for c in ranked] == [2, 1, 3], [(c["id"], c["relevance_score"]) for c in ranked]
+    top = ranked[0]
+    assert 0 <= top["relevance_score"] <= 100
+    assert "Reserved for women entrepreneurs like you" in top["explanation"]
+    assert "Matches your query on: loan, women, entrepreneurs" in top["explanation"]
+    assert "similarity" not in top and "explanation_snippet" not in top
+    # Deterministic: same input, same scores
+    assert [c["relevance_score"] for c in score_schemes(QUERY, candidates(), PROFILE)] == \
+           [c["relevance_score"] for c in ranked]
+    print(f"✅ Local scorer: {[(c['name'], c['relevance_score']) for c in ranked]}")
+
+def analysis_reply(prompt):
+    items = json.loads(prompt.split("Data: ", 1)[1].split("\n", 1)[0])
+    return json.dumps({
+        "chat_summary": "LLM summary",
+        "schemes_metadata": [{"id": item["id"], "relevance_score": 10 * (i + 1), "explanation": "LLM says so"}
+                             for i, item in enumerate(items)],
+    })
+
+async def check_node(monkeypatch):
+    calls = {"llm": 0, "prompt": None}
+    behaviour = {"delay": 0.0, "reply": analysis_reply}
+
+    async def fake_retrieve(query, user_profile=None):
+        return candidates()
+
+    async def fake_generate(prompt, agent=None, query=None):
+        calls["llm"] += 1
+        calls["prompt"] = prompt
+        await asyncio.sleep(behaviour["delay"])
+        return behaviour["reply"](prompt)
+
+    monkeypatch.setattr(graph, "retrieve_schemes", fake_retrieve)
+    monkeypatch.setattr(graph.mimo_service, "generate_text", fake_generate)
+    state = {"messages": [HumanMessage(content=QUERY)], "user_profile": PROFILE}
+
+    # 1. off: no LLM call at all, local scores + template summary
+    monkeypatch.setattr(graph, "SCHEME_RERANK_MODE", "off")
+    result = await graph.scheme_agent_node(state)
+    assert calls["llm"] == 0
+    assert result["schemes"][0]["id"] == "2" and "Stand-Up India" in result["messages"][0].content
+    print("✅ Rerank off: answered without an LLM call")
+
+    # 2. deadline, LLM on time: its scores/summary override the local ones
+    monkeypatch.setattr(graph, "SCHEME_RERANK_MODE", "deadline")
+    monkeypatch.setattr(graph, "SCHEME_RERANK_DEADLINE", 0.5)
+    result = await graph.scheme_agent_node(state)
+    assert calls["llm"] == 1
+    assert result["messages"][0].content == "LLM summary"
+    assert result["schemes"][0]["explanation"] == "LLM says so" and result["schemes"][0]["relevance_score"] == 30
+    print("✅ Deadline mode: LLM rerank applied when it arrives in time")
+
+    # 3. deadline, LLM too slow: local result at the deadline, call keeps running
+    behaviour["delay"] = 1.0
+    start = time.perf_counter()
+    result = await graph.scheme_agent_node(state)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 0.8, elapsed
+    assert result["schemes"][0]["id"] == "2" and result["schemes"][0]["relevance_score"] > 30
+    assert len(graph._rerank_tasks) == 1
+    await asyncio.sleep(0.6)
+    assert not graph._rerank_tasks
+    print(f"✅ Deadline missed: local scores returned in {elapsed:.2f}s")
+
+    # 4. deadline, malformed JSON: local scores kept (no unscored cards)
+    behaviour.update(delay=0.0, reply=lambda prompt: "not json")
+    result = await graph.scheme_agent_node(state)
+    assert all("relevance_score" in s and s["explanation"] for s in result["schemes"])
+    print("✅ Malformed LLM reply: cards keep their local scores")
+
+    # 5. background: response doesn't wait for the LLM
+    behaviour.update(delay=0.5, reply=analysis_reply)
+    monkeypatch.setattr(graph, "SCHEME_RERANK_MODE", "background")
+    background_state = {**state, "messages": [HumanMessage(content="top 2 " + QUERY)]}
+    start = time.perf_counter()
+    result = await graph.scheme_agent_node(background_state)
+    assert time.perf_counter() - start < 0.2
+    assert len(result["schemes"]) == 2 and len(graph._rerank_tasks) == 1
+    assert result["messages"][0].content != "LLM summary"
+    print("✅ Background mode: LLM rerank runs off the request path")
+
+    # 6. background, same query again: cached analysis applied, no second LLM call
+    (task,) = graph._rerank_tasks
+    reply = await task
+    # fake_generate cache nahi likhta; mimo_service._cache_store wala kaam yahan
+    cache_key = response_cache.set("scheme", calls["prompt"], reply)
+    llm_calls = calls["llm"]
+    try:
+        result = await graph.scheme_agent_node(background_state)
+    finally:
+        response_cache._exact.pop(cache_key)
+    assert calls["llm"] == llm_calls and not graph._rerank_tasks
+    assert result["messages"][0].content == "LLM summary"
+    assert result["schemes"][0]["explanation"] == "LLM says so"
+    print("✅ Background mode: cached analysis applied on the repeat query")
+
+def test_scheme_scoring(monkeypatch):
+    check_local_scorer()
+    try:
+        asyncio.run(check_node(monkeypatch))
+    finally:
+        graph._rerank_tasks.clear()
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as mp:
+        test_scheme_scoring(mp)
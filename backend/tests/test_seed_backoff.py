@@ -0,0 +1,86 @@
+import sys
+import os
+import json
+import math
+import asyncio
+import tempfile
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+import seed
+import services.gemini_service as gemini_module
+from models import Scheme
+from services.embedding_cache import EmbeddingCache
+from tests.stubs import stub_embedding
+
+THROTTLED_BATCHES = 2
+
+class ThrottlingProvider:
+    """Stands in for the Gemini embeddings client: first few batch calls get a 429."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    async def aembed_documents(self, texts):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("429 RESOURCE_EXHAUSTED: Quota exceeded for embed_content")
+        return [stub_embedding(t) for t in texts]
+
+async def check_seed_backoff(workdir, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(workdir, 'maya.sqlite3')}")
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    cache = EmbeddingCache(path=os.path.join(workdir, "embeddings.sqlite3"))
+    cache.enabled = True
+    provider = ThrottlingProvider(THROTTLED_BATCHES)
+    throttled_rates = []
+
+    class RecordingBucket(seed.AdaptiveTokenBucket):
+        def on_throttle(self):
+            super().on_throttle()
+            throttled_rates.append(self.rate)
+
+    monkeypatch.setattr(seed, "engine", engine)
+    monkeypatch.setattr(seed, "AsyncSessionLocal", session_factory)
+    monkeypatch.setattr(seed, "AdaptiveTokenBucket", RecordingBucket)
+    monkeypatch.setattr(seed, "START_RATE", 100.0)
+    monkeypatch.setattr(gemini_module, "embedding_cache", cache)
+    monkeypatch.setattr(seed.gemini_service, "embeddings_model", provider)
+
+    with open(seed.SCHEMES_PATH) as f:
+        total = len(json.load(f))
+    try:
+        # 1. First batches throttled: rate halves per 429, retries still embed everything
+        stats = await seed.seed_schemes()
+        assert throttled_rates == [50.0, 25.0], throttled_rates
+        assert stats["inserted"] == total and stats["skipped"] == 0, stats
+        async with session_factory() as session:
+            vectors = (await session.execute(select(Scheme.embedding))).scalars().all()
+        assert len(vectors) == total and all(v is not None and len(v) == 768 for v in vectors)
+        first_run_calls = provider.calls
+        assert first_run_calls == THROTTLED_BATCHES + math.ceil(total / seed.BATCH_SIZE)
+        print(f"✅ {THROTTLED_BATCHES} throttled batches: rate {throttled_rates}, all {total} schemes embedded")
+
+        # 2. Forced full reseed: every vector comes from the embedding cache
+        stats = await seed.seed_schemes(force=True)
+        assert stats["re_embedded"] == total and provider.calls == first_run_calls, provider.calls
+        print("✅ Second run made zero provider calls (embedding cache)")
+    finally:
+        await engine.dispose()
+        if cache._conn is not None:
+            cache._conn.close()
+
+def test_seed_backoff(monkeypatch):
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(check_seed_backoff(workdir, monkeypatch))
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as mp:
+        test_seed_backoff(mp)
@@ -0,0 +1,85 @@
+import sys
+import os
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.single_flight import SingleFlight
+from services.tavily_service import TavilyService
+from tests.stubs import StubConfig, StubServer, create_tavily_app
+
+async def check_single_flight():
+    calls = {"count": 0, "cancelled": 0}
+
+    async def slow_call(value="ok", delay=0.2, fail=False):
+        calls["count"] += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            calls["cancelled"] += 1
+            raise
+        if fail:
+            raise ConnectionError("provider down")
+        return value
+
+    # 1. Burst of identical calls -> one underlying call, everyone gets the result
+    flight = SingleFlight("test")
+    results = await asyncio.gather(*[flight.do("q", slow_call) for _ in range(20)])
+    assert results == ["ok"] * 20 and calls["count"] == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "followers": 19}
+    print("✅ 20 concurrent identical calls -> 1 provider call")
+
+    # 2. The caller that started the call gives up; the others still get the answer
+    calls["count"] = 0
+    leader = asyncio.create_task(flight.do("q", slow_call))
+    await asyncio.sleep(0.01)
+    followers = [asyncio.create_task(flight.do("q", slow_call)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert await asyncio.gather(*followers) == ["ok"] * 3
+    assert leader.cancelled() and calls["count"] == 1 and calls["cancelled"] == 0
+    print("✅ Leader cancellation doesn't fail the followers")
+
+    # 3. Everyone gives up -> underlying call is cancelled and the key is freed
+    waiters = [asyncio.create_task(flight.do("q", slow_call)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    for w in waiters:
+        w.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert calls["cancelled"] == 1 and len(flight) == 0
+    print("✅ Last waiter leaving cancels the shared call")
+
+    # 4. Errors reach every waiter, and the next call starts fresh
+    results = await asyncio.gather(*[flight.do("bad", lambda: slow_call(fail=True)) for _ in range(3)],
+                                   return_exceptions=True)
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert await flight.do("bad", lambda: slow_call("recovered", delay=0)) == "recovered"
+    print("✅ Errors shared, key retried afterwards")
+
+async def check_tavily_burst(base_url: str, config: StubConfig):
+    service = TavilyService()
+    service.base_url = base_url
+    service.cache.clear()
+    await service.aclose()
+
+    config.latency = 0.2
+    before = config.requests
+    queries = ["PM Vishwakarma scheme news", "pm vishwakarma scheme news", "PM Vishwakarma scheme news?"] * 10
+    results = await asyncio.gather(*[service.search(q, max_results=2) for q in queries])
+    assert config.requests == before + 1, config.requests - before
+    assert len(set(results)) == 1
+    print("✅ 30 concurrent Tavily searches (normalized) -> 1 HTTP call")
+    config.latency = 0.0
+    await service.aclose()
+
+def test_single_flight():
+    print("\n--- Testing Single-Flight Coalescing ---")
+    asyncio.run(check_single_flight())
+    config = StubConfig()
+    with StubServer(create_tavily_app(config)) as server:
+        asyncio.run(check_tavily_burst(server.url, config))
+
+if __name__ == "__main__":
+    test_single_flight()
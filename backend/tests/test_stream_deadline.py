@@ -0,0 +1,95 @@
+import sys
+import os
+import json
+import time
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from openai import AsyncOpenAI
+
+from services.llm_pool import CircuitBreaker
+from services.mimo_service import mimo_service
+from tests.stubs import StubServer
+
+CHUNK_TIMEOUT = 0.3
+STREAM_TIMEOUT = 0.8
+
+def create_stalling_app(behaviour):
+    """OpenAI-style stream that stalls ("stall"), never starts ("silent") or drips forever ("drip")."""
+    app = FastAPI()
+
+    def frame(text):
+        chunk = {"id": "stub-1", "created": 0, "model": "stub", "object": "chat.completion.chunk",
+                 "choices": [{"index": 0, "finish_reason": None, "delta": {"content": text}}]}
+        return f"data: {json.dumps(chunk)}\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def completions():
+        async def chunks():
+            mode = behaviour["mode"]
+            if mode == "silent":
+                await asyncio.sleep(30)
+            for n in range(2 if mode == "stall" else 1000):
+                yield frame(f"part{n} ")
+                await asyncio.sleep(0.1)
+            await asyncio.sleep(30)
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+async def collect(prompt):
+    start = time.perf_counter()
+    parts = [delta async for delta in mimo_service.stream_text(prompt)]
+    return "".join(parts), time.perf_counter() - start
+
+async def check_stream_deadlines(url, behaviour, monkeypatch):
+    openrouter = mimo_service.pool.get("openrouter")
+    monkeypatch.setattr(mimo_service, "client", AsyncOpenAI(api_key="test", base_url=f"{url}/v1", max_retries=0))
+    monkeypatch.setattr(mimo_service, "stream_chunk_timeout", CHUNK_TIMEOUT)
+    monkeypatch.setattr(mimo_service, "stream_timeout", STREAM_TIMEOUT)
+    monkeypatch.setattr(openrouter, "breaker", CircuitBreaker())
+    # Stall failures provider ke counter mein bhi judte hain; test ke baad purana count wapas
+    monkeypatch.setattr(openrouter, "failures", openrouter.failures)
+    free_slots = openrouter._semaphore._value if openrouter._semaphore else None
+
+    async def fallback(prompt, agent=None, exclude=()):
+        return "fallback answer"
+    monkeypatch.setattr(mimo_service.pool, "complete", fallback)
+
+    # 1. Stream stalls after a few chunks: cut at the chunk timeout, partial text kept
+    behaviour["mode"] = "stall"
+    text, elapsed = await collect("stall test prompt")
+    assert text == "part0 part1 " and elapsed < 0.2 + CHUNK_TIMEOUT + 0.3, (text, elapsed)
+    print(f"✅ Stalled stream released after {elapsed:.2f}s with partial text")
+
+    # 2. Chunks keep dripping in: the total deadline ends the stream
+    behaviour["mode"] = "drip"
+    text, elapsed = await collect("drip test prompt")
+    assert text.startswith("part0 ") and STREAM_TIMEOUT <= elapsed < STREAM_TIMEOUT + 0.3, (text, elapsed)
+    print(f"✅ Dripping stream cut at the {STREAM_TIMEOUT}s total deadline")
+
+    # 3. Nothing arrives: other providers answer
+    behaviour["mode"] = "silent"
+    text, elapsed = await collect("silent test prompt")
+    assert text == "fallback answer" and elapsed < CHUNK_TIMEOUT + 0.3, (text, elapsed)
+    print("✅ Silent stream falls back to the other providers")
+
+    # Provider slot wapas, har stall failure ki tarah record hua
+    if free_slots is not None:
+        assert openrouter._semaphore._value == free_slots
+    assert openrouter.breaker.failures == 3
+
+def test_stream_deadline(monkeypatch):
+    behaviour = {"mode": "stall"}
+    with StubServer(create_stalling_app(behaviour)) as server:
+        asyncio.run(check_stream_deadlines(server.url, behaviour, monkeypatch))
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as mp:
+        test_stream_deadline(mp)
@@ -0,0 +1,89 @@
+import sys
+import os
+import json
+import asyncio
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import main
+from models import ChatHistory, ChatSession
+from services.analysis_store import scheme_analysis_store
+from services.chat_history_service import chat_history_service
+from tests.stubs import make_session_factory
+
+CARD = {"id": "1", "name": "PM Mudra Yojana", "relevance_score": 70, "explanation": "Local fit"}
+
+
+async def ready_analysis():
+    return {"response": "Mudra suits you.", "schemes": [{"id": "1", "relevance_score": 90, "explanation": "LLM fit"}]}
+
+
+class FakeGraph:
+    """Stand-in for app_graph.astream: fixed updates per agent, no LLM/DB."""
+
+    async def astream(self, state, config, stream_mode=None):
+        query = state["messages"][-1].content
+        agent = "scheme" if "scheme" in query else "general"
+        yield "updates", {"memory": None}
+        yield "updates", {"router": {"current_agent": agent}}
+        if agent == "general":
+            for token in ("Start ", "small."):
+                yield "custom", {"type": "token", "content": token}
+            yield "updates", {"general": {"messages": [AIMessage(content="Start small.")]}}
+        else:
+            pending = scheme_analysis_store.submit(ready_analysis())
+            yield "updates", {"scheme": {"messages": [AIMessage(content="Found 1 scheme.")],
+                                         "schemes": [dict(CARD)], "pending_analysis": pending}}
+
+
+def parse_events(body: str):
+    """SSE body -> [(event, data)]."""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_event_order(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    session_factory = asyncio.run(make_session_factory(engine, ChatHistory, ChatSession))
+
+    monkeypatch.setattr(main, "app_graph", FakeGraph())
+    # Lifespan nahi chalta, isliye flusher off - add_message seedha DB mein likhta hai
+    monkeypatch.setattr(chat_history_service, "session_factory", session_factory)
+    monkeypatch.setattr(main.admission_controller, "enabled", False)
+    try:
+        client = TestClient(main.app)
+
+        # 1. Streamed agent: session -> agent -> token* -> done
+        resp = client.post("/api/chat/agent/stream", json={"message": "what next", "session_id": "sse-1"})
+        assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/event-stream")
+        events = parse_events(resp.text)
+        assert [e for e, _ in events] == ["session", "agent", "token", "token", "done"], events
+        assert events[0][1] == {"session_id": "sse-1"} and events[1][1] == {"agent": "general"}
+        assert events[-1][1]["response"] == "Start small." and events[-1][1]["schemes"] == []
+        print("✅ Streamed reply: session -> agent -> token* -> done")
+
+        # 2. Scheme agent (followup): non-streamed text as one token, cards, analysis patch, done
+        resp = client.post("/api/chat/agent/stream", json={"message": "any scheme for me", "session_id": "sse-2"})
+        events = parse_events(resp.text)
+        assert [e for e, _ in events] == ["session", "agent", "token", "schemes", "analysis", "done"], events
+        schemes, analysis, done = events[3][1], events[4][1], events[5][1]
+        assert schemes["schemes"][0]["explanation"] == "Local fit" and schemes["analysis_id"]
+        assert analysis["status"] == "ready" and analysis["analysis_id"] == schemes["analysis_id"]
+        assert done["response"] == "Mudra suits you." and done["schemes"][0]["relevance_score"] == 90
+        print("✅ Scheme reply: ... -> schemes -> analysis -> done, patch applied to done")
+    finally:
+        asyncio.run(engine.dispose())
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as mp:
+        test_stream_event_order(mp)
@@ -0,0 +1,66 @@
+import sys
+import os
+import asyncio
+import time
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from prometheus_client import REGISTRY
+from tests.stubs import StubConfig, StubServer, create_tavily_app
+from services.tavily_service import TavilyService
+
+async def check_tavily(base_url: str, config: StubConfig):
+    service = TavilyService()
+    service.base_url = base_url
+    service.cache.clear()
+    await service.aclose()
+
+    # 1. Basic search against the local stand-in
+    result = await service.search("organic tea market in India", max_results=2)
+    assert "Market report 1: organic tea market in India" in result
+    print("✅ Search works against local stand-in")
+
+    # 2. Normalized-query cache: same query, different casing -> no new request
+    before = config.requests
+    await service.search("Organic Tea market in India?", max_results=2)
+    assert config.requests == before
+    print("✅ TTL cache hit for normalized query")
+
+    # 3. Slow search must not block the event loop
+    config.latency = 1.0
+    started = time.perf_counter()
+    slow = asyncio.create_task(service.search("slow query about textiles"))
+    await asyncio.sleep(0.1)
+    loop_lag = time.perf_counter() - started
+    assert loop_lag < 0.5, f"event loop blocked for {loop_lag:.2f}s"
+    await slow
+    print(f"✅ Event loop stayed responsive during a 1s search (lag {loop_lag:.2f}s)")
+
+    # 4. Per-call timeout
+    config.latency = 2.0
+    result = await service.search("timeout query", timeout=0.3)
+    assert "timed out" in result
+    print("✅ Per-call timeout enforced")
+
+    # 5. HTTP error status: error string returned, counted by status, nothing cached
+    config.latency = 0.0
+    config.fail_next, config.error_status = 1, 429
+    labels = {"provider": "tavily", "operation": "search", "agent": "none", "error": "HTTP 429"}
+    errors = REGISTRY.get_sample_value("maya_provider_errors_total", labels) or 0.0
+    result = await service.search("rate limited query")
+    assert "HTTP 429" in result
+    assert REGISTRY.get_sample_value("maya_provider_errors_total", labels) == errors + 1
+    assert "Market report" in await service.search("rate limited query")
+    print("✅ HTTP error statuses counted in maya_provider_errors_total, not cached")
+
+    await service.aclose()
+
+def test_tavily_async():
+    print("\n--- Testing Async Tavily Client ---")
+    config = StubConfig()
+    with StubServer(create_tavily_app(config)) as server:
+        asyncio.run(check_tavily(server.url, config))
+
+if __name__ == "__main__":
+    test_tavily_async()
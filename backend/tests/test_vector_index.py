@@ -0,0 +1,45 @@
+import sys
+import os
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from services.vector_index import SchemeVectorIndex
+
+def test_vector_index():
+    print("\n--- Testing In-Memory Scheme Index ---")
+    rng = np.random.default_rng(42)
+    embeddings = rng.normal(size=(96, 768)).astype(np.float32)
+    cards = [{"id": i, "name": f"Scheme {i}"} for i in range(96)]
+
+    original = embeddings.copy()
+
+    index = SchemeVectorIndex()
+    index.build(cards, embeddings)
+    assert index.is_ready and len(index) == 96
+    assert index.matrix.dtype == np.float32 and index.matrix.flags["C_CONTIGUOUS"]
+    # build() normalizes its own copy; caller ka array jaisa tha waisa
+    assert np.array_equal(embeddings, original) and not np.shares_memory(index.matrix, embeddings)
+
+    # Query = scheme 7 ka (unnormalized) embedding + noise -> scheme 7 top par aana chahiye
+    query = embeddings[7] + rng.normal(scale=0.5, size=768)
+    hits = index.search(query, k=3)
+    print(f"Top-3: {hits}")
+    assert hits[0][0] == 7
+    assert [s for _, s in hits] == sorted([s for _, s in hits], reverse=True)
+
+    # Brute-force comparison
+    normed = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    expected = np.argsort(-(normed @ (query / np.linalg.norm(query))))[:3].tolist()
+    assert [row for row, _ in hits] == expected
+
+    # Mask: sirf allowed rows hi return honi chahiye
+    allowed = np.zeros(96, dtype=bool)
+    allowed[[3, 11, 50]] = True
+    masked = index.search(query, k=5, allowed=allowed)
+    assert sorted(row for row, _ in masked) == [3, 11, 50]
+    print("✅ Vector index search verified.")
+
+if __name__ == "__main__":
+    test_vector_index()
@@ -29,21 +29,13 @@ export function ChatInterface() {
 
   const loadSessions = async () => {
     try {
-      const sessionIds = await chatService.getSessions();
-      const sessionsWithTitles = await Promise.all(
-        sessionIds.map(async (id: string) => {
-          try {
-            const history = await chatService.getSessionHistory(id);
-            const firstUserMsg = history.find((msg: any) => msg.role === 'user');
-            let title = firstUserMsg ? firstUserMsg.content : `Session ${id.slice(0, 8)}`;
-            if (title.length > 35) title = title.substring(0, 35) + '...';
-            return { id, title };
-          } catch (e) {
-            return { id, title: `Chat ${id.slice(0, 5)}` };
-          }
-        })
-      );
-      setSessions(sessionsWithTitles);
+      // Titles ab backend ke session summary se aate hain (har session ki history fetch nahi)
+      const { sessions: summaries } = await chatService.getSessions();
+      setSessions(summaries.map(({ session_id, title }) => {
+        let label = title || `Session ${session_id.slice(0, 8)}`;
+        if (label.length > 35) label = label.substring(0, 35) + '...';
+        return { id: session_id, title: label };
+      }));
     } catch (error) {
       console.error("Failed to load sessions", error);
     }
@@ -86,6 +78,31 @@ export function ChatInterface() {
     scrollToBottom();
   }, [messages, isLoading]);
 
+  // Two-phase scheme answer: cards pehle dikh jaate hain, AI analysis aate hi message patch hota hai
+  const pollAnalysis = async (messageId: string, analysisId: string) => {
+    for (let attempt = 0; attempt < 20; attempt++) {
+      await new Promise(resolve => setTimeout(resolve, 1000));
+      let patch;
+      try {
+        patch = await chatService.getAnalysis(analysisId);
+      } catch {
+        return; // Expired/unknown: local scores hi rahenge
+      }
+      if (patch.status === 'pending') continue;
+      if (patch.status === 'ready' && patch.schemes) {
+        const updates = new Map(patch.schemes.map((s, i) => [String(s.id), { ...s, order: i }]));
+        setMessages(prev => prev.map(m => {
+          if (m.id !== messageId || !m.schemes) return m;
+          const schemes = m.schemes
+            .map(s => ({ ...s, ...updates.get(String(s.id)) }))
+            .sort((a: any, b: any) => (a.order ?? Infinity) - (b.order ?? Infinity));
+          return { ...m, content: patch.response || m.content, schemes };
+        }));
+      }
+      return;
+    }
+  };
+
   const handleStop = () => {
     if (abortControllerRef.current) {
       abortControllerRef.current.abort();
@@ -132,6 +149,9 @@ const handleSend = async (forcedInput?: string) => {
     };
 
     setMessages(prev => [...prev, aiMsg]);
+    if (data.analysis_id && aiMsg.schemes?.length) {
+      pollAnalysis(aiMsg.id, data.analysis_id);
+    }
     
     if (data.session_id && data.session_id !== currentSessionId) {
       setCurrentSessionId(data.session_id);
@@ -144,10 +164,14 @@ const handleSend = async (forcedInput?: string) => {
       // Kuch nahi karenge, message list mein AI response add nahi hoga
     } else {
       console.error("Agent Error:", error);
+      // 429 = quota/overload: backend batata hai kitni der baad retry karna hai
+      const retryAfter = error.response?.status === 429 ? error.response.headers?.['retry-after'] : null;
       setMessages(prev => [...prev, {
         id: Date.now().toString(),
         role: 'assistant',
-        content: "Sorry, I'm having trouble connecting to my agents. Please try again.",
+        content: retryAfter
+          ? `${error.response.data?.detail || "MAYA is busy right now."} Please try again in ${retryAfter}s.`
+          : "Sorry, I'm having trouble connecting to my agents. Please try again.",
         timestamp: new Date(),
         type: 'text'
       }]);
@@ -20,6 +20,28 @@ export interface ChatResponse {
     agent: string;
     session_id: string;
     schemes: Scheme[]; // <--- CRITICAL FIX: TypeScript now knows about schemes
+    analysis_id?: string | null; // Two-phase scheme answer: AI analysis baad mein poll karo
+}
+
+// Follow-up AI analysis for scheme cards (GET /api/chat/analysis/{id})
+export interface AnalysisPatch {
+    analysis_id: string;
+    status: 'pending' | 'ready' | 'failed';
+    response?: string | null;
+    schemes?: { id: string | number; relevance_score: number; explanation: string }[];
+}
+
+// 3. Session summaries (sidebar) - one page of /api/history/sessions
+export interface SessionSummary {
+    session_id: string;
+    title: string | null;
+    message_count: number;
+    last_activity: string;
+}
+
+export interface SessionPage {
+    sessions: SessionSummary[];
+    next_cursor: string | null;
 }
 
 export const chatService = {
@@ -38,6 +60,12 @@ export const chatService = {
         }
     },
 
+    // Scheme cards ka follow-up AI analysis (scores, explanations, order, summary)
+    getAnalysis: async (analysis_id: string): Promise<AnalysisPatch> => {
+        const response = await api.get<AnalysisPatch>(`/api/chat/analysis/${analysis_id}`);
+        return response.data;
+    },
+
     // Search Schemes - Direct vector search (optional fallback)
     searchSchemes: async (message: string): Promise<Scheme[]> => {
         try {
@@ -50,10 +78,13 @@ export const chatService = {
     },
     
     // Sessions Management
-    getSessions: async (): Promise<string[]> => {
+    // Keyset pagination: pass next_cursor back to load older sessions
+    getSessions: async (cursor?: string | null): Promise<SessionPage> => {
         try {
-            const response = await api.get<{ sessions: string[] }>('/api/history/sessions');
-            return response.data.sessions;
+            const response = await api.get<SessionPage>('/api/history/sessions', {
+                params: cursor ? { cursor } : undefined
+            });
+            return response.data;
         } catch (error) {
             console.error("Error fetching sessions:", error);
             throw error;